@@ -0,0 +1,89 @@
+"""Compression of the responses, negotiated with the Accept-Encoding header of the clients.
+
+Configured with the RESPONSE_COMPRESSION setting. The responses of the CONTENT_TYPES of at least MIN_SIZE bytes are
+compressed with brotli at BROTLI_QUALITY when the `brotli` package is installed and the client accepts it, or else
+with gzip at GZIP_LEVEL. Only JSON is compressed by default: the HTML pages of the admin site and the browsable API
+embed the CSRF token, which compression would expose to BREACH. Streaming responses, like the slot events, are left
+alone so that their events are not buffered.
+
+A view can set `compressed_content` on its response to a dict kept along with the content, e.g. in a cache. The
+compressed content is then looked up there by encoding, and stored there the first time, so that the responses
+served from the cache are only compressed once per encoding.
+
+"""
+import gzip
+import re
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# The encodings in order of preference when the client accepts several with the same quality.
+ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+
+def negotiate_encoding(accept_encoding, encodings=ENCODINGS):
+    """Returns the preferred one of the encodings which the Accept-Encoding header accepts, or None."""
+    qualities = {}
+    for part in accept_encoding.lower().split(','):
+        coding, _, parameters = part.partition(';')
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', parameters)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        qualities[coding.strip()] = quality
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(content, encoding):
+    options = settings.RESPONSE_COMPRESSION
+    if encoding == 'br':
+        return brotli.compress(content, quality=options['BROTLI_QUALITY'])
+    return gzip.compress(content, compresslevel=options['GZIP_LEVEL'], mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        options = settings.RESPONSE_COMPRESSION
+        if not options['ENABLED'] or response.streaming or response.has_header('Content-Encoding'):
+            return response
+        content_type = response.get('Content-Type', '').split(';', 1)[0].strip()
+        if content_type not in options['CONTENT_TYPES'] or len(response.content) < options['MIN_SIZE']:
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = negotiate_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if encoding is None:
+            return response
+
+        compressed_content = getattr(response, 'compressed_content', None)
+        if compressed_content is None:
+            compressed = compress(response.content, encoding)
+        else:
+            compressed = compressed_content.get(encoding)
+            if compressed is None:
+                compressed = compressed_content[encoding] = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+        response['Content-Encoding'] = encoding
+        # The compressed content is not byte for byte the same as the uncompressed one.
+        if response.has_header('ETag') and response['ETag'].startswith('"'):
+            response['ETag'] = 'W/' + response['ETag']
+        return response
@@ -0,0 +1,112 @@
+"""Sampled profiling of the requests with cProfile, to find where the time of the slow requests goes.
+
+Configured with the REQUEST_PROFILING setting. A random SAMPLE_RATE of the requests of the VIEWS (every view when it is
+empty) run under cProfile, and their profiles are kept. With SLOW_MS set, every request of the views runs under
+cProfile instead, and the profile of a request is also kept when it took longer than SLOW_MS milliseconds; this
+catches the slow requests, but slows down all of them, roughly twice for the ones running mostly Python code.
+Since Python 3.12, only one profiler can run at a time, so the requests served by other threads meanwhile are not
+profiled.
+
+The kept profiles are written as .pstats files to DIRECTORY, named after the time, the view and the duration of the
+request, e.g. `1620000000000000000-4242-calender_mgmt.book_slot-812ms.pstats`. The directory is a ring buffer: once
+it holds more than MAX_FILES profiles, the oldest ones are deleted. Merge and summarize them with
+
+    python manage.py summarize_profiles --view calender_mgmt.book_slot
+
+"""
+import cProfile
+import logging
+import os
+import random
+import time
+
+from django.conf import settings
+from django.urls import Resolver404, resolve
+
+logger = logging.getLogger(__name__)
+
+PROFILE_SUFFIX = '.pstats'
+
+
+def profile_view_name(name):
+    """Returns the view name in the file name of a profile."""
+    return name.split('-', 2)[2].rsplit('-', 1)[0]
+
+
+def profile_paths(directory, view_name=None):
+    """Returns the paths of the profiles in the directory, of the view if given, from the oldest to the newest."""
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith(PROFILE_SUFFIX)]
+    except FileNotFoundError:
+        return []
+    return [
+        os.path.join(directory, name) for name in sorted(names, key=lambda name: int(name.split('-', 1)[0]))
+        if view_name is None or profile_view_name(name) == view_name
+    ]
+
+
+def write_profile(profiler, view_name, duration):
+    """Writes the profile of a request to the ring buffer, and deletes the oldest profiles beyond MAX_FILES.
+
+    The profile is written to a temporary file first and renamed, so that the profiles read by the summary are
+    always complete. Profiles deleted by another process in the meantime are ignored.
+
+    """
+    directory = settings.REQUEST_PROFILING['DIRECTORY']
+    os.makedirs(directory, exist_ok=True)
+    name = "{}-{}-{}-{}ms{}".format(
+        time.time_ns(), os.getpid(), view_name.replace(':', '.'), round(duration * 1000), PROFILE_SUFFIX
+    )
+    path = os.path.join(directory, name)
+    profiler.dump_stats(path + '.tmp')
+    os.replace(path + '.tmp', path)
+
+    paths = profile_paths(directory)
+    for old_path in paths[:max(0, len(paths) - settings.REQUEST_PROFILING['MAX_FILES'])]:
+        try:
+            os.remove(old_path)
+        except FileNotFoundError:
+            pass
+
+
+class RequestProfilingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def view_name(self, request):
+        """Returns the URL name of the requested view if it is profiled, or else None."""
+        try:
+            view_name = resolve(request.path_info).view_name
+        except Resolver404:
+            return None
+        views = settings.REQUEST_PROFILING['VIEWS']
+        return view_name if not views or view_name in views else None
+
+    def __call__(self, request):
+        profiling = settings.REQUEST_PROFILING
+        if not profiling['ENABLED']:
+            return self.get_response(request)
+        view_name = self.view_name(request)
+        if view_name is None:
+            return self.get_response(request)
+        sampled = random.random() < profiling['SAMPLE_RATE']
+        if not sampled and not profiling['SLOW_MS']:
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Only one profiler runs at a time since Python 3.12, and a request of another thread holds it.
+            return self.get_response(request)
+        started = time.perf_counter()
+        try:
+            return self.get_response(request)
+        finally:
+            profiler.disable()
+            duration = time.perf_counter() - started
+            if sampled or (profiling['SLOW_MS'] and duration * 1000 > profiling['SLOW_MS']):
+                try:
+                    write_profile(profiler, view_name, duration)
+                except OSError:
+                    logger.exception("Could not write the profile of a request to %s", view_name)
@@ -0,0 +1,186 @@
+"""Rate limiting and admission control of the public API endpoints.
+
+Configured with the RATE_LIMITS setting, which groups the endpoints into classes by their URL names. Before a request
+of a class reaches its view, and the database:
+
+* it takes a token from the buckets of its client for the class, or gets a 429 response with a Retry-After header.
+  Every client has a bucket for its IP address, and the clients sending a valid token one more for their token, so
+  that a client can neither escape the limits of its address with made-up tokens, nor of its token by changing its
+  address. The buckets are kept in the Django cache, shared by the workers, and only updated with atomic increments.
+* it is admitted by the worker if the requests in flight in the worker are fewer than the share of MAX_IN_FLIGHT of
+  its class, or gets a 503 response. The classes with the lower shares are shed first when the worker is busy.
+
+The sub-requests of a batch request are charged to the classes of their own views by the batch view, with `throttle`.
+
+"""
+import hashlib
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.urls import Resolver404, resolve
+from rest_framework.authtoken.models import Token
+
+from user_mgmt.authentication import CustomTokenAuthentication
+
+# The buckets of the clients idle for this long are dropped, and start full again.
+BUCKET_TIMEOUT = 60 * 60
+
+# Number of seconds a token found valid is remembered, without reading it again.
+TOKEN_TIMEOUT = 5 * 60
+
+
+class ResponseMessages:
+    RATE_LIMITED = "Too many requests, please try again in {} seconds!"
+    OVERLOADED = "The server is too busy, please try again later!"
+
+
+def take_token(key, rate, burst):
+    """Takes a token from the bucket `key`, refilled with `rate` tokens per second up to `burst` tokens.
+
+    Returns 0 if a token was taken, or else the number of seconds until the next token. The bucket is kept as the
+    time it was last full (the anchor), and a counter of the tokens taken since then, named after the anchor. A
+    token is available if fewer than `burst` tokens, plus the ones refilled since the anchor, have been taken.
+    The anchor moves forward when the bucket overflows, which starts a new counter.
+
+    """
+    now = time.time()
+    anchor_key = "ratelimit:{}".format(key)
+    anchor = cache.get(anchor_key)
+    if anchor is None:
+        cache.add(anchor_key, now, BUCKET_TIMEOUT)
+        anchor = cache.get(anchor_key, now)
+    counter_key = "ratelimit:{}:{!r}".format(key, anchor)
+    try:
+        taken = cache.incr(counter_key)
+    except ValueError:
+        cache.add(counter_key, 0, BUCKET_TIMEOUT)
+        taken = cache.incr(counter_key)
+
+    allowance = burst + (now - anchor) * rate
+    if taken > allowance:
+        cache.decr(counter_key)
+        return (taken - allowance) / rate
+    if allowance - taken > burst:
+        cache.set(anchor_key, now, BUCKET_TIMEOUT)
+    return 0
+
+
+def client_ip(request):
+    """Returns the IP address of the client.
+
+    The IP address is read from X-Forwarded-For when the application runs behind PROXY_COUNT proxies, each of which
+    appends the address it received the request from.
+
+    """
+    proxy_count = settings.RATE_LIMITS['PROXY_COUNT']
+    forwarded_for = [address.strip() for address in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',')]
+    if proxy_count and len(forwarded_for) >= proxy_count:
+        return forwarded_for[-proxy_count]
+    return request.META.get('REMOTE_ADDR')
+
+
+def valid_token_digest(request):
+    """Returns a hash of the token sent by the client if it is the token of an active user, or else None.
+
+    The tokens found valid are remembered in the cache for TOKEN_TIMEOUT, so that only the first request of a token
+    reads it from the database. Any other value of the Authorization header is ignored, so that random tokens do not
+    get buckets of their own.
+
+    """
+    keyword, _, key = request.META.get('HTTP_AUTHORIZATION', '').partition(' ')
+    if keyword != CustomTokenAuthentication.keyword or not key.strip():
+        return None
+    key = key.strip()
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    cache_key = "ratelimit-token:{}".format(digest)
+    if cache.get(cache_key) is None:
+        if not Token.objects.filter(key=key, user__is_active=True).exists():
+            return None
+        cache.set(cache_key, True, TOKEN_TIMEOUT)
+    return digest
+
+
+def client_keys(request):
+    """Returns the keys of the buckets of the client: of its IP address, and of its token once it is found valid."""
+    keys = ["ip:{}".format(client_ip(request))]
+    digest = valid_token_digest(request)
+    if digest is not None:
+        keys.append("token:{}".format(digest))
+    return keys
+
+
+_view_classes = (None, {})
+
+
+def view_class(view_name):
+    """Returns the name and the limits of the class of the view, or None twice for the other views."""
+    global _view_classes
+    rate_limits, view_classes = _view_classes
+    if rate_limits is not settings.RATE_LIMITS:
+        rate_limits = settings.RATE_LIMITS
+        view_classes = {
+            name_of_view: (name, limits)
+            for name, limits in rate_limits['CLASSES'].items() for name_of_view in limits['VIEWS']
+        }
+        _view_classes = (rate_limits, view_classes)
+    return view_classes.get(view_name, (None, None))
+
+
+def throttle(request, name, limits):
+    """Takes a token from every bucket of the client for the class, and returns 0, or else the number of seconds to
+    wait for the next token of the emptiest bucket.
+
+    """
+    return max(
+        take_token("{}:{}".format(name, key), limits['RATE'], limits['BURST']) for key in client_keys(request)
+    )
+
+
+def rate_limited_seconds(retry_after):
+    return max(1, round(retry_after))
+
+
+class RateLimitMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.in_flight = 0
+        self.lock = threading.Lock()
+
+    def request_class(self, request):
+        """Returns the name and the limits of the class of the requested view, or None twice for the other views."""
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None, None
+        return view_class(match.view_name)
+
+    def admit(self, share):
+        with self.lock:
+            if self.in_flight >= settings.RATE_LIMITS['MAX_IN_FLIGHT'] * share:
+                return False
+            self.in_flight += 1
+            return True
+
+    def __call__(self, request):
+        if not settings.RATE_LIMITS['ENABLED']:
+            return self.get_response(request)
+        name, limits = self.request_class(request)
+        if name is not None:
+            retry_after = throttle(request, name, limits)
+            if retry_after:
+                seconds = rate_limited_seconds(retry_after)
+                response = JsonResponse(ResponseMessages.RATE_LIMITED.format(seconds), status=429, safe=False)
+                response['Retry-After'] = str(seconds)
+                return response
+        if not self.admit(limits['SHARE'] if name is not None else 1):
+            response = JsonResponse(ResponseMessages.OVERLOADED, status=503, safe=False)
+            response['Retry-After'] = '1'
+            return response
+        try:
+            return self.get_response(request)
+        finally:
+            with self.lock:
+                self.in_flight -= 1
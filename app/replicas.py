@@ -0,0 +1,100 @@
+"""Routes the read-only API views to the read replica databases.
+
+Views opt in with the `read_from_replica` decorator. Every other query, and every write, goes to the `default`
+database. After a client writes, its reads stay on `default` for `REPLICA_PIN_SECONDS` so that it always sees its
+own writes even if the replicas are lagging behind, and so do the reads following a write in the same request, like
+the sub-requests of a batch.
+
+"""
+import contextvars
+import functools
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+_replica_reads = contextvars.ContextVar('replica_reads', default=False)
+_request_state = contextvars.ContextVar('replica_request_state', default=None)
+
+
+def _pin_key(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return "replica-pin:user:{}".format(user.pk)
+    return "replica-pin:ip:{}".format(request.META.get('REMOTE_ADDR'))
+
+
+def is_pinned(request):
+    """Returns True if the client of this request has written recently and must read from the primary."""
+    return cache.get(_pin_key(request)) is not None
+
+
+def pin_to_primary(request):
+    cache.set(_pin_key(request), True, settings.REPLICA_PIN_SECONDS)
+
+
+def wrote_in_request():
+    """Returns True if the current request has written to the database already."""
+    state = _request_state.get()
+    return state is not None and state['wrote']
+
+
+def read_from_replica(view_method):
+    """Sends the reads made by the decorated view method to a replica, unless the client is pinned to the primary or
+    the request has written already.
+
+    """
+    @functools.wraps(view_method)
+    def wrapper(view, request, *args, **kwargs):
+        if not settings.DATABASE_REPLICAS or wrote_in_request() or is_pinned(request):
+            return view_method(view, request, *args, **kwargs)
+        token = _replica_reads.set(True)
+        try:
+            return view_method(view, request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
+
+
+class ReplicaRouter:
+    """Database router which reads from a random replica inside `read_from_replica` views.
+
+    """
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get() and settings.DATABASE_REPLICAS:
+            return random.choice(settings.DATABASE_REPLICAS)
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None:
+            state['wrote'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Pins the client to the primary database for a short while after a request which wrote to the database.
+
+    The client is identified by the authenticated user, or by the IP address for anonymous requests. The user is
+    read after the view has run, because the token authentication of the API happens inside the view.
+
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state = {'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        if state['wrote'] and settings.DATABASE_REPLICAS:
+            pin_to_primary(request)
+        return response
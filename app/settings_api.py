@@ -0,0 +1,36 @@
+"""
+API-only settings profile, selected with DJANGO_SETTINGS_MODULE=app.settings_api.
+
+The token authenticated JSON API does not use the admin site, sessions, messages or static files. This profile drops
+those apps and their middleware, renders JSON only and skips the Heroku integration, which shortens the start of
+every worker and the middleware chain every request goes through.
+"""
+
+from .settings_base import *  # noqa: F401,F403
+from .settings_base import INSTALLED_APPS, REST_FRAMEWORK
+
+INSTALLED_APPS = [
+    app for app in INSTALLED_APPS if app not in (
+        'django.contrib.admin',
+        'django.contrib.sessions',
+        'django.contrib.messages',
+        'django.contrib.staticfiles',
+    )
+]
+
+# The API views authenticate with tokens and are exempt from CSRF checks, so the session, CSRF, authentication,
+# messages and clickjacking middleware would only add work to every request.
+MIDDLEWARE = [
+    'app.compression.CompressionMiddleware',
+    'app.ratelimit.RateLimitMiddleware',
+    'app.profiling.RequestProfilingMiddleware',
+    'app.replicas.ReplicaPinningMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    'django.middleware.common.CommonMiddleware',
+]
+
+TEMPLATES = []
+
+REST_FRAMEWORK = dict(REST_FRAMEWORK, DEFAULT_RENDERER_CLASSES=[
+    'rest_framework.renderers.JSONRenderer',
+])
@@ -0,0 +1,123 @@
+"""Conversions between the UTC times stored in the database and the IANA timezones of the users.
+
+The database keeps naive UTC times (USE_TZ is off). Users can set a timezone on their profile, and the timestamps they
+send without an offset are read in that zone. Listings add the start and end times in the zone of the requester.
+
+Converting every row of a listing through `zoneinfo` is slow, so every zone gets an `OffsetTable`: per year, the
+sorted UTC instants at which the UTC offset of the zone changes (the DST transitions), computed once on first use.
+Converting a UTC time is then a bisection in the table of its year.
+
+"""
+import bisect
+import datetime
+import functools
+import zoneinfo
+
+UTC = 'UTC'
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+
+class OffsetTable:
+    """The UTC offsets of a zone, loaded one year at a time.
+
+    """
+    def __init__(self, key):
+        self.key = key
+        self.zone = zoneinfo.ZoneInfo(key)
+        self._years = {}
+
+    def _offset(self, utc_time):
+        return utc_time.replace(tzinfo=datetime.timezone.utc).astimezone(self.zone).utcoffset()
+
+    def _load_year(self, year):
+        """Finds the transitions of the year by comparing the offsets of consecutive days, and bisecting to the second
+        between the days with different offsets.
+
+        """
+        day = datetime.datetime(year, 1, 1)
+        starts, tzinfos = [day], [datetime.timezone(self._offset(day))]
+        while day.year == year:
+            next_day = day + datetime.timedelta(days=1)
+            offset = self._offset(next_day)
+            if offset != tzinfos[-1].utcoffset(None):
+                low, high = 0, 24 * 60 * 60
+                while high - low > 1:
+                    middle = (low + high) // 2
+                    if self._offset(day + datetime.timedelta(seconds=middle)) == offset:
+                        high = middle
+                    else:
+                        low = middle
+                starts.append(day + datetime.timedelta(seconds=high))
+                tzinfos.append(datetime.timezone(offset))
+            day = next_day
+        self._years[year] = (starts, tzinfos)
+        return starts, tzinfos
+
+    def tzinfo_at(self, utc_time):
+        """Returns the fixed offset tzinfo in effect in the zone at the naive UTC time."""
+        try:
+            starts, tzinfos = self._years[utc_time.year]
+        except KeyError:
+            starts, tzinfos = self._load_year(utc_time.year)
+        return tzinfos[bisect.bisect_right(starts, utc_time) - 1]
+
+    def to_local(self, utc_time):
+        """Returns the aware local time of the naive UTC time."""
+        tzinfo = self.tzinfo_at(utc_time)
+        return (utc_time + tzinfo.utcoffset(None)).replace(tzinfo=tzinfo)
+
+    def to_utc(self, local_time):
+        """Returns the naive UTC time of the naive local time. Times skipped by a DST transition are moved forward."""
+        return local_time.replace(tzinfo=self.zone).astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+    def local_times(self, start_time, end_time):
+        return {
+            "local_start_time": str(self.to_local(start_time)),
+            "local_end_time": str(self.to_local(end_time))
+        }
+
+
+@functools.lru_cache(maxsize=None)
+def _offset_table(key):
+    return OffsetTable(key)
+
+
+def offset_table(key):
+    """Returns the cached `OffsetTable` of the zone, raising ValueError for an unknown zone."""
+    try:
+        return _offset_table(key)
+    except (zoneinfo.ZoneInfoNotFoundError, ValueError, TypeError):
+        raise ValueError("Unknown timezone {!r}".format(key))
+
+
+def user_timezone(user):
+    """Returns the timezone of the user's profile, or UTC for anonymous users and users without a profile."""
+    profile = getattr(user, 'profile', None)
+    return profile.timezone if profile is not None else UTC
+
+
+def requested_offset_table(request):
+    """Returns the `OffsetTable` of the `tz` query parameter or else of the logged in user, or None for UTC.
+
+    """
+    key = request.query_params.get('tz') or user_timezone(request.user)
+    return None if key == UTC else offset_table(key)
+
+
+def parse_timestamp(value, key=UTC):
+    """Parses a timestamp sent by a client into a naive UTC time.
+
+    Timestamps ending with Z are in UTC, the ones with an offset are converted with it, and the ones without are read
+    in the zone `key`. Raises ValueError for anything else, including values which are not strings.
+
+    """
+    if not isinstance(value, str):
+        raise ValueError(value)
+    if value.endswith('Z'):
+        return datetime.datetime.strptime(value, TIMESTAMP_FORMAT)
+    parsed = datetime.datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        return (parsed - parsed.utcoffset()).replace(tzinfo=None)
+    if key == UTC:
+        return parsed
+    return offset_table(key).to_utc(parsed)
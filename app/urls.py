@@ -1,8 +1,16 @@
-from django.contrib import admin
+from django.apps import apps
 from django.urls import include, path
 
+from calender_mgmt.views import BatchView
+
 urlpatterns = [
-    path('admin/', admin.site.urls),
+    path('batch/', BatchView.as_view(), name='batch'),
     path('calender/', include(('calender_mgmt.urls', 'calender_mgmt'), namespace="calender_mgmt")),
     path('user/', include(('user_mgmt.urls', 'user_mgmt'), namespace="user_mgmt"))
 ]
+
+# The admin site is left out of the API-only settings profile, so it is only imported when it is installed.
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -0,0 +1,59 @@
+"""
+Benchmarks of the application.
+
+Every benchmark is a module which can be run from the root of the repository, e.g.
+
+    python -m benchmarks.connections
+
+They run against a throw-away test database created from the configured one, so they can be pointed at Postgres by
+setting DATABASE_URL, and never touch the data of the configured database.
+"""
+
+import contextlib
+import os
+import tempfile
+import time
+
+import django
+
+
+def setup():
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+    django.setup()
+
+
+@contextlib.contextmanager
+def test_database(on_disk=True):
+    """Creates a migrated test database for the duration of the benchmark.
+
+    SQLite test databases are kept in memory by Django. `on_disk` puts them in a temporary file instead, which is
+    needed to measure connection handling and to use the database from several threads or processes.
+
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    directory = None
+    if on_disk and connection.vendor == 'sqlite':
+        directory = tempfile.TemporaryDirectory()
+        connection.settings_dict['TEST']['NAME'] = os.path.join(directory.name, 'benchmark.sqlite3')
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        teardown_test_environment()
+        if directory is not None:
+            directory.cleanup()
+
+
+class Timer:
+    """Context manager measuring the wall clock time of its block in seconds."""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.elapsed = time.perf_counter() - self.start
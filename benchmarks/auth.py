@@ -0,0 +1,55 @@
+"""
+Measures the login and registration throughput of a single core.
+
+    python -m benchmarks.auth
+    PASSWORD_PBKDF2_ITERATIONS=100000 python -m benchmarks.auth
+    PASSWORD_HASHER=argon2 python -m benchmarks.auth
+
+The requests go through the full Django stack in one process, so the results are per core. Almost all of the time
+goes into hashing the password, which makes PASSWORD_HASHER and PASSWORD_PBKDF2_ITERATIONS the settings to tune.
+"""
+
+import argparse
+
+from . import Timer, setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=50)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.hashers import get_hasher
+    from django.test import Client
+    from django.urls import reverse
+
+    with test_database(on_disk=False):
+        client = Client()
+        hasher = get_hasher()
+        summary = hasher.safe_summary(hasher.encode('password', hasher.salt()))
+        print("Hasher: {}".format(', '.join(
+            "{}={}".format(key, value) for key, value in summary.items() if key not in ('salt', 'hash')
+        )))
+
+        with Timer() as timer:
+            for number in range(args.requests):
+                data = {'email': 'user{}@mail.com'.format(number), 'password': 'password'}
+                response = client.post(reverse('user_mgmt:register'), data, content_type='application/json')
+                assert response.status_code == 201, response.content
+        print("Registration: {:8.1f} requests/s per core, {:.2f} ms/request".format(
+            args.requests / timer.elapsed, timer.elapsed / args.requests * 1000
+        ))
+
+        with Timer() as timer:
+            for number in range(args.requests):
+                data = {'username': 'user{}@mail.com'.format(number), 'password': 'password'}
+                response = client.post(reverse('user_mgmt:login'), data, content_type='application/json')
+                assert response.status_code == 200, response.content
+        print("Login:        {:8.1f} requests/s per core, {:.2f} ms/request".format(
+            args.requests / timer.elapsed, timer.elapsed / args.requests * 1000
+        ))
+
+
+if __name__ == '__main__':
+    main()
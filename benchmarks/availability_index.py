@@ -0,0 +1,85 @@
+"""
+Measures the memory footprint of the availability index and the time of its window queries.
+
+    python -m benchmarks.availability_index
+    python -m benchmarks.availability_index --hosts 2000 --slots 200 --window-hours 8
+
+Every user gets `--slots` free hourly slots starting tomorrow. The index is loaded with all of them, and the memory it
+allocates is traced to give the cost per user and per slot, which sizes AVAILABILITY_INDEX_MAX_HOSTS for the memory
+of a worker. The time of listing the slots in a window of `--window-hours` is then compared between the index and the
+database query the view runs without it.
+"""
+
+import argparse
+import datetime
+import random
+import tracemalloc
+
+from . import Timer, setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=500)
+    parser.add_argument('--slots', type=int, default=100)
+    parser.add_argument('--window-hours', type=int, default=8)
+    parser.add_argument('--queries', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+
+    from calender_mgmt.availability import AvailabilityIndex
+    from calender_mgmt.models import CalenderSlot
+
+    with test_database(on_disk=False):
+        User.objects.bulk_create(
+            User(username='host{}@mail.com'.format(number), email='host{}@mail.com'.format(number))
+            for number in range(args.hosts)
+        )
+        host_ids = list(User.objects.values_list('id', flat=True))
+        first_start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+        for host_id in host_ids:
+            CalenderSlot.objects.bulk_create(
+                CalenderSlot(
+                    belongs_to_id=host_id,
+                    start_time=first_start + datetime.timedelta(hours=hour),
+                    end_time=first_start + datetime.timedelta(hours=hour + 1)
+                )
+                for hour in range(args.slots)
+            )
+
+        index = AvailabilityIndex(max_hosts=args.hosts)
+        index.free_slots(host_ids[0])
+        index.clear()
+        tracemalloc.start()
+        for host_id in host_ids:
+            index.free_slots(host_id)
+        allocated, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print("Index of {} users with {} slots each: {:.2f} MiB, {:.1f} KiB per user, {:.1f} bytes per slot".format(
+            args.hosts, args.slots, allocated / 2 ** 20, allocated / args.hosts / 2 ** 10,
+            allocated / (args.hosts * args.slots)
+        ))
+
+        windows = []
+        for _ in range(args.queries):
+            start = first_start + datetime.timedelta(hours=random.randrange(args.slots))
+            windows.append((random.choice(host_ids), start, start + datetime.timedelta(hours=args.window_hours)))
+
+        with Timer() as index_timer:
+            for host_id, start, end in windows:
+                index.free_slots(host_id, start, end)
+        with Timer() as database_timer:
+            for host_id, start, end in windows:
+                list(
+                    CalenderSlot.objects.upcoming().filter(belongs_to_id=host_id, seats_available__gt=0)
+                    .starting_between(start, end).order_by('start_time')
+                    .values_list('id', 'start_time', 'end_time', 'capacity', 'seats_available')
+                )
+        for label, timer in (('index', index_timer), ('database', database_timer)):
+            print("{:>8}: {:8.1f} us per window query".format(label, timer.elapsed / args.queries * 1e6))
+
+
+if __name__ == '__main__':
+    main()
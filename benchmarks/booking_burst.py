@@ -0,0 +1,107 @@
+"""
+Measures a burst of bookings from parallel threads, each booking in its own transaction against group commit.
+
+    python -m benchmarks.booking_burst
+    python -m benchmarks.booking_burst --slots 4000 --threads 32 --window-ms 2
+
+A user opens `--slots` slots, which `--threads` threads book at once, like the threads of a worker during a booking
+stampede. Every slot is requested twice, so half of the bookings fail on a full slot. The `single` run commits every
+booking in its own transaction, the `group` run with BOOKING_GROUP_COMMIT, which commits the bookings of the threads
+within `--window-ms` of each other in one transaction. Both runs must end with every slot booked once. The database is
+kept on disk, so that every commit waits for its fsync as in production.
+"""
+
+import argparse
+import datetime
+import itertools
+import threading
+
+from . import Timer, setup, test_database
+
+
+def burst(slots, threads):
+    """Books every slot twice from the threads, returning the time taken and the number of busy retries."""
+    from django.db import IntegrityError, OperationalError, connection
+
+    from calender_mgmt.group_commit import book_slot
+
+    requests = iter([slot for slot in slots for _ in range(2)])
+    lock = threading.Lock()
+    retries = []
+
+    def run():
+        retried = 0
+        try:
+            while True:
+                with lock:
+                    slot = next(requests, None)
+                if slot is None:
+                    break
+                while True:
+                    try:
+                        book_slot(slot, None, "Benchmark")
+                    except IntegrityError:
+                        pass
+                    except OperationalError:
+                        # The database was locked by the other threads for longer than its timeout.
+                        retried += 1
+                        continue
+                    break
+        finally:
+            retries.append(retried)
+            connection.close()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    with Timer() as timer:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return timer.elapsed, sum(retries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slots', type=int, default=2000)
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--window-ms', type=float, default=2)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import override_settings
+
+    from calender_mgmt.models import CalenderSlot, SlotBooking
+
+    with test_database() as connection:
+        if connection.vendor == 'sqlite':
+            # Takes the write lock when a transaction starts, so that the threads wait for each other instead of
+            # failing to upgrade their read locks.
+            connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+            connection.close()
+        host = User.objects.create_user(username='host@mail.com', email='host@mail.com', password='password')
+        start_times = (
+            datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=1, hours=hour)
+            for hour in itertools.count()
+        )
+        for label, enabled in (('single', False), ('group', True)):
+            CalenderSlot.objects.bulk_create(
+                CalenderSlot(belongs_to=host, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1))
+                for start_time in itertools.islice(start_times, args.slots)
+            )
+            slots = list(CalenderSlot.objects.select_related('belongs_to').filter(is_booked=False).order_by('id'))
+            group_commit = dict(
+                settings.BOOKING_GROUP_COMMIT, ENABLED=enabled, WINDOW_MS=args.window_ms, MAX_BATCH=args.threads
+            )
+            with override_settings(BOOKING_GROUP_COMMIT=group_commit):
+                elapsed, retries = burst(slots, args.threads)
+            bookings = SlotBooking.objects.filter(slot__in=slots).count()
+            assert bookings == args.slots, "{} bookings of {} slots".format(bookings, args.slots)
+            print("{:>8}: {} bookings committed by {} threads in {:.2f} s, {:.0f} bookings/s, {} retries".format(
+                label, bookings, args.threads, elapsed, bookings / elapsed, retries
+            ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Measures provisioning the slots of many users from a schedule template, in one process and in a pool of processes.
+
+    python -m benchmarks.bulk_provisioning
+    python -m benchmarks.bulk_provisioning --users 10000 --workers 8
+
+Two groups of `--users` users get two weeks of working hours, one group by `provision_slots --workers 1` and the
+other by `--workers`, which reports the slots and users provisioned per second. A fifth of the users have a slot in
+the schedule already, which is skipped along with the slots it overlaps. The worker processes are forked, so that
+they use the test database of this process. SQLite serializes the writes of the workers, so point DATABASE_URL to
+Postgres to measure the scaling of the writes with the cores.
+"""
+
+import argparse
+import datetime
+import io
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+
+from . import setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--chunk-size', type=int, default=100)
+    args = parser.parse_args()
+    if multiprocessing.get_start_method() != 'fork':
+        sys.exit("The worker processes must be forked to use the test database of the benchmark.")
+
+    setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+
+    from calender_mgmt.models import CalenderSlot
+
+    template = {'days': ['mon', 'tue', 'wed', 'thu', 'fri'], 'start': "09:00", 'end': "17:00"}
+    first_day = datetime.date.today() + datetime.timedelta(days=1)
+    with test_database() as connection, tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite':
+            # Makes the workers wait for the write lock instead of failing to upgrade their read locks.
+            connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=60)
+            connection.close()
+        template_path = os.path.join(directory, 'template.json')
+        with open(template_path, 'w') as template_file:
+            json.dump(template, template_file)
+        for label, workers in (('1 worker', 1), ('{} workers'.format(args.workers), args.workers)):
+            users = User.objects.bulk_create(
+                User(username='{}-user{}@mail.com'.format(workers, number)) for number in range(args.users)
+            )
+            start_time = datetime.datetime.combine(first_day, datetime.time(10, 30))
+            CalenderSlot.objects.bulk_create(
+                CalenderSlot(belongs_to=user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1))
+                for user in users[::5]
+            )
+            users_path = os.path.join(directory, 'users{}.txt'.format(workers))
+            with open(users_path, 'w') as users_file:
+                users_file.writelines(user.username + '\n' for user in users)
+            stdout = io.StringIO()
+            call_command(
+                'provision_slots', template_path, '--users-file', users_path, '--start-date', first_day.isoformat(),
+                '--days', '14', '--workers', str(workers), '--chunk-size', str(args.chunk_size), stdout=stdout
+            )
+            print("{:>10}: {}".format(label, stdout.getvalue().splitlines()[0]))
+
+
+if __name__ == '__main__':
+    main()
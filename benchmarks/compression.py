@@ -0,0 +1,80 @@
+"""
+Measures the bandwidth saved and the CPU spent by the compression of the responses.
+
+    python -m benchmarks.compression
+    python -m benchmarks.compression --slots 500 --requests 2000
+
+A user gets `--slots` free hourly slots, and their available slots are requested `--requests` times through the
+middleware, uncompressed, with gzip at several levels and with brotli when it is installed. Every line gives the bytes
+sent per response and the CPU time per request, first with every response compressed, then with the availability
+index, which keeps the compressed listing along with the slots of the user.
+"""
+
+import argparse
+import datetime
+import time
+
+from . import setup, test_database
+
+
+def measure(client, url, requests, accept_encoding):
+    """Returns the size of the response and the CPU seconds per request."""
+    client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+    started = time.process_time()
+    for _ in range(requests):
+        response = client.get(url, HTTP_ACCEPT_ENCODING=accept_encoding)
+    return len(response.content), (time.process_time() - started) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--slots', type=int, default=200)
+    parser.add_argument('--requests', type=int, default=1000)
+    args = parser.parse_args()
+
+    setup()
+    from django.conf import settings
+    from django.contrib.auth.models import User
+    from django.test import Client, override_settings
+    from django.urls import reverse
+
+    from app.compression import brotli
+    from calender_mgmt.availability import availability_index
+    from calender_mgmt.models import CalenderSlot
+
+    variants = [('identity', 'identity', {})] + [
+        ('gzip -{}'.format(level), 'gzip', {'GZIP_LEVEL': level}) for level in (1, 6, 9)
+    ]
+    if brotli is not None:
+        variants += [('br -{}'.format(quality), 'br', {'BROTLI_QUALITY': quality}) for quality in (1, 4, 11)]
+
+    with test_database(on_disk=False), override_settings(ALLOWED_HOSTS=['*']):
+        host = User.objects.create(username='host@mail.com', email='host@mail.com')
+        first_start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+        CalenderSlot.objects.bulk_create(
+            CalenderSlot(
+                belongs_to=host, start_time=first_start + datetime.timedelta(hours=hour),
+                end_time=first_start + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(args.slots)
+        )
+        client = Client()
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': host.id})
+        for index_enabled in (False, True):
+            print("Availability index {}:".format("enabled" if index_enabled else "disabled"))
+            baseline = None
+            for label, accept_encoding, options in variants:
+                availability_index.clear()
+                with override_settings(
+                    AVAILABILITY_INDEX=dict(settings.AVAILABILITY_INDEX, ENABLED=index_enabled),
+                    RESPONSE_COMPRESSION=dict(settings.RESPONSE_COMPRESSION, ENABLED=True, **options)
+                ):
+                    size, cpu = measure(client, url, args.requests, accept_encoding)
+                baseline = baseline or cpu
+                print("{:>10}: {:7d} bytes per response, {:7.1f} us CPU per request ({:+.1f} us)".format(
+                    label, size, cpu * 1e6, (cpu - baseline) * 1e6
+                ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Measures the cost of opening a database connection on every request against reusing persistent connections.
+
+    python -m benchmarks.connections --requests 2000
+
+Each request lists the available slots of a user through the full Django stack, once with CONN_MAX_AGE set to 0,
+the Django default which closes the connection at the end of every request, and once with persistent connections.
+The difference is the connection setup cost that persistent connections remove from the request path. It is small
+with SQLite and large with Postgres, so point DATABASE_URL to the production database server to get real numbers.
+"""
+
+import argparse
+import datetime
+import io
+import wsgiref.util
+
+from . import Timer, setup, test_database
+
+
+def measure_connect(connection, repeat):
+    with Timer() as timer:
+        for _ in range(repeat):
+            connection.close()
+            connection.ensure_connection()
+    return timer.elapsed / repeat
+
+
+def get(application, url):
+    """Sends a request through the WSGI handler, which unlike the test client closes the connections like gunicorn."""
+    environ = {'PATH_INFO': url, 'REQUEST_METHOD': 'GET', 'wsgi.input': io.BytesIO()}
+    wsgiref.util.setup_testing_defaults(environ)
+    statuses = []
+    result = application(environ, lambda status, headers: statuses.append(status))
+    try:
+        b''.join(result)
+    finally:
+        result.close()
+    return statuses[0]
+
+
+def measure_requests(connection, application, url, conn_max_age, requests):
+    from django.db.backends.signals import connection_created
+
+    opened = []
+
+    def count_connection(sender, **kwargs):
+        opened.append(sender)
+
+    connection.close()
+    connection.settings_dict['CONN_MAX_AGE'] = conn_max_age
+    connection_created.connect(count_connection)
+    try:
+        with Timer() as timer:
+            for _ in range(requests):
+                status = get(application, url)
+                assert status.startswith('200'), status
+    finally:
+        connection_created.disconnect(count_connection)
+    return timer.elapsed, len(opened)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--connects', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from django.core.wsgi import get_wsgi_application
+    from django.urls import reverse
+
+    from calender_mgmt.models import CalenderSlot
+
+    with test_database() as connection:
+        user = User.objects.create_user(username='host@mail.com', email='host@mail.com', password='password')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        CalenderSlot.objects.bulk_create(
+            CalenderSlot(
+                belongs_to=user,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(10)
+        )
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': user.id})
+        application = get_wsgi_application()
+        get(application, url)
+
+        print("Database: {} ({})".format(connection.vendor, connection.settings_dict['NAME']))
+        print("Connection setup: {:.3f} ms".format(measure_connect(connection, args.connects) * 1000))
+        results = {}
+        for label, conn_max_age in (('per request', 0), ('persistent', 600)):
+            elapsed, opened = measure_requests(connection, application, url, conn_max_age, args.requests)
+            results[label] = elapsed
+            print("{:>12}: {:8.1f} requests/s, {:.3f} ms/request, {} connections opened".format(
+                label, args.requests / elapsed, elapsed / args.requests * 1000, opened
+            ))
+        saved = (results['per request'] - results['persistent']) / args.requests
+        print("Saved per request: {:.3f} ms".format(saved * 1000))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Measures booking the seats of a group slot from parallel threads, with the seat counter against locking and counting.
+
+    python -m benchmarks.seat_contention
+    python -m benchmarks.seat_contention --seats 1000 --threads 32
+
+Every thread books seats of the same slot, each in its own transaction, until the slot is full. The `counter` run
+books through `SlotBooking`, which takes a seat with one conditional `UPDATE` of the slot row. The `count` run locks
+the slot row with `SELECT ... FOR UPDATE`, counts its bookings and inserts one if a seat is left, which is what a
+booking costs without the counter. Both runs must end with exactly `--seats` bookings. SQLite serializes the writes
+of the threads, so point DATABASE_URL to Postgres to measure the row contention itself.
+"""
+
+import argparse
+import datetime
+import threading
+
+from . import Timer, setup, test_database
+
+
+def book_with_counter(slot):
+    from django.db import IntegrityError, transaction
+
+    from calender_mgmt.models import SlotBooking
+
+    try:
+        with transaction.atomic():
+            SlotBooking.objects.create(slot=slot, description="Benchmark")
+    except IntegrityError:
+        return False
+    return True
+
+
+def book_with_count(slot):
+    from django.db import transaction
+
+    from calender_mgmt.models import CalenderSlot, SlotBooking
+
+    with transaction.atomic():
+        locked_slot = CalenderSlot.objects.select_for_update().get(id=slot.id)
+        if SlotBooking.objects.filter(slot_id=slot.id).count() >= locked_slot.capacity:
+            return False
+        SlotBooking.objects.bulk_create([SlotBooking(slot_id=slot.id, description="Benchmark")])
+    return True
+
+
+def fill(slot, book, threads):
+    """Books the slot from the threads until it is full, returning the time taken and the number of busy retries."""
+    from django.db import OperationalError, connection
+
+    retries = []
+
+    def run():
+        retried = 0
+        try:
+            while True:
+                try:
+                    if not book(slot):
+                        break
+                except OperationalError:
+                    # The database was locked by the other threads for longer than its timeout.
+                    retried += 1
+        finally:
+            retries.append(retried)
+            connection.close()
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    with Timer() as timer:
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+    return timer.elapsed, sum(retries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seats', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=16)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+
+    from calender_mgmt.models import CalenderSlot, SlotBooking
+
+    with test_database() as connection:
+        if connection.vendor == 'sqlite':
+            # Takes the write lock when a transaction starts, so that the threads wait for each other instead of
+            # failing to upgrade their read locks.
+            connection.settings_dict['OPTIONS'].update(transaction_mode='IMMEDIATE', timeout=30)
+            connection.close()
+        host = User.objects.create_user(username='host@mail.com', email='host@mail.com', password='password')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        for label, book in (('counter', book_with_counter), ('count', book_with_count)):
+            slot = CalenderSlot.objects.select_related('belongs_to').get(id=CalenderSlot.objects.create(
+                belongs_to=host, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1),
+                capacity=args.seats
+            ).id)
+            start_time += datetime.timedelta(hours=1)
+            elapsed, retries = fill(slot, book, args.threads)
+            bookings = SlotBooking.objects.filter(slot=slot).count()
+            assert bookings == args.seats, "{} bookings of {} seats".format(bookings, args.seats)
+            print("{:>8}: {} seats booked by {} threads in {:.2f} s, {:.0f} bookings/s, {:.0f} us per booking, "
+                  "{} retries".format(
+                      label, bookings, args.threads, elapsed, bookings / elapsed, elapsed / bookings * 1e6, retries
+                  ))
+
+
+if __name__ == '__main__':
+    main()
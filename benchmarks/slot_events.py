@@ -0,0 +1,62 @@
+"""
+Measures the memory of the idle slot event streams and the time of fanning an event out to them.
+
+    python -m benchmarks.slot_events
+    python -m benchmarks.slot_events --streams 10000 --hosts 100
+
+Opens `--streams` event streams spread over `--hosts` users on one event loop, as an ASGI worker would, and traces
+the memory they allocate while idle. Then publishes events of one user from another thread, like a booking request,
+and times how long it takes until every stream of that user has read the event.
+"""
+
+import argparse
+import asyncio
+import threading
+import tracemalloc
+
+from . import Timer, setup
+
+
+async def run(args):
+    from calender_mgmt.events import event_stream, get_broker
+
+    broker = get_broker()
+    tracemalloc.start()
+    streams = [event_stream(number % args.hosts) for number in range(args.streams)]
+    await asyncio.gather(*(anext(stream) for stream in streams))
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print("{} idle streams: {:.2f} MiB, {:.2f} KiB per stream".format(
+        args.streams, allocated / 2 ** 20, allocated / args.streams / 2 ** 10
+    ))
+
+    followers = streams[::args.hosts]
+    with Timer() as timer:
+        for _ in range(args.events):
+            reads = asyncio.gather(*(anext(stream) for stream in followers))
+            publisher = threading.Thread(
+                target=broker.publish, args=(0, {'event': 'booked', 'slot_ids': [1]})
+            )
+            publisher.start()
+            await reads
+            publisher.join()
+    print("Fan out to the {} streams of a user: {:.1f} us per event".format(
+        len(followers), timer.elapsed / args.events * 1e6
+    ))
+    for stream in streams:
+        await stream.aclose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--streams', type=int, default=5000)
+    parser.add_argument('--hosts', type=int, default=50)
+    parser.add_argument('--events', type=int, default=200)
+    args = parser.parse_args()
+
+    setup()
+    asyncio.run(run(args))
+
+
+if __name__ == '__main__':
+    main()
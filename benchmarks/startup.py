@@ -0,0 +1,120 @@
+"""
+Compares the cold start and the per-request middleware cost of the settings profiles.
+
+    python -m benchmarks.startup
+    python -m benchmarks.startup --profiles app.settings app.settings_api --top 15
+
+For every profile, fresh interpreters load the WSGI application and the URLconf the way a gunicorn worker does before
+serving its first request. The boot time is the median over `--repeat` runs, and one more run under
+`python -X importtime` lists the packages which take the most time to import. Another interpreter then times a
+request through the middleware chain of the profile around an empty view, adding one middleware at a time.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BOOT_SCRIPT = """
+import time
+start = time.perf_counter()
+from app.wsgi import application
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(time.perf_counter() - start)
+"""
+
+
+def run_profile(profile, *args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=profile)
+    return subprocess.run(
+        [sys.executable, *args], env=env, capture_output=True, text=True, check=True
+    )
+
+
+def measure_boot(profile, repeat):
+    return statistics.median(float(run_profile(profile, '-c', BOOT_SCRIPT).stdout) for _ in range(repeat))
+
+
+def measure_imports(profile):
+    """Returns the import time in microseconds spent in every top-level package, slowest first."""
+    stderr = run_profile(profile, '-X', 'importtime', '-c', BOOT_SCRIPT).stderr
+    packages = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_time, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(self_time)
+    return sorted(((self_time, package) for package, self_time in packages.items()), reverse=True)
+
+
+def measure_middleware(requests):
+    """Prints the time of a request through every prefix of the middleware chain as JSON, in microseconds."""
+    from django.conf import settings
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.utils.module_loading import import_string
+
+    from . import setup
+
+    setup()
+    factory = RequestFactory()
+
+    def view(request):
+        return HttpResponse(b'[]', content_type='application/json')
+
+    timings = []
+    for count in range(len(settings.MIDDLEWARE) + 1):
+        handler = view
+        for middleware_path in reversed(settings.MIDDLEWARE[:count]):
+            handler = import_string(middleware_path)(handler)
+        request_list = [factory.get('/calender/slot/') for _ in range(requests)]
+        start = time.perf_counter()
+        for request in request_list:
+            handler(request)
+        timings.append((time.perf_counter() - start) / requests * 1e6)
+    print(json.dumps({'middleware': list(settings.MIDDLEWARE), 'timings': timings}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--profiles', nargs='+', default=['app.settings', 'app.settings_api'])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--requests', type=int, default=5000)
+    parser.add_argument('--measure-middleware', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure_middleware:
+        measure_middleware(args.requests)
+        return
+
+    for profile in args.profiles:
+        print("== {}".format(profile))
+        print("Boot time: {:.1f} ms (median of {} runs)".format(measure_boot(profile, args.repeat) * 1000, args.repeat))
+
+        imports = measure_imports(profile)
+        print("Import time: {:.1f} ms in total over {} packages, slowest ones:".format(
+            sum(self_time for self_time, _ in imports) / 1000, len(imports)
+        ))
+        for self_time, package in imports[:args.top]:
+            print("  {:8.1f} ms  {}".format(self_time / 1000, package))
+
+        result = json.loads(run_profile(
+            profile, '-m', 'benchmarks.startup', '--measure-middleware', '--requests', str(args.requests)
+        ).stdout)
+        timings = result['timings']
+        print("Middleware: {:.1f} us per request on top of the view ({:.1f} us)".format(
+            timings[-1] - timings[0], timings[0]
+        ))
+        for index, middleware_path in enumerate(result['middleware'], start=1):
+            print("  {:8.1f} us  {}".format(timings[index] - timings[index - 1], middleware_path))
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""
+Measures the availability and the host assignment of a large team.
+
+    python -m benchmarks.team_scheduling
+    python -m benchmarks.team_scheduling --members 500 --slots 100
+
+Every member of the team gets `--slots` hourly slots starting tomorrow at a random hour, and a fifth of them is
+booked. The free times of the team are listed from the database and from the availability index, and compared with
+reading the available slots of every member on their own and merging them with `heapq.merge`.
+The least loaded member free at a time is then picked from the maintained booking counters, and compared with
+counting the future bookings of the members in the query.
+"""
+
+import argparse
+import datetime
+import heapq
+import io
+import random
+
+from . import Timer, setup, test_database
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--members', type=int, default=200)
+    parser.add_argument('--slots', type=int, default=50)
+    parser.add_argument('--queries', type=int, default=100)
+    args = parser.parse_args()
+
+    setup()
+    from django.contrib.auth.models import User
+    from django.core.management import call_command
+    from django.db.models import Count, OuterRef, Q, Subquery
+    from django.test.utils import override_settings
+    from django.utils import timezone
+
+    from calender_mgmt.availability import availability_index
+    from calender_mgmt.models import CalenderSlot, SlotBooking
+    from calender_mgmt.teams import assignable_slots, team_free_times
+
+    with test_database(on_disk=False):
+        User.objects.bulk_create(
+            User(username='member{}@mail.com'.format(number), email='member{}@mail.com'.format(number))
+            for number in range(args.members)
+        )
+        member_ids = list(User.objects.values_list('id', flat=True))
+        first_start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=1)
+        for member_id in member_ids:
+            offset = random.randrange(24)
+            CalenderSlot.objects.bulk_create(
+                CalenderSlot(
+                    belongs_to_id=member_id,
+                    start_time=first_start + datetime.timedelta(hours=offset + hour),
+                    end_time=first_start + datetime.timedelta(hours=offset + hour + 1),
+                    seats_available=0 if hour % 5 == 0 else 1, is_booked=hour % 5 == 0
+                )
+                for hour in range(args.slots)
+            )
+        SlotBooking.objects.bulk_create(
+            SlotBooking(slot_id=slot_id, description="Benchmark")
+            for slot_id in CalenderSlot.objects.filter(is_booked=True).values_list('id', flat=True)
+        )
+        call_command('check_slot_counters', repair=True, stdout=io.StringIO())
+
+        with Timer() as database_timer:
+            for _ in range(args.queries):
+                times = team_free_times(member_ids)
+        with Timer() as merge_timer:
+            for _ in range(args.queries):
+                merged = heapq.merge(*(
+                    CalenderSlot.objects.available().filter(belongs_to_id=member_id).order_by('start_time')
+                    .values_list('start_time', 'end_time')
+                    for member_id in member_ids
+                ))
+                assert len(set(merged)) == len(times)
+        with override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': args.members}):
+            availability_index.clear()
+            team_free_times(member_ids)
+            with Timer() as index_timer:
+                for _ in range(args.queries):
+                    team_free_times(member_ids)
+        print("Free times of {} members ({} times):".format(args.members, len(times)))
+        for label, timer in (('database', database_timer), ('index', index_timer), ('per member', merge_timer)):
+            print("{:>10}: {:8.2f} ms per listing".format(label, timer.elapsed / args.queries * 1e3))
+
+        start_times = [random.choice(times)[0] for _ in range(args.queries)]
+        future_bookings = SlotBooking.objects.filter(
+            slot__belongs_to_id=OuterRef('belongs_to_id'), slot__start_time__gt=timezone.now()
+        ).order_by().values('slot__belongs_to_id').annotate(count=Count('id')).values('count')
+        with Timer() as counter_timer:
+            for start_time in start_times:
+                assignable_slots(member_ids, start_time)
+        with Timer() as count_timer:
+            for start_time in start_times:
+                list(
+                    CalenderSlot.objects.available().filter(Q(belongs_to_id__in=member_ids), start_time=start_time)
+                    .select_related('belongs_to').annotate(load=Subquery(future_bookings))
+                    .order_by('load', 'belongs_to_id')
+                )
+        print("Assignment of a member:")
+        for label, timer in (('counters', counter_timer), ('count', count_timer)):
+            print("{:>10}: {:8.2f} ms per booking".format(label, timer.elapsed / args.queries * 1e3))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class CalenderMgmtConfig(AppConfig):
     name = 'calender_mgmt'
+
+    def ready(self):
+        # Connects the receivers which invalidate the availability index, publish the slot events and write the
+        # availability snapshots.
+        from . import availability, events, snapshots
@@ -0,0 +1,354 @@
+"""In-process index of the free future slots of the most recently requested users.
+
+Enabled with the AVAILABILITY_INDEX setting. Every worker process keeps, for up to `MAX_HOSTS` users, the ids, start
+and end times, capacities and seats left of their future slots with seats left in arrays sorted by start time, so
+that the slots of a user in a time window are found by bisection without querying the database. The slots held for
+users on the waitlist are skipped until their hold expires, and so are the slots which the booking rules of the user
+do not allow booking, checked against the full days and the meetings of the user loaded along with the slots. The
+users whose slots were requested least recently are evicted first.
+
+The slots of a user are loaded on their first request, tagged with the version of the user's slots kept in the
+shared cache. Every change to the slots or bookings of a user sends `slots_changed`, which increments that version
+once its transaction has committed, and the workers reload the slots of the user when they find a newer version.
+The cache must therefore be shared between the worker processes, like for the replica pins.
+
+The JSON listings of the slots of a user are kept along with them, per window and timezone, so that the popular users
+are rendered, and compressed by the compression middleware, once per version of their slots. A listing expires when
+the first of its slots starts or becomes too close to book, or when a hold in its window expires.
+
+"""
+import array
+import bisect
+import collections
+import datetime
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from .models import BookingRules, CalenderSlot
+from .signals import slots_changed
+
+EPOCH = datetime.datetime(1970, 1, 1)
+MICROSECOND = datetime.timedelta(microseconds=1)
+
+# Number of rendered listings kept with the slots of a user, for as many windows and timezones.
+MAX_RENDERED = 16
+
+
+def to_microseconds(value):
+    return (value - EPOCH) // MICROSECOND
+
+
+def from_microseconds(value):
+    return EPOCH + datetime.timedelta(microseconds=value)
+
+
+def _version_key(host_id):
+    return "availability-version:{}".format(host_id)
+
+
+def current_version(host_id):
+    """Returns the version of the slots of the user in the shared cache.
+
+    A missing version, on the first request of the user or after the cache evicted it, starts from the current time
+    so that it never matches the version of the slots loaded before the eviction.
+
+    """
+    key = _version_key(host_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, time.time_ns(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def current_versions(host_ids):
+    """Returns the versions of the slots of the users by their id, reading the shared cache once for all of them."""
+    keys = {_version_key(host_id): host_id for host_id in host_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for host_id in host_ids:
+        if host_id not in versions:
+            versions[host_id] = current_version(host_id)
+    return versions
+
+
+def bump_version(host_id):
+    try:
+        cache.incr(_version_key(host_id))
+    except ValueError:
+        current_version(host_id)
+
+
+class HostSlots:
+    """The future slots with seats left of one user, sorted by start time, and the `HostRules` of the user if any, as
+    of `version`.
+
+    """
+    __slots__ = ('version', 'exists', 'rules', 'ids', 'starts', 'ends', 'held', 'capacities', 'seats', 'rendered')
+
+    def __init__(self, version, exists, rows, rules=None):
+        self.version = version
+        self.exists = exists
+        self.rules = rules
+        self.rendered = {}
+        self.ids = array.array('q')
+        self.starts = array.array('q')
+        self.ends = array.array('q')
+        self.held = array.array('q')
+        self.capacities = array.array('q')
+        self.seats = array.array('q')
+        for slot_id, start_time, end_time, held_until, capacity, seats_available in rows:
+            self.ids.append(slot_id)
+            self.starts.append(to_microseconds(start_time))
+            self.ends.append(to_microseconds(end_time))
+            # A hold only covers the last seat of a slot.
+            self.held.append(0 if held_until is None or seats_available > 1 else to_microseconds(held_until))
+            self.capacities.append(capacity)
+            self.seats.append(seats_available)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _bounds(self, after, start, end):
+        first = bisect.bisect_right(self.starts, after)
+        if start is not None:
+            first = max(first, bisect.bisect_left(self.starts, to_microseconds(start)))
+        last = len(self.starts) if end is None else bisect.bisect_left(self.starts, to_microseconds(end))
+        return first, last
+
+    def times(self, after, start=None, end=None):
+        """Returns the (start, end) of the slots of `window` in microseconds, without converting them to datetimes.
+
+        """
+        now = after
+        after = to_microseconds(after)
+        first, last = self._bounds(after, start, end)
+        indexes = [index for index in range(first, last) if self.held[index] <= after]
+        if self.rules is not None:
+            indexes = [index for index in indexes if self.rules.allows(
+                from_microseconds(self.starts[index]), from_microseconds(self.ends[index]), now,
+                self.seats[index] < self.capacities[index]
+            )]
+        return [(self.starts[index], self.ends[index]) for index in indexes]
+
+    def window(self, after, start=None, end=None):
+        """Returns the (id, start time, end time, capacity, seats left) of the slots starting after `after`, and from
+        `start` until `end`, which are not held at `after`.
+
+        """
+        now = after
+        after = to_microseconds(after)
+        first, last = self._bounds(after, start, end)
+        slots = [
+            (
+                self.ids[index], from_microseconds(self.starts[index]), from_microseconds(self.ends[index]),
+                self.capacities[index], self.seats[index]
+            )
+            for index in range(first, last) if self.held[index] <= after
+        ]
+        if self.rules is not None:
+            slots = [
+                (slot_id, start_time, end_time, capacity, seats_available)
+                for slot_id, start_time, end_time, capacity, seats_available in slots
+                if self.rules.allows(start_time, end_time, now, seats_available < capacity)
+            ]
+        return slots
+
+    def expiry(self, after, start, end, slots):
+        """Returns the time until which `window` keeps returning the slots it returned at `after`, when the first of
+        them starts or becomes too close to book, or when a hold in the window expires, or None if that never happens.
+
+        """
+        times = []
+        if slots:
+            times.append(slots[0][1] - (self.rules.notice if self.rules is not None else datetime.timedelta()))
+        first, last = self._bounds(to_microseconds(after), start, end)
+        held = [held_until for held_until in self.held[first:last] if held_until > to_microseconds(after)]
+        if held:
+            times.append(from_microseconds(min(held)))
+        return min(times) if times else None
+
+
+class RenderedSlots:
+    """The listing of the slots of a user and its JSON content, valid until `expires` (if not None), and the
+    compressed variants of the content by encoding, filled by the compression middleware.
+
+    """
+    __slots__ = ('data', 'content', 'expires', 'compressed_content')
+
+    def __init__(self, data, expires):
+        self.data = data
+        self.content = JSONRenderer().render(data)
+        self.expires = expires
+        self.compressed_content = {}
+
+
+class AvailabilityIndex:
+    """Least recently used cache of the `HostSlots` of the users, shared by the threads of the worker.
+
+    """
+    def __init__(self, max_hosts=None):
+        self._max_hosts = max_hosts
+        self._hosts = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def max_hosts(self):
+        return self._max_hosts or settings.AVAILABILITY_INDEX['MAX_HOSTS']
+
+    def __len__(self):
+        return len(self._hosts)
+
+    def clear(self):
+        with self._lock:
+            self._hosts.clear()
+
+    def load(self, versions):
+        """Reads the future slots with seats left and the booking rules of the users, by their id in `versions`, from
+        the primary database, which the replicas may lag behind. The slots of all the users are read in one query.
+
+        """
+        rows = {host_id: [] for host_id in versions}
+        for host_id, *row in (
+            CalenderSlot.objects.using(DEFAULT_DB_ALIAS).upcoming()
+            .filter(belongs_to_id__in=list(versions), seats_available__gt=0)
+            .order_by('belongs_to_id', 'start_time')
+            .values_list('belongs_to_id', 'id', 'start_time', 'end_time', 'held_until', 'capacity', 'seats_available')
+        ):
+            rows[host_id].append(row)
+        users_rules = BookingRules.of_users(list(versions), using=DEFAULT_DB_ALIAS)
+        return {
+            host_id: HostSlots(version, host_id in users_rules, rows[host_id], users_rules.get(host_id))
+            for host_id, version in versions.items()
+        }
+
+    def get_many(self, versions):
+        """Returns the `HostSlots` of the users by their id in `versions`, loading the ones missing or outdated
+        together.
+
+        """
+        found = {}
+        with self._lock:
+            for host_id, version in versions.items():
+                host_slots = self._hosts.get(host_id)
+                if host_slots is not None and host_slots.version == version:
+                    self._hosts.move_to_end(host_id)
+                    found[host_id] = host_slots
+        missing = {host_id: version for host_id, version in versions.items() if host_id not in found}
+        if missing:
+            loaded = self.load(missing)
+            with self._lock:
+                for host_id, host_slots in loaded.items():
+                    self._hosts[host_id] = host_slots
+                    self._hosts.move_to_end(host_id)
+                while len(self._hosts) > self.max_hosts:
+                    self._hosts.popitem(last=False)
+            found.update(loaded)
+        return found
+
+    def get(self, host_id, version=None):
+        if version is None:
+            version = current_version(host_id)
+        return self.get_many({host_id: version})[host_id]
+
+    def free_slots(self, host_id, start=None, end=None):
+        """Returns the free future slots of the user starting from `start` until `end`, or None if the user does not
+        exist.
+
+        """
+        host_slots = self.get(host_id)
+        if not host_slots.exists:
+            return None
+        return host_slots.window(timezone.now(), start, end)
+
+    def rendered_slots(self, host_id, key, render, start=None, end=None):
+        """Returns the `RenderedSlots` of the free future slots of the user starting from `start` until `end`, or
+        None if the user does not exist.
+
+        The listings are made by `render` from the slots and kept with the slots of the user under `key`, which must
+        identify the window and the rendering, until the slots change or the listing expires. At most MAX_RENDERED
+        listings are kept per user.
+
+        """
+        host_slots = self.get(host_id)
+        if not host_slots.exists:
+            return None
+        now = timezone.now()
+        rendered = host_slots.rendered.get(key)
+        if rendered is None or (rendered.expires is not None and rendered.expires <= now):
+            slots = host_slots.window(now, start, end)
+            rendered = RenderedSlots(render(slots), host_slots.expiry(now, start, end, slots))
+            if len(host_slots.rendered) >= MAX_RENDERED:
+                host_slots.rendered.clear()
+            host_slots.rendered[key] = rendered
+        return rendered
+
+    def free_times_of_hosts(self, host_ids, start=None, end=None):
+        """Returns the (start, end) in microseconds of the free future slots of each of the users starting from
+        `start` until `end`, in the order of the users, with the versions of all of them read at once and the users
+        missing from the index loaded together.
+
+        """
+        hosts = self.get_many(current_versions(host_ids))
+        now = timezone.now()
+        return [hosts[host_id].times(now, start, end) for host_id in host_ids]
+
+
+availability_index = AvailabilityIndex()
+
+
+def read_free_slots(host_id, start=None, end=None, using=None):
+    """Reads the free future slots of the user starting from `start` until `end` from the database, as the
+    (id, start time, end time, capacity, seats left) of the slots which the booking rules of the user allow booking,
+    or returns None if the user does not exist.
+
+    """
+    users_rules = BookingRules.of_users([host_id], start, end, using=using)
+    if host_id not in users_rules:
+        return None
+    slots = CalenderSlot.objects.using(using).available().filter(belongs_to_id=host_id)
+    if start is not None:
+        slots = slots.filter(start_time__gte=start)
+    if end is not None:
+        slots = slots.filter(start_time__lt=end)
+    slots = slots.order_by('start_time').values_list('id', 'start_time', 'end_time', 'capacity', 'seats_available')
+    rules = users_rules[host_id]
+    if rules is None:
+        return list(slots)
+    now = timezone.now()
+    return [
+        (slot_id, start_time, end_time, capacity, seats_available)
+        for slot_id, start_time, end_time, capacity, seats_available in slots
+        if rules.allows(start_time, end_time, now, seats_available < capacity)
+    ]
+
+
+def free_slots(host_id, start=None, end=None):
+    """Returns the free future slots of the user from the availability index when it is enabled, or else from the
+    database, or None if the user does not exist.
+
+    """
+    if settings.AVAILABILITY_INDEX['ENABLED']:
+        return availability_index.free_slots(host_id, start, end)
+    return read_free_slots(host_id, start, end)
+
+
+@receiver(slots_changed)
+def invalidate_host_slots(sender, host_id, **kwargs):
+    if settings.AVAILABILITY_INDEX['ENABLED']:
+        bump_version(host_id)
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_host(sender, instance, **kwargs):
+    # The slots of a deleted user are deleted in bulk along with it, without sending `slots_changed`.
+    if settings.AVAILABILITY_INDEX['ENABLED']:
+        bump_version(instance.id)
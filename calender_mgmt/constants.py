@@ -5,7 +5,31 @@ class ResponseMessages:
     CALENDER_SLOT_NOT_FOUND = "Requested calender slot not found!"
     USER_NOT_FOUND = "The requested user id does not exist. Please check again!"
     CALENDER_SLOT_ALREADY_BOOKED = "The requested slot is already booked! Please try another one!"
+    CALENDER_SLOT_SEAT_BOOKED = "You have already booked a seat of the requested slot!"
     CALENDER_SLOT_EXPIRED = "The slot you are trying to book is in the past, please try booking another slot!"
     MISSING_KEY = "Missing key '{}' in the request!"
     REGISTERATION_REQUIRED = "You must be a registered user to perform this activity!"
     BOOKING_NOT_FOUND = "The booking for the requested slot not found!"
+    CALENDER_SLOT_HELD = "The requested slot is held for someone on the waitlist! Please try another one!"
+    INVALID_WAITLIST_WINDOW = "The waitlist window must end after it starts, and in the future!"
+    WAITLIST_ENTRY_NOT_FOUND = "The requested waitlist entry not found!"
+    BATCH_TOO_LARGE = "A batch can contain at most {} requests!"
+    BATCH_PATH_NOT_FOUND = "Only the calender API paths can be requested in a batch!"
+    BATCH_REQUEST_FAILED = "The request failed with a server error!"
+    INVALID_TIMEZONE = "Invalid timezone, please provide an IANA timezone like 'Europe/Berlin'!"
+    SLOT_EVENTS_UNAVAILABLE = "The live slot events are not available on this server, please poll the available slots!"
+    TEAM_NOT_FOUND = "The requested team not found!"
+    TEAM_TIME_UNAVAILABLE = "No member of the team is free at the requested time! Please try another one!"
+    BOOKING_NOTICE_TOO_SHORT = "The host needs more notice before this slot! Please try a later one!"
+    BOOKING_DAY_FULL = "The host has no more bookings left on the day of this slot! Please try another day!"
+    BOOKING_BUFFER_CONFLICT = "This slot is too close to another meeting of the host! Please try another one!"
+    INVALID_PAGE = "Invalid page, please provide a limit between 1 and {} and a cursor from the previous page!"
+
+
+class SlotEvents:
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    BOOKED = "booked"
+    CANCELLED = "cancelled"
+    HELD = "held"
@@ -0,0 +1,158 @@
+"""Live events of the slots of the users, pushed to their booking pages with Server-Sent Events.
+
+Enabled with the SLOT_EVENTS setting. Every change to the slots or bookings of a user sends `slots_changed` once its
+transaction has committed, which is published to the broker of the worker process as a message with the `event`
+(one of `SlotEvents`) and the `slot_ids`. The event stream of a user, served under ASGI only, subscribes to the
+messages of that user and writes them to the client as they come, with a comment every KEEPALIVE_SECONDS so that
+proxies keep the idle connections open. An idle subscriber is a queue and a suspended coroutine, without a thread.
+
+The default `LocalBroker` fans the messages out within the worker process, which is enough with a single worker.
+With more workers, a write and the streams of its user are usually served by different processes, so BROKER must
+name a `Broker` relaying the messages between the workers (e.g. over Redis pub/sub) and delivering them to the local
+subscriptions the same way.
+
+"""
+import abc
+import asyncio
+import collections
+import functools
+import json
+import threading
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from .signals import slots_changed
+
+# Sent instead of the messages a client was too slow to read. The client should reload the available slots.
+RESYNC = {'event': 'resync', 'slot_ids': []}
+
+
+class Subscription:
+    """The queue of the messages of one user for one event stream, read on the event loop it was created on.
+
+    """
+    __slots__ = ('host_id', 'loop', 'queue')
+
+    def __init__(self, host_id, queue_size):
+        self.host_id = host_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(queue_size)
+
+    def deliver(self, message):
+        """Queues the message, replacing the queued messages with `RESYNC` when the queue is full. Runs on the loop.
+
+        """
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(RESYNC)
+
+
+def _deliver(subscriptions, message):
+    for subscription in subscriptions:
+        subscription.deliver(message)
+
+
+class Broker(abc.ABC):
+    """Interface of the brokers, publishing the messages of the users to their subscriptions.
+
+    """
+    @abc.abstractmethod
+    def subscribe(self, host_id, queue_size):
+        """Returns a new `Subscription` to the messages of the user. Called on the event loop of the stream."""
+
+    @abc.abstractmethod
+    def unsubscribe(self, subscription):
+        """Removes the subscription from the broker. Called on the event loop of the stream."""
+
+    @abc.abstractmethod
+    def publish(self, host_id, message):
+        """Publishes the message to the subscriptions of the user. Called from any thread."""
+
+
+class LocalBroker(Broker):
+    """Broker of the subscriptions of the worker process only.
+
+    A message is handed to every event loop with subscriptions of its user in a single callback, so that publishing
+    costs one thread-safe call per loop, however many clients follow the user.
+
+    """
+    def __init__(self):
+        self._subscriptions = collections.defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, host_id, queue_size):
+        subscription = Subscription(host_id, queue_size)
+        with self._lock:
+            self._subscriptions[host_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.host_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.host_id]
+
+    def subscriber_count(self, host_id):
+        with self._lock:
+            return len(self._subscriptions.get(host_id, ()))
+
+    def publish(self, host_id, message):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(host_id, ()))
+        by_loop = collections.defaultdict(list)
+        for subscription in subscriptions:
+            by_loop[subscription.loop].append(subscription)
+        for loop, loop_subscriptions in by_loop.items():
+            try:
+                loop.call_soon_threadsafe(_deliver, loop_subscriptions, message)
+            except RuntimeError:
+                # The loop was closed, and its streams with it.
+                pass
+
+
+@functools.lru_cache(maxsize=None)
+def _load_broker(path):
+    return import_string(path)()
+
+
+def get_broker():
+    """Returns the broker of the worker process, of the class named by the BROKER setting."""
+    return _load_broker(settings.SLOT_EVENTS['BROKER'])
+
+
+def format_event(message):
+    return "event: {}\ndata: {}\n\n".format(message['event'], json.dumps(message))
+
+
+async def event_stream(host_id):
+    """Yields the Server-Sent Events of the user, until the client disconnects.
+
+    Subscribes on the first iteration, on the event loop serving the response.
+
+    """
+    broker = get_broker()
+    subscription = broker.subscribe(host_id, settings.SLOT_EVENTS['QUEUE_SIZE'])
+    try:
+        yield ": connected\n\n"
+        while True:
+            try:
+                message = await asyncio.wait_for(subscription.queue.get(), settings.SLOT_EVENTS['KEEPALIVE_SECONDS'])
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+            else:
+                yield format_event(message)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+@receiver(slots_changed)
+def publish_slot_event(sender, host_id, event, slot_ids, **kwargs):
+    if settings.SLOT_EVENTS['ENABLED']:
+        get_broker().publish(host_id, {'event': event, 'slot_ids': slot_ids})
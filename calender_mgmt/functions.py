@@ -1,15 +1,123 @@
+import base64
+import datetime
 import urllib.parse
 
 def _to_google_timestring(datetime_obj):
     return datetime_obj.strftime("%Y%m%dT%H%M%SZ")
 
-def generate_google_calendar_link(booking_details):
+def _to_outlook_timestring(datetime_obj):
+    return datetime_obj.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def _escape_ics_text(text):
+    return text.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _fold_ics_line(line):
+    """Splits a content line into lines of at most 75 octets, continued with a leading space (RFC 5545, 3.1)."""
+    encoded = line.encode()
+    parts = []
+    while len(encoded) > 75:
+        cut = 75 if not parts else 74
+        # Never cut in the middle of a UTF-8 sequence.
+        while encoded[cut] & 0xC0 == 0x80:
+            cut -= 1
+        parts.append(encoded[:cut].decode())
+        encoded = encoded[cut:]
+    parts.append(encoded.decode())
+    return "\r\n ".join(parts)
+
+def _event_text(host_username, booking_id, description):
+    return "Meeting with {}".format(host_username), "{}\n\nBooking ID: {}".format(description, booking_id)
+
+def generate_google_calendar_link(host_username, booking_id, description, start_time, end_time):
+    title, details = _event_text(host_username, booking_id, description)
     params = {
         'action': "TEMPLATE",
-        'text': "Meeting with {}".format(booking_details.slot.belongs_to.username),
-        'details': "{}\n\nBooking ID: {}".format(booking_details.description, booking_details.id),
-        'dates': "{}/{}".format(
-            _to_google_timestring(booking_details.slot.start_time), _to_google_timestring(booking_details.slot.end_time)
-        )
+        'text': title,
+        'details': details,
+        'dates': "{}/{}".format(_to_google_timestring(start_time), _to_google_timestring(end_time))
     }
     return "https://www.google.com/calendar/render?{}".format(urllib.parse.urlencode(params))
+
+def generate_outlook_calendar_link(host_username, booking_id, description, start_time, end_time):
+    title, details = _event_text(host_username, booking_id, description)
+    params = {
+        'path': "/calendar/action/compose",
+        'rru': "addevent",
+        'subject': title,
+        'body': details,
+        'startdt': _to_outlook_timestring(start_time),
+        'enddt': _to_outlook_timestring(end_time)
+    }
+    return "https://outlook.live.com/calendar/0/deeplink/compose?{}".format(urllib.parse.urlencode(params))
+
+def generate_ics_event(host_username, booking_id, description, start_time, end_time, booked_at):
+    """Returns an iCalendar file with the event of the booking, which any calendar application can import."""
+    title, details = _event_text(host_username, booking_id, description)
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//django-calendly//EN",
+        "BEGIN:VEVENT",
+        "UID:booking-{}@django-calendly".format(booking_id),
+        "DTSTAMP:{}".format(_to_google_timestring(booked_at)),
+        "DTSTART:{}".format(_to_google_timestring(start_time)),
+        "DTEND:{}".format(_to_google_timestring(end_time)),
+        "SUMMARY:{}".format(_escape_ics_text(title)),
+        "DESCRIPTION:{}".format(_escape_ics_text(details)),
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    return "".join(_fold_ics_line(line) + "\r\n" for line in lines)
+
+def generate_calendar_links(host_username, booking_id, description, start_time, end_time, booked_at):
+    """Returns the calendar links and the iCalendar file of a booking, by the names of their `SlotBooking` fields."""
+    event = (host_username, booking_id, description, start_time, end_time)
+    return {
+        'google_calendar_link': generate_google_calendar_link(*event),
+        'outlook_calendar_link': generate_outlook_calendar_link(*event),
+        'ics_event': generate_ics_event(*event, booked_at)
+    }
+
+def encode_booking_cursor(booked_at, booking_id):
+    """Returns the opaque cursor of a page of bookings starting after the given booking."""
+    position = "{}|{}".format(booked_at.isoformat(), booking_id)
+    return base64.urlsafe_b64encode(position.encode()).decode()
+
+def decode_booking_cursor(cursor):
+    """Returns the booking time and id of a cursor, raising ValueError if it is not one."""
+    try:
+        booked_at, booking_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    except (ValueError, UnicodeError):
+        raise ValueError("Invalid cursor {!r}".format(cursor))
+    return datetime.datetime.fromisoformat(booked_at), int(booking_id)
+
+
+def parse_capacity(value):
+    """Returns the number of seats of a slot given in a request, raising ValueError if it is not a positive integer."""
+    try:
+        capacity = int(value) if not isinstance(value, (bool, float)) else 0
+    except TypeError:
+        capacity = 0
+    if capacity < 1:
+        raise ValueError("Invalid capacity {!r}".format(value))
+    return capacity
+
+
+def available_slots_data(available_slots, offsets=None):
+    """Returns the listing of the (id, start time, end time, capacity, seats left) of the available slots, with their
+    local times in the `OffsetTable` if given. Only the group slots list their capacity and seats left.
+
+    """
+    slots_data = []
+    for slot_id, start_time, end_time, capacity, seats_available in available_slots:
+        slot_data = {
+            "id": slot_id,
+            "start_time": str(start_time),
+            "end_time": str(end_time)
+        }
+        if capacity > 1:
+            slot_data.update(capacity=capacity, seats_available=seats_available)
+        if offsets is not None:
+            slot_data.update(offsets.local_times(start_time, end_time))
+        slots_data.append(slot_data)
+    return slots_data
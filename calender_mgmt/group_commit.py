@@ -0,0 +1,124 @@
+"""Group commit of the bookings, for the bursts of bookings when popular users open their slots.
+
+Enabled with the BOOKING_GROUP_COMMIT setting. Every booking otherwise runs in its own transaction, and waits for its
+own commit, i.e. its own fsync, while the others wait for the write lock. With group commit, the bookings requested by
+the threads of a worker process within WINDOW_MS of each other are inserted in one transaction, each in a savepoint of
+its own: a booking of a full slot or against the booking rules of its user rolls back alone, and the others commit
+together. Every request still gets the result of its own booking.
+
+The first request of a group leads it: it waits for the window to pass, or for MAX_BATCH bookings to join, and runs
+the transaction of the group on its own database connection, while the other requests wait for it. There is no
+background thread, and a group is at most as large as the number of threads of a worker, see GUNICORN_THREADS. If the
+transaction of a group fails as a whole, e.g. when its commit fails, every request of the group books its slot again
+in a transaction of its own, but never once the group has committed. The bookings made inside a transaction, like the
+ones of the batch endpoint, are never grouped, since that transaction could still roll them back after the others
+were told.
+
+"""
+import threading
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+
+from .models import SlotBooking
+from .rules import BookingRuleViolation
+
+
+class PendingBooking:
+    """A booking waiting for the transaction of its group, and its result: the booking or the error raised by it.
+
+    """
+    __slots__ = ('slot', 'user', 'description', 'done', 'booking', 'error', 'retry')
+
+    def __init__(self, slot, user, description):
+        self.slot = slot
+        self.user = user
+        self.description = description
+        self.done = threading.Event()
+        self.booking = None
+        self.error = None
+        self.retry = False
+
+
+def _create_booking(slot, user, description):
+    return SlotBooking.objects.create(slot=slot, booked_by=user, description=description)
+
+
+class GroupCommitQueue:
+    """The bookings waiting for the transaction of their group in the worker process.
+
+    """
+    def __init__(self, window_ms=None, max_batch=None):
+        self._window_ms = window_ms
+        self._max_batch = max_batch
+        self._pending = []
+        self._condition = threading.Condition()
+
+    @property
+    def window(self):
+        return (self._window_ms or settings.BOOKING_GROUP_COMMIT['WINDOW_MS']) / 1000
+
+    @property
+    def max_batch(self):
+        return self._max_batch or settings.BOOKING_GROUP_COMMIT['MAX_BATCH']
+
+    def book(self, slot, user, description):
+        """Books a seat of the slot for the user, along with the bookings requested at the same time, and returns the
+        booking. Raises an `IntegrityError` or a `BookingRuleViolation` like `SlotBooking.objects.create`.
+
+        """
+        pending = PendingBooking(slot, user, description)
+        with self._condition:
+            self._pending.append(pending)
+            leader = len(self._pending) == 1
+            if len(self._pending) >= self.max_batch:
+                self._condition.notify_all()
+        if leader:
+            with self._condition:
+                self._condition.wait_for(lambda: len(self._pending) >= self.max_batch, timeout=self.window)
+                group, self._pending = self._pending, []
+            self.commit(group)
+        pending.done.wait()
+        if pending.retry:
+            with transaction.atomic():
+                return _create_booking(slot, user, description)
+        if pending.error is not None:
+            raise pending.error
+        return pending.booking
+
+    def commit(self, group):
+        """Inserts the bookings of the group in one transaction, a savepoint each, and hands their results over."""
+        committed = []
+        try:
+            with transaction.atomic():
+                # Runs first of the callbacks of the group once it has committed.
+                transaction.on_commit(lambda: committed.append(True))
+                for pending in group:
+                    try:
+                        with transaction.atomic():
+                            pending.booking = _create_booking(pending.slot, pending.user, pending.description)
+                    except (IntegrityError, BookingRuleViolation) as error:
+                        pending.error = error
+        except Exception:
+            # Only the bookings of a group which did not commit are booked again. A callback failing after the commit
+            # leaves the results of the group as they are.
+            if not committed:
+                for pending in group:
+                    pending.retry = True
+        finally:
+            for pending in group:
+                pending.done.set()
+
+
+booking_queue = GroupCommitQueue()
+
+
+def book_slot(slot, user, description):
+    """Books a seat of the slot for the user in a transaction of its own, or of its group with group commit, and
+    returns the booking.
+
+    """
+    if settings.BOOKING_GROUP_COMMIT['ENABLED'] and not connection.in_atomic_block:
+        return booking_queue.book(slot, user, description)
+    with transaction.atomic():
+        return _create_booking(slot, user, description)
@@ -0,0 +1,74 @@
+import collections
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from calender_mgmt.constants import SlotEvents
+from calender_mgmt.models import CalenderSlot, HostSlotCounter, SlotBooking
+from calender_mgmt.signals import send_slots_changed
+
+
+class Command(BaseCommand):
+    help = """Checks the seat counters and the denormalized booking state of the slots, and the slot counters of the
+    users, against the bookings. With --repair, fixes every inconsistency found. Slots which moved into the past since
+    the counters were last computed show up as inconsistencies too, so this should run periodically with --repair."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Fix the inconsistencies instead of failing.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            booking_count = SlotBooking.objects.filter(slot=OuterRef('id')).order_by().values('slot').annotate(
+                count=Count('id')
+            ).values('count')
+            slots = CalenderSlot.objects.annotate(expected_seats=F('capacity') - Coalesce(Subquery(booking_count), 0))
+            wrong_slots = list(slots.filter(
+                ~Q(seats_available=F('expected_seats')) | Q(is_booked=True, expected_seats__gt=0) |
+                Q(is_booked=False, expected_seats__lte=0)
+            ).values_list('id', 'belongs_to_id', 'is_booked', 'expected_seats'))
+            wrong_slot_count = len(wrong_slots)
+
+            future_slots = slots.filter(start_time__gt=timezone.now()).values('belongs_to_id').annotate(
+                free=Count('id', filter=Q(expected_seats__gt=0)),
+                booked=Count('id', filter=Q(expected_seats__lte=0))
+            ).order_by()
+            expected = {row['belongs_to_id']: (row['free'], row['booked']) for row in future_slots}
+            actual = {
+                counter.host_id: (counter.future_free, counter.future_booked)
+                for counter in HostSlotCounter.objects.all()
+            }
+            wrong_hosts = [
+                host_id for host_id in expected.keys() | actual.keys()
+                if expected.get(host_id, (0, 0)) != actual.get(host_id, (0, 0))
+            ]
+
+            self.stdout.write("{} slots with wrong seats or booking state, {} users with wrong slot counters.".format(
+                wrong_slot_count, len(wrong_hosts)
+            ))
+            if not options['repair']:
+                if wrong_slot_count or wrong_hosts:
+                    raise CommandError("Inconsistencies found, run the command with --repair to fix them.")
+                return
+
+            changed = collections.defaultdict(list)
+            for slot_id, host_id, was_booked, seats_available in wrong_slots:
+                is_booked = seats_available <= 0
+                CalenderSlot.objects.filter(id=slot_id).update(
+                    seats_available=max(seats_available, 0), is_booked=is_booked
+                )
+                if is_booked == was_booked:
+                    event = SlotEvents.UPDATED
+                else:
+                    event = SlotEvents.BOOKED if is_booked else SlotEvents.CANCELLED
+                changed[host_id, event].append(slot_id)
+            for (host_id, event), slot_ids in changed.items():
+                send_slots_changed(CalenderSlot, host_id, event, slot_ids)
+            for host_id in wrong_hosts:
+                free, booked = expected.get(host_id, (0, 0))
+                HostSlotCounter.objects.update_or_create(
+                    host_id=host_id, defaults={'future_free': free, 'future_booked': booked}
+                )
+            self.stdout.write(self.style.SUCCESS("Repaired."))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from calender_mgmt.models import CalenderSlot, WaitlistEntry
+
+
+class Command(BaseCommand):
+    help = """Offers the free future slots whose hold for a user on the waitlist has expired to the next matching
+    user on the waitlist of their host. Run it periodically, e.g. every minute, so that unclaimed slots move down the
+    waitlist."""
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        offered = 0
+        expired_slots = list(CalenderSlot.objects.filter(
+            held_until__lte=now, is_booked=False, start_time__gt=now
+        ).values_list('id', 'belongs_to_id', 'start_time', 'end_time'))
+        for slot_id, host_id, start_time, end_time in expired_slots:
+            with transaction.atomic():
+                if not CalenderSlot.objects.filter(id=slot_id, held_until__lte=now, is_booked=False).update(
+                    held_for=None, held_until=None
+                ):
+                    continue
+                if WaitlistEntry.offer_slot(slot_id, host_id, start_time, end_time) is not None:
+                    offered += 1
+        self.stdout.write("{} slots offered to the next user on the waitlist.".format(offered))
@@ -0,0 +1,99 @@
+import datetime
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from app.timezones import UTC
+from calender_mgmt.provisioning import ScheduleTemplate, init_worker, provision_hosts
+
+
+class Command(BaseCommand):
+    help = """Creates the slots of a weekly schedule template for many users at once, e.g. when onboarding an
+    organization. The slots overlapping existing slots of a user are skipped. The users are provisioned in chunks of
+    --chunk-size users, run in parallel by a pool of --workers processes, each writing with its own connection."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('template', help="Path of the JSON schedule template, see calender_mgmt.provisioning.")
+        parser.add_argument('usernames', nargs='*', help="Usernames of the users to provision.")
+        parser.add_argument(
+            '--users-file', help="Path of a file with one username per line, or - for the standard input."
+        )
+        parser.add_argument(
+            '--start-date', type=datetime.date.fromisoformat, default=None,
+            help="First day of the schedule, as YYYY-MM-DD in the timezone of every user. Defaults to the current day "
+            "in the timezone of every user."
+        )
+        parser.add_argument('--days', type=int, default=7, help="Number of days of the schedule.")
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help="Number of worker processes.")
+        parser.add_argument('--chunk-size', type=int, default=100, help="Number of users provisioned together.")
+        parser.add_argument('--batch-size', type=int, default=1000, help="Number of slots inserted per query.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['template']) as template_file:
+                template = ScheduleTemplate.from_dict(json.load(template_file))
+        except (OSError, ValueError) as error:
+            raise CommandError("Invalid template {}: {}".format(options['template'], error))
+        usernames = list(options['usernames'])
+        if options['users_file'] == '-':
+            usernames.extend(line.strip() for line in sys.stdin if line.strip())
+        elif options['users_file']:
+            with open(options['users_file']) as users_file:
+                usernames.extend(line.strip() for line in users_file if line.strip())
+        usernames = list(dict.fromkeys(usernames))
+        if not usernames:
+            raise CommandError("No users to provision.")
+        if options['days'] < 1 or options['chunk_size'] < 1 or options['batch_size'] < 1:
+            raise CommandError("The days, the chunk size and the batch size must be positive.")
+
+        hosts, unknown = self.read_hosts(usernames)
+        if unknown:
+            raise CommandError("{} unknown usernames: {}".format(len(unknown), ", ".join(unknown[:10])))
+        chunks = [hosts[index:index + options['chunk_size']] for index in range(0, len(hosts), options['chunk_size'])]
+        provision = functools.partial(
+            provision_hosts, template=template, first_day=options['start_date'],
+            days=options['days'], batch_size=options['batch_size']
+        )
+        workers = min(max(options['workers'] or 1, 1), len(chunks))
+
+        started = time.perf_counter()
+        if workers == 1:
+            results = [provision(chunk) for chunk in chunks]
+        else:
+            # The workers open their own connections, and must not inherit the open ones of this process.
+            connections.close_all()
+            with multiprocessing.Pool(workers, initializer=init_worker) as pool:
+                results = list(pool.imap_unordered(provision, chunks))
+        elapsed = time.perf_counter() - started
+
+        created = sum(created for created, _ in results)
+        skipped = sum(skipped for _, skipped in results)
+        self.stdout.write(
+            "Created {} slots for {} users in {:.2f} s with {} workers, {:.0f} slots/s and {:.0f} users/s. "
+            "Skipped {} slots overlapping existing ones.".format(
+                created, len(hosts), elapsed, workers, created / elapsed, len(hosts) / elapsed, skipped
+            )
+        )
+        self.stdout.write(self.style.SUCCESS("Provisioned."))
+
+    def read_hosts(self, usernames, batch=1000):
+        """Returns the (id, timezone) of the users in the order of the usernames, and the unknown usernames."""
+        found = {}
+        for index in range(0, len(usernames), batch):
+            found.update(
+                (username, (user_id, timezone_key or UTC))
+                for user_id, username, timezone_key in User.objects.filter(
+                    username__in=usernames[index:index + batch]
+                ).values_list('id', 'username', 'profile__timezone')
+            )
+        return (
+            [found[username] for username in usernames if username in found],
+            [username for username in usernames if username not in found]
+        )
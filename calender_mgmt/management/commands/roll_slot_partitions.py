@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from calender_mgmt.partitions import create_future_partitions, is_partitioned
+
+
+class Command(BaseCommand):
+    help = """Creates the monthly partitions of the slot table up to --months months ahead, moving the slots of those
+    months out of the default partition. Does nothing unless the slot table is partitioned (see SLOT_PARTITIONING).
+    Run it periodically, e.g. daily, so that new slots always land in their own month's partition."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=3, help="Number of months ahead to create partitions for.")
+
+    def handle(self, *args, **options):
+        if not is_partitioned(connection):
+            self.stdout.write("The slot table is not partitioned, nothing to do.")
+            return
+        with transaction.atomic():
+            created = create_future_partitions(connection, options['months'])
+        for name in created:
+            self.stdout.write("Created partition {}.".format(name))
+        self.stdout.write(self.style.SUCCESS("{} partitions created.".format(len(created))))
@@ -0,0 +1,38 @@
+import os
+import pstats
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app.profiling import profile_paths, profile_view_name
+
+
+class Command(BaseCommand):
+    help = """Merges the request profiles captured by REQUEST_PROFILING, of one view or of all of them, and prints the
+    functions which took the most time across the profiled requests."""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--view', help="URL name of the view, e.g. calender_mgmt.book_slot.")
+        parser.add_argument('--limit', type=int, default=30, help="Number of functions to print.")
+        parser.add_argument(
+            '--sort', default='cumulative', choices=['cumulative', 'tottime', 'ncalls'],
+            help="Order of the functions: by time including or excluding their callees, or by number of calls."
+        )
+        parser.add_argument('--directory', default=None, help="Directory of the profiles, REQUEST_PROFILING's by default.")
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or settings.REQUEST_PROFILING['DIRECTORY']
+        view_name = options['view'].replace(':', '.') if options['view'] else None
+        paths = profile_paths(directory, view_name)
+        if not paths:
+            raise CommandError("No profiles found in {}.".format(directory))
+
+        counts = {}
+        for path in paths:
+            name = profile_view_name(os.path.basename(path))
+            counts[name] = counts.get(name, 0) + 1
+        for name, count in sorted(counts.items()):
+            self.stdout.write("{}: {} profiled requests".format(name, count))
+
+        stats = pstats.Stats(*paths, stream=self.stdout)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
@@ -0,0 +1,32 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from calender_mgmt.models import CalenderSlot
+from calender_mgmt.snapshots import snapshot_host_ids, write_snapshot
+
+
+class Command(BaseCommand):
+    help = """Writes the availability snapshots of every user with future slots or with a snapshot already, and
+    removes the snapshots of the deleted users. Run it every minute or so along with AVAILABILITY_SNAPSHOTS, so that
+    the snapshots drop the slots which started and the holds which expired."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--directory', default=None, help="Directory of the snapshots, AVAILABILITY_SNAPSHOTS's by default."
+        )
+
+    def handle(self, *args, **options):
+        directory = options['directory'] or settings.AVAILABILITY_SNAPSHOTS['DIRECTORY']
+        host_ids = set(snapshot_host_ids(directory))
+        host_ids.update(
+            CalenderSlot.objects.upcoming().order_by().values_list('belongs_to_id', flat=True).distinct()
+        )
+        started = time.perf_counter()
+        written = sum(write_snapshot(host_id, directory) for host_id in sorted(host_ids))
+        self.stdout.write(
+            "Wrote {} snapshots and removed {} in {:.2f} s.".format(
+                written, len(host_ids) - written, time.perf_counter() - started
+            )
+        )
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:11
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def fill_booking_state(apps, schema_editor):
+    CalenderSlot = apps.get_model('calender_mgmt', 'CalenderSlot')
+    HostSlotCounter = apps.get_model('calender_mgmt', 'HostSlotCounter')
+    CalenderSlot.objects.filter(booking_details__isnull=False).update(is_booked=True)
+    future_slots = CalenderSlot.objects.filter(start_time__gt=timezone.now()).values('belongs_to_id').annotate(
+        free=Count('id', filter=Q(is_booked=False)), booked=Count('id', filter=Q(is_booked=True))
+    ).order_by()
+    HostSlotCounter.objects.bulk_create(
+        HostSlotCounter(host_id=row['belongs_to_id'], future_free=row['free'], future_booked=row['booked'])
+        for row in future_slots
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0002_auto_20200419_1735'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HostSlotCounter',
+            fields=[
+                ('host', models.OneToOneField(help_text='\n    References to the user the counters belong to.\n    ', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='slot_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('future_free', models.IntegerField(default=0, help_text='\n    Contains the number of free slots of the user starting in the future.\n    ')),
+                ('future_booked', models.IntegerField(default=0, help_text='\n    Contains the number of booked slots of the user starting in the future.\n    ')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='calenderslot',
+            name='is_booked',
+            field=models.BooleanField(default=False, help_text='\n    Denormalized booking state, set whenever a booking of the slot is created or deleted. It lets the availability\n    queries filter on the slot table alone, without joining the bookings.\n    '),
+        ),
+        migrations.AddIndex(
+            model_name='calenderslot',
+            index=models.Index(fields=['belongs_to', 'is_booked', 'start_time'], name='calenderslot_availability_idx'),
+        ),
+        migrations.RunPython(fill_booking_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from calender_mgmt.partitions import is_partitioned, partition_table, partitioning_enabled, unpartition_table
+
+
+def partition_slots(apps, schema_editor):
+    if partitioning_enabled(schema_editor.connection):
+        partition_table(schema_editor.connection)
+
+
+def unpartition_slots(apps, schema_editor):
+    if is_partitioned(schema_editor.connection):
+        unpartition_table(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0003_slot_booking_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='slotbooking',
+            name='slot',
+            field=models.OneToOneField(db_constraint=False, help_text='\n    References to the slot that is booked. Not enforced by the database, which cannot reference a partitioned slot table.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='booking_details', to='calender_mgmt.calenderslot'),
+        ),
+        migrations.AddIndex(
+            model_name='calenderslot',
+            index=models.Index(fields=['belongs_to', 'start_time'], name='calenderslot_start_idx'),
+        ),
+        migrations.RunPython(partition_slots, unpartition_slots),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0004_slot_partitioning'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calenderslot',
+            name='held_for',
+            field=models.ForeignKey(help_text='\n    Contains the user on the waitlist the slot was offered to after its booking was cancelled. Until `held_until`,\n    only this user can book the slot.\n    ', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='held_slots', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='calenderslot',
+            name='held_until',
+            field=models.DateTimeField(help_text='\n    Contains the time until which the slot is held for the `held_for` user.\n    ', null=True),
+        ),
+        migrations.CreateModel(
+            name='WaitlistEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window_start', models.DateTimeField(help_text='\n    Contains the earliest start time of the slots the user waits for.\n    ')),
+                ('window_end', models.DateTimeField(help_text='\n    Contains the latest end time of the slots the user waits for.\n    ')),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='\n    Django auto populates this field when the user joins the waitlist. Older entries are offered slots first.\n    ')),
+                ('host', models.ForeignKey(help_text='\n    Contains the user whose slots are waited for.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries', to=settings.AUTH_USER_MODEL)),
+                ('waiter', models.ForeignKey(help_text='\n    Contains the user who waits for a slot.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='waiting_for', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['host', 'window_start', 'window_end'], name='waitlist_window_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0005_slot_waitlist'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='calenderslot',
+            index=models.Index(fields=['belongs_to', 'created_at'], name='calenderslot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['waiter', 'created_at', 'id'], name='waitlist_waiter_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:46
+
+from django.db import migrations, models
+
+from calender_mgmt.functions import generate_calendar_links
+
+
+def fill_calendar_links(apps, schema_editor):
+    SlotBooking = apps.get_model('calender_mgmt', 'SlotBooking')
+    bookings = SlotBooking.objects.select_related('slot__belongs_to').order_by('id')
+    for booking in bookings.iterator(chunk_size=1000):
+        links = generate_calendar_links(
+            booking.slot.belongs_to.username, booking.id, booking.description,
+            booking.slot.start_time, booking.slot.end_time, booking.booked_at
+        )
+        SlotBooking.objects.filter(id=booking.id).update(**links)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0006_query_plan_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='slotbooking',
+            name='google_calendar_link',
+            field=models.TextField(default='', help_text='\n    Contains the link adding the booked meeting to Google Calendar, computed when the slot is booked.\n    '),
+        ),
+        migrations.AddField(
+            model_name='slotbooking',
+            name='ics_event',
+            field=models.TextField(default='', help_text='\n    Contains the booked meeting as an iCalendar file, computed when the slot is booked.\n    '),
+        ),
+        migrations.AddField(
+            model_name='slotbooking',
+            name='outlook_calendar_link',
+            field=models.TextField(default='', help_text='\n    Contains the link adding the booked meeting to Outlook, computed when the slot is booked.\n    '),
+        ),
+        migrations.RunPython(fill_calendar_links, migrations.RunPython.noop),
+    ]
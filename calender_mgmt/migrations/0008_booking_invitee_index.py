@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:50
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0007_booking_calendar_links'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='slotbooking',
+            index=models.Index(fields=['booked_by', 'booked_at', 'id'], name='booking_invitee_idx'),
+        ),
+    ]
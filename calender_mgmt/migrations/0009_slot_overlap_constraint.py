@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:05
+
+from django.db import migrations
+
+from calender_mgmt.overlaps import add_overlap_constraint, remove_overlap_constraint
+
+
+def add_constraint(apps, schema_editor):
+    add_overlap_constraint(schema_editor.connection)
+
+
+def remove_constraint(apps, schema_editor):
+    remove_overlap_constraint(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0008_booking_invitee_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_constraint, remove_constraint),
+    ]
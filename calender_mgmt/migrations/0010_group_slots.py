@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:06
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from calender_mgmt.overlaps import add_overlap_constraint
+
+
+def fill_seats(apps, schema_editor):
+    CalenderSlot = apps.get_model('calender_mgmt', 'CalenderSlot')
+    CalenderSlot.objects.filter(is_booked=True).update(seats_available=0)
+
+
+def add_constraint(apps, schema_editor):
+    # SQLite rebuilds the slot table to add the fields, dropping the triggers of the overlap constraint. Postgres
+    # keeps the constraint, which is then left as it is.
+    add_overlap_constraint(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0009_slot_overlap_constraint'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, add_constraint),
+        migrations.RemoveIndex(
+            model_name='calenderslot',
+            name='calenderslot_availability_idx',
+        ),
+        migrations.AddField(
+            model_name='calenderslot',
+            name='capacity',
+            field=models.PositiveIntegerField(default=1, help_text='\n    Contains the number of invitees who can book the slot, e.g. for a webinar or office hours.\n    '),
+        ),
+        migrations.AddField(
+            model_name='calenderslot',
+            name='seats_available',
+            field=models.PositiveIntegerField(default=1, help_text='\n    Contains the number of seats of the slot which are not booked yet. Every booking takes a seat with one conditional\n    `UPDATE`, which fails once the counter reached zero, so that bookings neither lock nor count the other bookings.\n    '),
+        ),
+        migrations.RunPython(fill_seats, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='calenderslot',
+            name='is_booked',
+            field=models.BooleanField(default=False, help_text='\n    Denormalized booking state, set whenever the last seat of the slot is booked and cleared whenever one of its\n    bookings is deleted. It tells whether the slot is full without joining the bookings.\n    '),
+        ),
+        migrations.AlterField(
+            model_name='slotbooking',
+            name='slot',
+            field=models.ForeignKey(db_constraint=False, help_text='\n    References to the slot that is booked, which has one booking per seat. Not enforced by the database, which cannot\n    reference a partitioned slot table.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='calender_mgmt.calenderslot'),
+        ),
+        migrations.AddIndex(
+            model_name='calenderslot',
+            index=models.Index(condition=models.Q(('seats_available__gt', 0)), fields=['belongs_to', 'start_time'], name='calenderslot_open_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='calenderslot',
+            constraint=models.CheckConstraint(condition=models.Q(('capacity__gte', 1), ('seats_available__lte', models.F('capacity'))), name='calenderslot_seats_check'),
+        ),
+        migrations.AddConstraint(
+            model_name='slotbooking',
+            constraint=models.UniqueConstraint(fields=('slot', 'booked_by'), name='booking_one_seat_per_user'),
+        ),
+        migrations.RunPython(add_constraint, migrations.RunPython.noop),
+    ]
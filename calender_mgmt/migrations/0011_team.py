@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0010_group_slots'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='\n    Contains the name of the team shown to the invitees.\n    ', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True, help_text='\n    Django auto populates this field whenever a team is created.\n    ')),
+                ('members', models.ManyToManyField(help_text='\n    Contains the users whose slots make up the availability of the team.\n    ', related_name='teams', to=settings.AUTH_USER_MODEL)),
+                ('owner', models.ForeignKey(help_text='\n    Contains the user who created the team and manages its members.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='owned_teams', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
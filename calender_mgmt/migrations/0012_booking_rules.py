@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('calender_mgmt', '0011_team'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingRules',
+            fields=[
+                ('host', models.OneToOneField(help_text='\n    References to the user the rules belong to.\n    ', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='booking_rules', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('buffer_minutes', models.PositiveIntegerField(default=0, help_text='\n    Contains the minutes to keep free between two meetings of the user. The slots closer than that to a booked slot\n    cannot be booked.\n    ')),
+                ('max_bookings_per_day', models.PositiveIntegerField(help_text='\n    Contains the maximum number of meetings of the user per day of their timezone, a group slot counting once. None\n    sets no limit.\n    ', null=True)),
+                ('minimum_notice_minutes', models.PositiveIntegerField(default=0, help_text='\n    Contains the minutes before its start after which a slot cannot be booked any more.\n    ')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HostDailyBookings',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(help_text='\n    Contains the day of the meetings in the timezone of the user.\n    ')),
+                ('bookings', models.PositiveIntegerField(default=0, help_text='\n    Contains the number of slots of the user with at least one booking starting on the day.\n    ')),
+                ('host', models.ForeignKey(help_text='\n    References to the user the meetings belong to.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='daily_bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('host', 'day'), name='dailybookings_host_day_unique')],
+            },
+        ),
+    ]
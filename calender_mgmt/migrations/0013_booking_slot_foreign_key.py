@@ -0,0 +1,48 @@
+import copy
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+from calender_mgmt.partitions import is_partitioned
+
+
+def _alter_constraint(apps, schema_editor, enforced):
+    # A partitioned slot table cannot be referenced, see calender_mgmt.partitions.
+    if is_partitioned(schema_editor.connection):
+        return
+    SlotBooking = apps.get_model('calender_mgmt', 'SlotBooking')
+    field = SlotBooking._meta.get_field('slot')
+    unenforced = copy.copy(field)
+    unenforced.db_constraint = False
+    if enforced:
+        schema_editor.alter_field(SlotBooking, unenforced, field)
+    else:
+        schema_editor.alter_field(SlotBooking, field, unenforced)
+
+
+def add_foreign_key(apps, schema_editor):
+    _alter_constraint(apps, schema_editor, enforced=True)
+
+
+def drop_foreign_key(apps, schema_editor):
+    _alter_constraint(apps, schema_editor, enforced=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0012_booking_rules'),
+    ]
+
+    operations = [
+        # The foreign key was dropped for every database along with the partitioning of the slot table, and is only
+        # added back to the tables which are not partitioned.
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.AlterField(
+                model_name='slotbooking',
+                name='slot',
+                field=models.ForeignKey(help_text='\n    References to the slot that is booked, which has one booking per seat. Enforced by the database, except on a\n    partitioned slot table, which it cannot reference.\n    ', on_delete=django.db.models.deletion.CASCADE, related_name='bookings', to='calender_mgmt.calenderslot'),
+            ),
+        ]),
+        migrations.RunPython(add_foreign_key, drop_foreign_key),
+    ]
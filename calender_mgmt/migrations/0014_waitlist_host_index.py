@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:34
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calender_mgmt', '0013_booking_slot_foreign_key'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='waitlistentry',
+            name='waitlist_window_idx',
+        ),
+        migrations.AddIndex(
+            model_name='waitlistentry',
+            index=models.Index(fields=['host', 'created_at', 'id'], name='waitlist_host_idx'),
+        ),
+    ]
@@ -1,7 +1,50 @@
+import collections
 import datetime
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import models
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import F, Q
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from app.timezones import UTC
+
+from .constants import ResponseMessages, SlotEvents
+from .functions import generate_calendar_links
+from .rules import BookingRuleViolation, HostRules, local_day
+from .signals import send_slot_offered, send_slots_changed
+
+# The length of every slot, as created by the views and the provisioning. The lookups of the slots overlapping a time
+# range only look this far back before the range.
+SLOT_LENGTH = datetime.timedelta(hours=1)
+
+
+class CalenderSlotQuerySet(models.QuerySet):
+    """Filters the slots on `start_time` ranges, which Postgres uses to skip the partitions of other months when the
+    slot table is partitioned, and which are served by the (`belongs_to`, `start_time`) index otherwise.
+
+    """
+    def upcoming(self):
+        return self.filter(start_time__gt=timezone.now())
+
+    def available(self):
+        """Filters the future slots with seats left, leaving out the slots whose last seat is held for a user on the
+        waitlist. The (`belongs_to`, `start_time`) index of the slots with seats left serves them.
+
+        """
+        return self.upcoming().filter(seats_available__gt=0).exclude(seats_available=1, held_until__gt=timezone.now())
+
+    def starting_between(self, start, end):
+        return self.filter(start_time__gte=start, start_time__lt=end)
+
+    def overlapping(self, start, end):
+        """Filters the slots overlapping the time range. The slots last `SLOT_LENGTH`, so the ones starting longer
+        before the range are skipped by the `start_time` range.
+
+        """
+        return self.starting_between(start - SLOT_LENGTH, end).filter(end_time__gt=start)
 
 
 class CalenderSlot(models.Model):
@@ -20,20 +63,135 @@ class CalenderSlot(models.Model):
     end_time = models.DateTimeField(help_text="""
     Contains the end time of the slot.
     """)
+    is_booked = models.BooleanField(default=False, help_text="""
+    Denormalized booking state, set whenever the last seat of the slot is booked and cleared whenever one of its
+    bookings is deleted. It tells whether the slot is full without joining the bookings.
+    """)
+    capacity = models.PositiveIntegerField(default=1, help_text="""
+    Contains the number of invitees who can book the slot, e.g. for a webinar or office hours.
+    """)
+    seats_available = models.PositiveIntegerField(default=1, help_text="""
+    Contains the number of seats of the slot which are not booked yet. Every booking takes a seat with one conditional
+    `UPDATE`, which fails once the counter reached zero, so that bookings neither lock nor count the other bookings.
+    """)
+    held_for = models.ForeignKey(to=User, related_name='held_slots', on_delete=models.SET_NULL, null=True, help_text="""
+    Contains the user on the waitlist the slot was offered to after its booking was cancelled. Until `held_until`,
+    only this user can book the slot.
+    """)
+    held_until = models.DateTimeField(null=True, help_text="""
+    Contains the time until which the slot is held for the `held_for` user.
+    """)
+
+    objects = CalenderSlotQuerySet.as_manager()
 
     class Meta:
         """The default ordering is set to the descending order of when the slot was created.
 
+        The indexes cover the lookup of the future slots of a user with seats left, of the slots of a user in a time
+        range, and of the slots of a user in the default ordering. The first one is partial, so that it leaves out the
+        full slots, which are never listed as available.
+
         """
         ordering = ['-created_at']
+        indexes = [
+            models.Index(
+                fields=['belongs_to', 'start_time'], condition=Q(seats_available__gt=0), name='calenderslot_open_idx'
+            ),
+            models.Index(fields=['belongs_to', 'start_time'], name='calenderslot_start_idx'),
+            models.Index(fields=['belongs_to', 'created_at'], name='calenderslot_created_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(
+                condition=Q(capacity__gte=1, seats_available__lte=F('capacity')), name='calenderslot_seats_check'
+            ),
+        ]
+
+    def is_future(self):
+        return self.start_time > timezone.now()
+
+    def is_group(self):
+        return self.capacity > 1
+
+    def is_held_for_other_than(self, user):
+        """Tells whether the slot is held for another user on the waitlist. A hold only covers the last seat."""
+        return self.seats_available <= 1 and self.held_until is not None and self.held_until > timezone.now() and (
+            self.held_for_id != (user.id if user is not None else None)
+        )
+
+    def seat_data(self):
+        """Returns the capacity and the seats left of a group slot for the responses, which single-seat slots omit."""
+        if not self.is_group():
+            return {}
+        return {"capacity": self.capacity, "seats_available": self.seats_available}
+
+    @classmethod
+    def take_seat(cls, slot_id, user_id=None):
+        """Takes a seat of the slot, returning the number of seats left, or None if the slot is full or missing.
+
+        The seat is taken with a single `UPDATE` of the slot row filtered on the seats left, so concurrent bookings
+        queue on the row instead of locking it for a check. Taking the last seat marks the slot as booked and drops
+        its hold, and so does the booking of the user it was held for.
+
+        """
+        connection = connections[router.db_for_write(cls)]
+        statement = (
+            "UPDATE {} SET seats_available = seats_available - 1, is_booked = (seats_available = 1), "
+            "held_for_id = CASE WHEN seats_available = 1 OR held_for_id = %s THEN NULL ELSE held_for_id END, "
+            "held_until = CASE WHEN seats_available = 1 OR held_for_id = %s THEN NULL ELSE held_until END "
+            "WHERE id = %s AND seats_available > 0"
+        ).format(connection.ops.quote_name(cls._meta.db_table))
+        params = [user_id, user_id, slot_id]
+        with connection.cursor() as cursor:
+            if connection.features.can_return_columns_from_insert:
+                cursor.execute(statement + " RETURNING seats_available", params)
+                row = cursor.fetchone()
+                return None if row is None else row[0]
+            # SQLite before 3.35 has no RETURNING, but its write lock keeps the counter until the transaction ends.
+            cursor.execute(statement, params)
+            if cursor.rowcount == 0:
+                return None
+        return cls.objects.using(connection.alias).values_list('seats_available', flat=True).get(id=slot_id)
+
+    def save(self, *args, **kwargs):
+        """Saves the slot, counting it as a free slot of its user when it is created in the future. A new slot has
+        all of its seats available.
+
+        """
+        adding = self._state.adding
+        if adding:
+            self.seats_available = self.capacity
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            if adding and self.is_future():
+                HostSlotCounter.adjust(self.belongs_to_id, free=1)
+            send_slots_changed(
+                CalenderSlot, self.belongs_to_id, SlotEvents.CREATED if adding else SlotEvents.UPDATED, [self.id]
+            )
+
+    def delete(self, *args, **kwargs):
+        """Deletes the slot along with its bookings, and removes it from the counters of its user, and from the
+        meetings of its day if it has bookings.
+
+        """
+        with transaction.atomic(savepoint=False):
+            if self.is_future():
+                if self.is_booked:
+                    HostSlotCounter.adjust(self.belongs_to_id, booked=-1)
+                else:
+                    HostSlotCounter.adjust(self.belongs_to_id, free=-1)
+                if self.seats_available < self.capacity:
+                    HostDailyBookings.remove_meeting(self.belongs_to_id, self.start_time)
+            send_slots_changed(CalenderSlot, self.belongs_to_id, SlotEvents.DELETED, [self.id])
+            return super().delete(*args, **kwargs)
 
 
 class SlotBooking(models.Model):
     """Contains the booking details of the slots.
 
     """
-    slot = models.OneToOneField(to=CalenderSlot, related_name='booking_details', on_delete=models.CASCADE, help_text="""
-    References to the slot that is booked.
+    slot = models.ForeignKey(to=CalenderSlot, related_name='bookings', on_delete=models.CASCADE, help_text="""
+    References to the slot that is booked, which has one booking per seat. Enforced by the database, except on a
+    partitioned slot table, which it cannot reference.
     """)
     booked_by = models.ForeignKey(to=User, related_name='booked_slots', on_delete=models.CASCADE, null=True, help_text="""
     Contains the user who has booked the slot. If it was booked by an anonymous user, it is None.
@@ -44,9 +202,435 @@ class SlotBooking(models.Model):
     description = models.TextField(null=True, help_text="""
     Contains some booking data entered by the person who booked the slot.
     """)
+    google_calendar_link = models.TextField(default='', help_text="""
+    Contains the link adding the booked meeting to Google Calendar, computed when the slot is booked.
+    """)
+    outlook_calendar_link = models.TextField(default='', help_text="""
+    Contains the link adding the booked meeting to Outlook, computed when the slot is booked.
+    """)
+    ics_event = models.TextField(default='', help_text="""
+    Contains the booked meeting as an iCalendar file, computed when the slot is booked.
+    """)
 
     class Meta:
-        """The default ordering is set to the descending order of when the slot was booked.
+        """The default ordering is set to the descending order of when the slot was booked. The bookings of an invitee
+        are listed in this order from the (`booked_by`, `booked_at`, `id`) index. A registered user books a seat of a
+        slot at most once, while the anonymous bookings are not restricted.
 
         """
         ordering = ['-booked_at']
+        indexes = [
+            models.Index(fields=['booked_by', 'booked_at', 'id'], name='booking_invitee_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['slot', 'booked_by'], name='booking_one_seat_per_user'),
+        ]
+
+    def calendar_links(self):
+        """Returns the stored calendar links and iCalendar file of the booking, as given in the responses."""
+        return {
+            "add_to_google_calendar": self.google_calendar_link,
+            "add_to_outlook_calendar": self.outlook_calendar_link,
+            "ics_event": self.ics_event
+        }
+
+    def save(self, *args, **kwargs):
+        """Saves the booking, taking a seat of the slot when created. Taking the last seat marks the slot as booked and
+        moves it to the booked slots of its user.
+
+        Booking a full slot fails with an `IntegrityError`, like booking a seat of the same slot twice, and booking a
+        slot against the booking rules of its user fails with a `BookingRuleViolation`. The calendar links of a new
+        booking mention its id, so they are stored right after it is inserted. Load the slot with its user to build
+        them without another query.
+
+        """
+        adding = self._state.adding
+        with transaction.atomic(savepoint=False):
+            if adding:
+                seats_available = CalenderSlot.take_seat(self.slot_id, self.booked_by_id)
+                if seats_available is None:
+                    raise IntegrityError("The slot {} has no seat left.".format(self.slot_id))
+                BookingRules.check_booking(self.slot, first_seat=seats_available == self.slot.capacity - 1)
+            super().save(*args, **kwargs)
+            if adding:
+                links = generate_calendar_links(
+                    self.slot.belongs_to.username, self.id, self.description,
+                    self.slot.start_time, self.slot.end_time, self.booked_at
+                )
+                SlotBooking.objects.filter(id=self.id).update(**links)
+                for name, value in links.items():
+                    setattr(self, name, value)
+                self.slot.seats_available = seats_available
+                self.slot.is_booked = seats_available == 0
+                if self.slot.is_booked or self.slot.held_for_id == self.booked_by_id:
+                    self.slot.held_for, self.slot.held_until = None, None
+                if self.slot.is_booked and self.slot.is_future():
+                    HostSlotCounter.adjust(self.slot.belongs_to_id, free=-1, booked=1)
+                send_slots_changed(
+                    SlotBooking, self.slot.belongs_to_id,
+                    SlotEvents.BOOKED if self.slot.is_booked else SlotEvents.UPDATED, [self.slot_id]
+                )
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic(savepoint=False):
+            result = super().delete(*args, **kwargs)
+            SlotBooking.release_slot(self.slot_id)
+            self.slot.seats_available += 1
+            self.slot.is_booked = False
+            return result
+
+    @staticmethod
+    def release_slot(slot_id, seats=1):
+        """Gives the seats of the deleted bookings back to the slot. If the slot was full, marks it as free, moves it
+        back to the free slots of its user, and offers it to the next matching user on the waitlist of its user. If no
+        booking is left, the slot is no longer a meeting of its day.
+
+        Takes the slot id and the number of deleted bookings only, so that the bookings deleted in bulk can be released
+        without loading them. The daily cap and the timezone of the user are read along with the slot.
+
+        """
+        CalenderSlot.objects.filter(id=slot_id).update(seats_available=F('seats_available') + seats, is_booked=False)
+        host_id, start_time, end_time, capacity, seats_available, max_bookings_per_day, timezone_key = (
+            CalenderSlot.objects.values_list(
+                'belongs_to_id', 'start_time', 'end_time', 'capacity', 'seats_available',
+                'belongs_to__booking_rules__max_bookings_per_day', 'belongs_to__profile__timezone'
+            ).get(id=slot_id)
+        )
+        was_full = seats_available == seats
+        if start_time > timezone.now():
+            if was_full:
+                HostSlotCounter.objects.filter(host_id=host_id).update(
+                    future_free=F('future_free') + 1, future_booked=F('future_booked') - 1
+                )
+                WaitlistEntry.offer_slot(slot_id, host_id, start_time, end_time)
+            if seats_available == capacity and max_bookings_per_day is not None:
+                HostDailyBookings.remove(host_id, local_day(timezone_key or UTC, start_time))
+        send_slots_changed(SlotBooking, host_id, SlotEvents.CANCELLED if was_full else SlotEvents.UPDATED, [slot_id])
+
+
+class HostSlotCounter(models.Model):
+    """Keeps the number of free and booked future slots of every user who has created slots.
+
+    The counters are updated in the same transaction as the slots and the bookings. Slots which move into the past
+    stay counted until the `check_slot_counters --repair` command recomputes the counters, so that command should
+    run periodically.
+
+    """
+    host = models.OneToOneField(to=User, primary_key=True, related_name='slot_counter', on_delete=models.CASCADE, help_text="""
+    References to the user the counters belong to.
+    """)
+    future_free = models.IntegerField(default=0, help_text="""
+    Contains the number of free slots of the user starting in the future.
+    """)
+    future_booked = models.IntegerField(default=0, help_text="""
+    Contains the number of booked slots of the user starting in the future.
+    """)
+
+    @classmethod
+    def adjust(cls, host_id, free=0, booked=0):
+        """Adds the given amounts to the counters of the user, creating the counters on the first change.
+
+        """
+        changes = {'future_free': F('future_free') + free, 'future_booked': F('future_booked') + booked}
+        if cls.objects.filter(host_id=host_id).update(**changes):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(host_id=host_id, future_free=free, future_booked=booked)
+        except IntegrityError:
+            cls.objects.filter(host_id=host_id).update(**changes)
+
+    @classmethod
+    def add_free(cls, counts):
+        """Adds the free slots counted by user id to the counters of the users, in three queries however many users.
+
+        The existing counters are incremented by a single `UPDATE`, and the missing ones created in bulk, which fails
+        with an `IntegrityError` if a concurrent transaction created one of them first.
+
+        """
+        existing = set(cls.objects.filter(host_id__in=list(counts)).values_list('host_id', flat=True))
+        counters = []
+        for host_id in existing:
+            counter = cls(host_id=host_id)
+            counter.future_free = F('future_free') + counts[host_id]
+            counters.append(counter)
+        cls.objects.bulk_update(counters, ['future_free'])
+        cls.objects.bulk_create(
+            cls(host_id=host_id, future_free=count) for host_id, count in counts.items() if host_id not in existing
+        )
+
+
+class BookingRules(models.Model):
+    """Stores the rules which the bookings of the slots of a user must follow. The slots of the users without rules
+    can be booked whenever they are free and in the future.
+
+    """
+    host = models.OneToOneField(to=User, primary_key=True, related_name='booking_rules', on_delete=models.CASCADE, help_text="""
+    References to the user the rules belong to.
+    """)
+    buffer_minutes = models.PositiveIntegerField(default=0, help_text="""
+    Contains the minutes to keep free between two meetings of the user. The slots closer than that to a booked slot
+    cannot be booked.
+    """)
+    max_bookings_per_day = models.PositiveIntegerField(null=True, help_text="""
+    Contains the maximum number of meetings of the user per day of their timezone, a group slot counting once. None
+    sets no limit.
+    """)
+    minimum_notice_minutes = models.PositiveIntegerField(default=0, help_text="""
+    Contains the minutes before its start after which a slot cannot be booked any more.
+    """)
+
+    def save(self, *args, **kwargs):
+        """Saves the rules and counts the meetings of the days of the user again, since a daily cap may have been set.
+
+        """
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+            HostDailyBookings.recount(self.host_id)
+            send_slots_changed(BookingRules, self.host_id, SlotEvents.UPDATED, [])
+
+    @classmethod
+    def of_users(cls, user_ids, start=None, end=None, using=None):
+        """Returns the `HostRules` of the users by their id, or None for the users without rules, leaving out the
+        users which do not exist.
+
+        The rules are read along with the users in one query. The full days and the meetings of the users whose rules
+        need them are read for the slots starting from `start` (or now) until `end`, in one more query each.
+
+        """
+        now = timezone.now()
+        start = now if start is None else max(start, now)
+        rows = list(User.objects.using(using).filter(id__in=user_ids).values_list(
+            'id', 'booking_rules__buffer_minutes', 'booking_rules__max_bookings_per_day',
+            'booking_rules__minimum_notice_minutes', 'profile__timezone'
+        ))
+        rules = {user_id: row for user_id, *row in rows if row[0] is not None}
+        full_days = {user_id: [] for user_id in rules}
+        capped_ids = [user_id for user_id, row in rules.items() if row[1] is not None]
+        if capped_ids:
+            days = HostDailyBookings.objects.using(using).filter(
+                host_id__in=capped_ids, day__gte=start.date() - datetime.timedelta(days=1)
+            )
+            if end is not None:
+                days = days.filter(day__lte=end.date() + datetime.timedelta(days=1))
+            for host_id, day, bookings in days.values_list('host_id', 'day', 'bookings'):
+                if bookings >= rules[host_id][1]:
+                    full_days[host_id].append(day)
+        meetings = {user_id: [] for user_id in rules}
+        buffers = {user_id: row[0] for user_id, row in rules.items() if row[0]}
+        if buffers:
+            # A meeting ending within the buffer before a slot starts at most a slot length and the buffer before it.
+            reach = SLOT_LENGTH + datetime.timedelta(minutes=max(buffers.values()))
+            booked_slots = CalenderSlot.objects.using(using).filter(
+                belongs_to_id__in=list(buffers), seats_available__lt=F('capacity'), start_time__gte=start - reach
+            )
+            if end is not None:
+                booked_slots = booked_slots.filter(start_time__lt=end + reach)
+            for host_id, start_time, end_time in booked_slots.order_by().values_list(
+                'belongs_to_id', 'start_time', 'end_time'
+            ):
+                meetings[host_id].append((start_time, end_time))
+        result = {user_id: None for user_id, *_ in rows}
+        for user_id, (buffer_minutes, max_bookings_per_day, minimum_notice_minutes, timezone_key) in rules.items():
+            result[user_id] = HostRules(
+                buffer_minutes, max_bookings_per_day, minimum_notice_minutes, timezone_key or UTC,
+                full_days[user_id], meetings[user_id]
+            )
+        return result
+
+    @classmethod
+    def cap_of(cls, host_id):
+        """Returns the daily cap and the timezone of the user with booking rules, or None for the other users."""
+        rows = list(cls.objects.filter(host_id=host_id).values_list('max_bookings_per_day', 'host__profile__timezone'))
+        return rows[0] if rows else None
+
+    @classmethod
+    def check_booking(cls, slot, first_seat=True):
+        """Raises `BookingRuleViolation` if booking a seat of the slot breaks a rule of its user.
+
+        The rules are locked until the end of the transaction, so that the bookings of a user with rules are checked
+        one at a time. Only the first seat of a slot makes it a meeting, so the other seats are checked for the notice
+        only. The meeting is counted on its day right away, which fails once the day has reached the cap.
+
+        """
+        rows = list(cls.objects.select_for_update(of=('self',)).filter(host_id=slot.belongs_to_id).values_list(
+            'buffer_minutes', 'max_bookings_per_day', 'minimum_notice_minutes', 'host__profile__timezone'
+        ))
+        if not rows:
+            return
+        buffer_minutes, max_bookings_per_day, minimum_notice_minutes, timezone_key = rows[0]
+        if slot.start_time < timezone.now() + datetime.timedelta(minutes=minimum_notice_minutes):
+            raise BookingRuleViolation(ResponseMessages.BOOKING_NOTICE_TOO_SHORT)
+        if not first_seat:
+            return
+        if buffer_minutes:
+            buffer = datetime.timedelta(minutes=buffer_minutes)
+            if CalenderSlot.objects.filter(
+                belongs_to_id=slot.belongs_to_id, seats_available__lt=F('capacity')
+            ).overlapping(slot.start_time - buffer, slot.end_time + buffer).exclude(id=slot.id).exists():
+                raise BookingRuleViolation(ResponseMessages.BOOKING_BUFFER_CONFLICT)
+        if max_bookings_per_day is not None and not HostDailyBookings.add(
+            slot.belongs_to_id, local_day(timezone_key or UTC, slot.start_time), max_bookings_per_day
+        ):
+            raise BookingRuleViolation(ResponseMessages.BOOKING_DAY_FULL)
+
+
+class HostDailyBookings(models.Model):
+    """Keeps the number of meetings of the users with a daily cap on every day of their timezone.
+
+    The counts are updated in the same transactions as the bookings, so that the cap is checked on one row. They are
+    counted again from the slots when the rules or the timezone of the user change.
+
+    """
+    host = models.ForeignKey(to=User, related_name='daily_bookings', on_delete=models.CASCADE, help_text="""
+    References to the user the meetings belong to.
+    """)
+    day = models.DateField(help_text="""
+    Contains the day of the meetings in the timezone of the user.
+    """)
+    bookings = models.PositiveIntegerField(default=0, help_text="""
+    Contains the number of slots of the user with at least one booking starting on the day.
+    """)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['host', 'day'], name='dailybookings_host_day_unique'),
+        ]
+
+    @classmethod
+    def add(cls, host_id, day, limit):
+        """Counts a meeting of the user on the day unless the day already has `limit` of them, returning whether it
+        was counted. The count is only raised by an `UPDATE` filtered on it, so that it never exceeds the limit.
+
+        """
+        if cls.objects.filter(host_id=host_id, day=day, bookings__lt=limit).update(bookings=F('bookings') + 1):
+            return True
+        try:
+            with transaction.atomic():
+                cls.objects.create(host_id=host_id, day=day, bookings=1)
+        except IntegrityError:
+            return False
+        return True
+
+    @classmethod
+    def remove(cls, host_id, day):
+        cls.objects.filter(host_id=host_id, day=day, bookings__gt=0).update(bookings=F('bookings') - 1)
+
+    @classmethod
+    def remove_meeting(cls, host_id, start_time):
+        """Removes the meeting starting at the time from its day, if the user has a daily cap."""
+        max_bookings_per_day, timezone_key = BookingRules.cap_of(host_id) or (None, None)
+        if max_bookings_per_day is not None:
+            cls.remove(host_id, local_day(timezone_key or UTC, start_time))
+
+    @classmethod
+    def recount(cls, host_id):
+        """Counts the meetings of the future days of the user from their slots, if the user has a daily cap, and
+        drops the counts of the user otherwise. Returns whether the user has booking rules.
+
+        """
+        cls.objects.filter(host_id=host_id).delete()
+        rules = BookingRules.cap_of(host_id)
+        if rules is None or rules[0] is None:
+            return rules is not None
+        max_bookings_per_day, timezone_key = rules
+        counts = collections.Counter(
+            local_day(timezone_key or UTC, start_time) for start_time in CalenderSlot.objects.upcoming().filter(
+                belongs_to_id=host_id, seats_available__lt=F('capacity')
+            ).values_list('start_time', flat=True)
+        )
+        cls.objects.bulk_create(
+            cls(host_id=host_id, day=day, bookings=bookings) for day, bookings in sorted(counts.items())
+        )
+        return True
+
+
+@receiver(post_save, sender='user_mgmt.UserProfile')
+def recount_days_of_host(sender, instance, **kwargs):
+    # The days of the meetings are the days of the timezone of the user, which may have changed their full days.
+    if HostDailyBookings.recount(instance.user_id):
+        send_slots_changed(BookingRules, instance.user_id, SlotEvents.UPDATED, [])
+
+
+class WaitlistEntry(models.Model):
+    """Stores the interest of a registered user in booking a slot of a host in a time window.
+
+    When a booking of a future slot of the host is cancelled, the slot is held for the oldest entry whose window
+    contains the slot, in the transaction of the cancellation, and that entry is removed from the waitlist.
+
+    """
+    host = models.ForeignKey(to=User, related_name='waitlist_entries', on_delete=models.CASCADE, help_text="""
+    Contains the user whose slots are waited for.
+    """)
+    waiter = models.ForeignKey(to=User, related_name='waiting_for', on_delete=models.CASCADE, help_text="""
+    Contains the user who waits for a slot.
+    """)
+    window_start = models.DateTimeField(help_text="""
+    Contains the earliest start time of the slots the user waits for.
+    """)
+    window_end = models.DateTimeField(help_text="""
+    Contains the latest end time of the slots the user waits for.
+    """)
+    created_at = models.DateTimeField(auto_now_add=True, help_text="""
+    Django auto populates this field when the user joins the waitlist. Older entries are offered slots first.
+    """)
+
+    class Meta:
+        """The default ordering is the order in which the users joined the waitlist.
+
+        The indexes cover the range lookup of the entries of a host whose window contains a slot, and the entries of a
+        waiting user in the default ordering. Only the entries matching the slot are sorted by age, so the cost of a
+        cancellation does not grow with the waitlist of the host.
+
+        """
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['host', 'window_start', 'window_end'], name='waitlist_window_idx'),
+            models.Index(fields=['waiter', 'created_at', 'id'], name='waitlist_waiter_idx'),
+        ]
+
+    @classmethod
+    def offer_slot(cls, slot_id, host_id, start_time, end_time):
+        """Holds the free slot for the oldest waiting user whose window contains it, returning their entry or None.
+
+        The entry is locked, skipping the entries locked by concurrent cancellations, and deleted.
+
+        """
+        entry = cls.objects.select_for_update(skip_locked=True).filter(
+            host_id=host_id, window_start__lte=start_time, window_end__gte=end_time
+        ).order_by('created_at', 'id').first()
+        if entry is None:
+            return None
+        entry.delete()
+        held_until = timezone.now() + datetime.timedelta(minutes=settings.WAITLIST_HOLD_MINUTES)
+        CalenderSlot.objects.filter(id=slot_id).update(held_for=entry.waiter_id, held_until=held_until)
+        send_slots_changed(WaitlistEntry, host_id, SlotEvents.HELD, [slot_id])
+        send_slot_offered(WaitlistEntry, slot_id, entry.waiter_id, held_until)
+        return entry
+
+
+class Team(models.Model):
+    """Stores a team of users hosting the same kind of meetings, whose slots are booked together.
+
+    Invitees book a time of the team rather than a slot of one of its members, and the booking goes to the member
+    with the fewest booked future slots among the ones free at that time.
+
+    """
+    name = models.CharField(max_length=100, help_text="""
+    Contains the name of the team shown to the invitees.
+    """)
+    owner = models.ForeignKey(to=User, related_name='owned_teams', on_delete=models.CASCADE, help_text="""
+    Contains the user who created the team and manages its members.
+    """)
+    members = models.ManyToManyField(to=User, related_name='teams', help_text="""
+    Contains the users whose slots make up the availability of the team.
+    """)
+    created_at = models.DateTimeField(auto_now_add=True, help_text="""
+    Django auto populates this field whenever a team is created.
+    """)
+
+    class Meta:
+        """The default ordering is set to the descending order of when the team was created.
+
+        """
+        ordering = ['-created_at']
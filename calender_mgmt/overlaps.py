@@ -0,0 +1,110 @@
+"""Database constraint keeping the slots of a user from overlapping, so that concurrent creations cannot race.
+
+The slots of a user must not overlap: a slot starting before another one ends conflicts with it, while a slot
+starting exactly when another one ends does not. The database rejects the insert or the update of a conflicting slot
+with an `IntegrityError`, which the views turn into a `CONFLICTING_SLOT` response, so that creating a slot needs no
+check query beforehand.
+
+* On Postgres, the slot table gets an exclusion constraint on the user and the `tstzrange` of the slot, with the
+  btree_gist extension for the equality on the user.
+* A partitioned slot table (see `partitions`) cannot have an exclusion constraint across its partitions, so there a
+  trigger checks the slots of the user instead, holding an advisory lock on the user until the end of the
+  transaction so that two transactions never check the same user at once. The partitions created later inherit the
+  trigger.
+* On SQLite, the same check runs in triggers. SQLite runs a single write transaction at a time, so they need no lock.
+  Django rebuilds SQLite tables for most schema changes, which drops their triggers and this index, so the
+  migrations changing the slot table must call `add_overlap_constraint` again afterwards. It skips the constraint,
+  the index and the triggers which exist already, on every database.
+
+The triggers find the conflicting slots through an index on (`belongs_to`, `end_time`), which only reaches the slots
+ending after the start of the checked one.
+
+"""
+from .partitions import TABLE, is_partitioned
+
+CONSTRAINT = 'calenderslot_no_overlap'
+INDEX = 'calenderslot_end_idx'
+
+POSTGRES_FUNCTION = """
+CREATE OR REPLACE FUNCTION {constraint}() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('{constraint}'), NEW.belongs_to_id);
+    IF EXISTS (
+        SELECT 1 FROM {table}
+        WHERE belongs_to_id = NEW.belongs_to_id AND id <> NEW.id
+        AND end_time > NEW.start_time AND start_time < NEW.end_time
+    ) THEN
+        RAISE EXCEPTION 'The slot overlaps another slot of user %', NEW.belongs_to_id
+            USING ERRCODE = 'exclusion_violation', CONSTRAINT = '{constraint}';
+    END IF;
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+SQLITE_TRIGGER = """
+CREATE TRIGGER IF NOT EXISTS {constraint}_{event} BEFORE {statement} ON {table}
+WHEN EXISTS (
+    SELECT 1 FROM {table}
+    WHERE belongs_to_id = NEW.belongs_to_id{other_slot}
+    AND end_time > NEW.start_time AND start_time < NEW.end_time
+)
+BEGIN
+    SELECT RAISE(ABORT, '{constraint}');
+END
+"""
+
+
+def _sqlite_triggers():
+    return [
+        SQLITE_TRIGGER.format(constraint=CONSTRAINT, table=TABLE, event='insert', statement='INSERT', other_slot=''),
+        SQLITE_TRIGGER.format(
+            constraint=CONSTRAINT, table=TABLE, event='update',
+            statement='UPDATE OF belongs_to_id, start_time, end_time', other_slot=' AND id <> NEW.id'
+        ),
+    ]
+
+
+def _postgres_exists(cursor, query):
+    cursor.execute(query, [CONSTRAINT, TABLE])
+    return cursor.fetchone() is not None
+
+
+def add_overlap_constraint(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql' and not is_partitioned(connection):
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+            if not _postgres_exists(
+                cursor, "SELECT 1 FROM pg_constraint WHERE conname = %s AND conrelid = %s::regclass"
+            ):
+                cursor.execute(
+                    "ALTER TABLE {} ADD CONSTRAINT {} EXCLUDE USING gist "
+                    "(belongs_to_id WITH =, tstzrange(start_time, end_time) WITH &&)".format(TABLE, CONSTRAINT)
+                )
+        elif connection.vendor == 'postgresql':
+            cursor.execute("CREATE INDEX IF NOT EXISTS {} ON {} (belongs_to_id, end_time)".format(INDEX, TABLE))
+            cursor.execute(POSTGRES_FUNCTION.format(constraint=CONSTRAINT, table=TABLE))
+            if not _postgres_exists(
+                cursor, "SELECT 1 FROM pg_trigger WHERE tgname = %s AND tgrelid = %s::regclass"
+            ):
+                cursor.execute(
+                    "CREATE TRIGGER {0} BEFORE INSERT OR UPDATE OF belongs_to_id, start_time, end_time ON {1} "
+                    "FOR EACH ROW EXECUTE FUNCTION {0}()".format(CONSTRAINT, TABLE)
+                )
+        elif connection.vendor == 'sqlite':
+            cursor.execute("CREATE INDEX IF NOT EXISTS {} ON {} (belongs_to_id, end_time)".format(INDEX, TABLE))
+            for trigger in _sqlite_triggers():
+                cursor.execute(trigger)
+
+
+def remove_overlap_constraint(connection):
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("ALTER TABLE {} DROP CONSTRAINT IF EXISTS {}".format(TABLE, CONSTRAINT))
+            cursor.execute("DROP TRIGGER IF EXISTS {} ON {}".format(CONSTRAINT, TABLE))
+            cursor.execute("DROP FUNCTION IF EXISTS {}()".format(CONSTRAINT))
+            cursor.execute("DROP INDEX IF EXISTS {}".format(INDEX))
+        elif connection.vendor == 'sqlite':
+            for event in ('insert', 'update'):
+                cursor.execute("DROP TRIGGER IF EXISTS {}_{}".format(CONSTRAINT, event))
+            cursor.execute("DROP INDEX IF EXISTS {}".format(INDEX))
@@ -0,0 +1,148 @@
+"""Optional range partitioning of the slot table by the month of `start_time`, on Postgres.
+
+Enabled with the SLOT_PARTITIONING setting before running the migrations. The partitioned table keeps the name of the
+slot table, so the ORM queries it unchanged, and Postgres skips the partitions outside of the `start_time` range of a
+query. The queries on slots therefore filter on `start_time` ranges (see `CalenderSlotQuerySet`) rather than on
+functions of it. A default partition catches the slots beyond the last monthly partition, and the
+`roll_slot_partitions` command creates the partitions of the coming months ahead of time.
+
+Postgres requires the partition key in the primary key of a partitioned table, so the primary key becomes
+(`id`, `start_time`), and the foreign keys of the bookings to the slots are dropped when the table is partitioned. The
+ORM still deletes the bookings of a deleted slot. The slot tables which are not partitioned keep their foreign keys.
+
+SQLite has no partitioning. There the slot table stays a single table, and the same `start_time` range filters are
+served by the (`belongs_to`, `start_time`) index.
+
+"""
+import datetime
+
+from django.conf import settings
+
+TABLE = 'calender_mgmt_calenderslot'
+DEFAULT_PARTITION = TABLE + '_default'
+
+
+def month_start(value):
+    return datetime.datetime(value.year, value.month, 1)
+
+
+def next_month(month):
+    return datetime.datetime(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month):
+    return "{}_y{:04d}m{:02d}".format(TABLE, month.year, month.month)
+
+
+def partitioning_enabled(connection):
+    return settings.SLOT_PARTITIONING and connection.vendor == 'postgresql'
+
+
+def is_partitioned(connection):
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def _rebuild_table(cursor, partitioned):
+    """Recreates the slot table with or without partitioning, keeping its rows, indexes and foreign keys.
+
+    """
+    old_table = TABLE + ('_unpartitioned' if partitioned else '_partitioned')
+    cursor.execute(
+        "SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s", [TABLE, TABLE + '_pkey']
+    )
+    index_definitions = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = %s::regclass AND contype = 'f'",
+        [TABLE]
+    )
+    foreign_keys = cursor.fetchall()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    sequence = cursor.fetchone()[0]
+
+    cursor.execute("ALTER TABLE {} RENAME TO {}".format(TABLE, old_table))
+    cursor.execute("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS){}".format(
+        TABLE, old_table, " PARTITION BY RANGE (start_time)" if partitioned else ""
+    ))
+    cursor.execute("ALTER TABLE {} ADD PRIMARY KEY ({})".format(TABLE, "id, start_time" if partitioned else "id"))
+    if partitioned:
+        cursor.execute("CREATE TABLE {} PARTITION OF {} DEFAULT".format(DEFAULT_PARTITION, TABLE))
+        cursor.execute("SELECT MIN(start_time) FROM {}".format(old_table))
+        first_start = cursor.fetchone()[0] or datetime.datetime.now()
+        cursor.execute("SELECT MAX(start_time) FROM {}".format(old_table))
+        last_start = max(cursor.fetchone()[0] or first_start, datetime.datetime.now())
+        _create_partitions(cursor, month_start(first_start), last_start)
+    cursor.execute("INSERT INTO {} SELECT * FROM {}".format(TABLE, old_table))
+
+    # A serial id column keeps using the sequence of the old table, an identity column gets a new sequence.
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+    new_sequence = cursor.fetchone()[0]
+    if new_sequence is None:
+        cursor.execute("ALTER SEQUENCE {} OWNED BY {}.id".format(sequence, TABLE))
+    else:
+        cursor.execute("SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {}), 0) + 1, false)".format(TABLE), [new_sequence])
+
+    cursor.execute("DROP TABLE {}".format(old_table))
+    for index_definition in index_definitions:
+        cursor.execute(index_definition)
+    for name, definition in foreign_keys:
+        cursor.execute("ALTER TABLE {} ADD CONSTRAINT {} {}".format(TABLE, name, definition))
+
+
+def _create_partitions(cursor, month, until):
+    """Creates the missing monthly partitions from `month` up to the one containing `until`.
+
+    Rows of a new partition's month which landed in the default partition are moved into it. Returns the names of
+    the created partitions.
+
+    """
+    created = []
+    while month <= until:
+        name = partition_name(month)
+        cursor.execute("SELECT to_regclass(%s)", [name])
+        if cursor.fetchone()[0] is None:
+            bounds = [month, next_month(month)]
+            cursor.execute("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)".format(name, TABLE))
+            cursor.execute(
+                "WITH moved AS (DELETE FROM {} WHERE start_time >= %s AND start_time < %s RETURNING *) "
+                "INSERT INTO {} SELECT * FROM moved".format(DEFAULT_PARTITION, name), bounds
+            )
+            cursor.execute("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)".format(TABLE, name), bounds)
+            created.append(name)
+        month = next_month(month)
+    return created
+
+
+def _drop_referencing_foreign_keys(cursor):
+    """Drops the foreign keys of the other tables to the slot table, which cannot reference a partitioned table."""
+    cursor.execute(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint WHERE confrelid = %s::regclass AND contype = 'f'",
+        [TABLE]
+    )
+    for table, name in cursor.fetchall():
+        cursor.execute("ALTER TABLE {} DROP CONSTRAINT {}".format(table, name))
+
+
+def partition_table(connection):
+    with connection.cursor() as cursor:
+        _drop_referencing_foreign_keys(cursor)
+        _rebuild_table(cursor, partitioned=True)
+
+
+def unpartition_table(connection):
+    with connection.cursor() as cursor:
+        _rebuild_table(cursor, partitioned=False)
+
+
+def create_future_partitions(connection, months):
+    """Creates the partitions from the current month up to `months` months ahead, returning the created ones.
+
+    """
+    until = month_start(datetime.datetime.now())
+    for _ in range(months):
+        until = next_month(until)
+    with connection.cursor() as cursor:
+        return _create_partitions(cursor, month_start(datetime.datetime.now()), until)
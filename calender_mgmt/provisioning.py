@@ -0,0 +1,152 @@
+"""Creation of the slots of many users from a weekly schedule template, e.g. when onboarding an organization.
+
+A template gives the days of the week, the hours of the day in the timezone of every user, and the capacity of the
+slots:
+
+    {"days": ["mon", "tue", "wed", "thu", "fri"], "start": "09:00", "end": "17:00", "capacity": 1}
+
+The users are provisioned in chunks. The slots of a chunk are generated hour by hour on the days of the template, like
+`slots/interval/` does for one interval, and the ones overlapping an existing slot of their user are skipped in
+memory, against the slots of the whole chunk read in one query. The other slots are inserted with batched
+`bulk_create`, and the slot counters of the users updated and created in bulk, in one transaction per chunk. If a
+concurrent request created an overlapping slot in between, the database rejects the insert and the chunk is read and
+inserted once more. The chunks are independent of each other, so the `provision_slots` command runs them in a pool of
+processes, each with its own database connection.
+
+"""
+import bisect
+import collections
+import datetime
+
+import django
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from app.timezones import offset_table
+
+from .constants import SlotEvents
+from .functions import parse_capacity
+from .models import SLOT_LENGTH, CalenderSlot, HostSlotCounter
+from .signals import send_slots_changed
+
+DAYS = ('mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun')
+
+
+class ScheduleTemplate:
+    """The weekly schedule of the slots to create, in the timezone of every user.
+
+    """
+    __slots__ = ('weekdays', 'start', 'end', 'capacity')
+
+    def __init__(self, weekdays, start, end, capacity=1):
+        self.weekdays = frozenset(weekdays)
+        self.start = start
+        self.end = end
+        self.capacity = capacity
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns the template of the parsed JSON, raising ValueError if it is not a valid one."""
+        try:
+            weekdays = [DAYS.index(day.lower()) for day in data['days']]
+            start = datetime.time.fromisoformat(data['start'])
+            end = datetime.time.fromisoformat(data['end'])
+        except (AttributeError, KeyError, TypeError, ValueError):
+            raise ValueError("A template needs the 'days' of the week, and the 'start' and 'end' hours.")
+        if not weekdays or end <= start:
+            raise ValueError("A template needs at least one day, and must end after it starts.")
+        return cls(weekdays, start, end, parse_capacity(data.get('capacity', 1)))
+
+    def local_starts(self, first_day, days):
+        """Yields the local start times of the slots of the `days` days from `first_day`."""
+        for offset in range(days):
+            day = first_day + datetime.timedelta(days=offset)
+            if day.weekday() not in self.weekdays:
+                continue
+            start_time = datetime.datetime.combine(day, self.start)
+            end_time = datetime.datetime.combine(day, self.end)
+            while start_time + SLOT_LENGTH <= end_time:
+                yield start_time
+                start_time += SLOT_LENGTH
+
+
+def _free_times(candidates, existing):
+    """Returns the (start, end) of the candidates overlapping neither the existing slots nor each other.
+
+    The existing slots of a user do not overlap, so a candidate only needs checking against the last one starting
+    before it ends.
+
+    """
+    existing = sorted(existing)
+    starts = [start_time for start_time, _ in existing]
+    ends = [end_time for _, end_time in existing]
+    free_times = []
+    for start_time, end_time in candidates:
+        index = bisect.bisect_left(starts, end_time) - 1
+        if index >= 0 and ends[index] > start_time:
+            continue
+        free_times.append((start_time, end_time))
+        starts.insert(index + 1, start_time)
+        ends.insert(index + 1, end_time)
+    return free_times
+
+
+def provision_hosts(hosts, template, first_day, days, batch_size=1000, attempts=3):
+    """Creates the future slots of the template for the (user id, timezone) pairs, skipping the ones overlapping
+    existing slots, and returns the numbers of created and skipped slots. The schedule starts on `first_day`, or on
+    the current day in the timezone of every user if it is None.
+
+    """
+    now = timezone.now()
+    candidates = {}
+    for host_id, timezone_key in hosts:
+        offsets = offset_table(timezone_key)
+        host_first_day = first_day or offsets.to_local(now).date()
+        # Ending every slot an hour after the UTC time of its local start keeps it an hour long across DST
+        # transitions. A local start skipped by one is moved onto the next one, and is only listed once.
+        starts = sorted({
+            offsets.to_utc(local_start) for local_start in template.local_starts(host_first_day, days)
+        })
+        candidates[host_id] = [(start_time, start_time + SLOT_LENGTH) for start_time in starts if start_time > now]
+    start_times = [times[0][0] for times in candidates.values() if times]
+    if not start_times:
+        return 0, 0
+    window_start = min(start_times)
+    window_end = max(times[-1][1] for times in candidates.values() if times)
+    expected = sum(len(times) for times in candidates.values())
+
+    for attempt in range(attempts):
+        existing = collections.defaultdict(list)
+        existing_slots = CalenderSlot.objects.filter(belongs_to_id__in=list(candidates)).overlapping(
+            window_start, window_end
+        )
+        for host_id, start_time, end_time in existing_slots.order_by().values_list(
+            'belongs_to_id', 'start_time', 'end_time'
+        ):
+            existing[host_id].append((start_time, end_time))
+        new_slots = [
+            CalenderSlot(
+                belongs_to_id=host_id, start_time=start_time, end_time=end_time,
+                capacity=template.capacity, seats_available=template.capacity
+            )
+            for host_id, times in candidates.items() for start_time, end_time in _free_times(times, existing[host_id])
+        ]
+        try:
+            with transaction.atomic():
+                CalenderSlot.objects.bulk_create(new_slots, batch_size=batch_size)
+                HostSlotCounter.add_free(collections.Counter(slot.belongs_to_id for slot in new_slots))
+                slot_ids = collections.defaultdict(list)
+                for slot in new_slots:
+                    slot_ids[slot.belongs_to_id].append(slot.id)
+                for host_id, ids in slot_ids.items():
+                    send_slots_changed(CalenderSlot, host_id, SlotEvents.CREATED, ids)
+        except IntegrityError:
+            if attempt == attempts - 1:
+                raise
+        else:
+            return len(new_slots), expected - len(new_slots)
+
+
+def init_worker():
+    # The processes started with `spawn` import the application again, while the forked ones are set up already.
+    django.setup()
@@ -0,0 +1,96 @@
+"""Test utilities capturing the SQL statements of the views and checking their query plans.
+
+The statements a block of code runs are captured with `capture_statements`, and `explain` returns their plans:
+`EXPLAIN QUERY PLAN` on SQLite, and `EXPLAIN` on Postgres with sequential scans and sorts disabled, so that the ones
+left in a plan are the ones no index can avoid. `plan_problems` picks the full table scans and the sorts out of a
+plan.
+
+The plans of every view are kept as snapshots in this directory, one subdirectory per database vendor, so that the
+changes to them show up in code review. Run the tests with UPDATE_QUERY_PLANS=1 to rewrite the snapshots after
+changing a query or an index. The SQLite plans depend on the SQLite version, currently 3.40.
+
+"""
+import contextlib
+import os
+import re
+
+SNAPSHOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+EXPLAINED_STATEMENTS = ('SELECT', 'UPDATE', 'DELETE')
+PROBLEM_PATTERNS = {
+    'sqlite': [re.compile(r'^SCAN (?!CONSTANT ROW)'), re.compile(r'^USE TEMP B-TREE FOR ORDER BY')],
+    'postgresql': [re.compile(r'\bSeq Scan on\b'), re.compile(r'^(->\s*)?Sort\b')],
+}
+
+
+@contextlib.contextmanager
+def capture_statements(connection):
+    """Collects the (sql, params) of the statements run on the connection in the block, with their placeholders.
+
+    """
+    statements = []
+
+    def capture(execute, sql, params, many, context):
+        statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(capture):
+        yield statements
+
+
+def explain(connection, sql, params):
+    """Returns the lines of the plan of the statement, or None for the statements without a plan worth checking.
+
+    """
+    if not sql.lstrip().upper().startswith(EXPLAINED_STATEMENTS):
+        return None
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            depths = {0: -1}
+            lines = []
+            for node_id, parent_id, _, detail in cursor.fetchall():
+                depths[node_id] = depths.get(parent_id, -1) + 1
+                lines.append("  " * depths[node_id] + detail)
+            return lines
+        cursor.execute("SET enable_seqscan = off")
+        cursor.execute("SET enable_sort = off")
+        try:
+            cursor.execute("EXPLAIN (COSTS OFF) " + sql, params)
+            return [row[0] for row in cursor.fetchall()]
+        finally:
+            cursor.execute("RESET enable_seqscan")
+            cursor.execute("RESET enable_sort")
+
+
+def plan_problems(vendor, plan):
+    """Returns the lines of the plan which scan a whole table or sort rows."""
+    patterns = PROBLEM_PATTERNS.get(vendor, [])
+    return [line.strip() for line in plan if any(pattern.search(line.strip()) for pattern in patterns)]
+
+
+def format_plans(explained_statements):
+    """Formats the (sql, plan) pairs of the statements of a view as the text of its snapshot."""
+    return "".join(
+        "{}\n{}\n\n".format(sql, "\n".join("    " + line for line in plan)) for sql, plan in explained_statements
+    )
+
+
+def snapshot_path(vendor, name):
+    return os.path.join(SNAPSHOT_DIRECTORY, vendor, "{}.txt".format(name))
+
+
+def read_snapshot(vendor, name):
+    """Returns the snapshot of the plans of the view, or None if the vendor has no snapshots."""
+    if not os.path.isdir(os.path.join(SNAPSHOT_DIRECTORY, vendor)):
+        return None
+    try:
+        with open(snapshot_path(vendor, name)) as snapshot:
+            return snapshot.read()
+    except FileNotFoundError:
+        return ""
+
+
+def write_snapshot(vendor, name, text):
+    os.makedirs(os.path.join(SNAPSHOT_DIRECTORY, vendor), exist_ok=True)
+    with open(snapshot_path(vendor, name), 'w') as snapshot:
+        snapshot.write(text)
@@ -0,0 +1,80 @@
+"""Booking rules of the users: a buffer between their meetings, a cap on their meetings per day, and a minimum notice.
+
+A meeting is a slot with at least one booking, so a group slot counts once however many of its seats are booked.
+The meetings of every user with a daily cap are counted per day of their timezone in `HostDailyBookings`, in the
+transactions of the bookings, so that checking the cap updates or reads one row per day instead of counting the
+bookings of the day. The buffer is checked against the meetings around a slot, read from the (`belongs_to`,
+`start_time`) index of the slots, and the notice needs no query. Listing the available slots of a user with rules
+therefore costs two more queries at most, for the full days and the meetings of the listed window, whatever the
+number of slots, and booking one of them three more.
+
+The days of a user are counted again from their slots whenever their rules or their timezone change.
+
+"""
+import bisect
+import datetime
+
+from app.timezones import offset_table
+
+from .constants import ResponseMessages
+
+
+class BookingRuleViolation(Exception):
+    """Raised when a booking breaks a booking rule of the user of the slot, with the message telling which one.
+
+    """
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def local_day(timezone_key, utc_time):
+    """Returns the date of the naive UTC time in the timezone."""
+    return offset_table(timezone_key).to_local(utc_time).date()
+
+
+class HostRules:
+    """The booking rules of a user, along with their days at the cap and their meetings as read for a time range.
+
+    """
+    def __init__(self, buffer_minutes, max_bookings_per_day, minimum_notice_minutes, timezone_key, full_days=(),
+                 meetings=()):
+        self.buffer = datetime.timedelta(minutes=buffer_minutes)
+        self.max_bookings_per_day = max_bookings_per_day
+        self.notice = datetime.timedelta(minutes=minimum_notice_minutes)
+        self.offsets = offset_table(timezone_key)
+        self.full_days = set(full_days)
+        meetings = sorted(meetings)
+        self.meeting_starts = [start_time for start_time, _ in meetings]
+        self.meeting_ends = [end_time for _, end_time in meetings]
+
+    def near_meeting(self, start_time, end_time):
+        """Tells whether a meeting other than the slot itself ends less than the buffer before the slot starts, or
+        starts less than the buffer after it ends.
+
+        The meetings of a user do not overlap, so the last one starting before the end of the buffer after the slot
+        also ends last, and is the only one to check besides the slot itself.
+
+        """
+        index = bisect.bisect_left(self.meeting_starts, end_time + self.buffer) - 1
+        if index >= 0 and self.meeting_starts[index] == start_time:
+            index -= 1
+        return index >= 0 and self.meeting_ends[index] > start_time - self.buffer
+
+    def violation(self, start_time, end_time, now, is_meeting=False):
+        """Returns the message of the first rule which a booking of the slot at `now` would break, or None. A slot
+        which is a meeting already, a group slot with bookings, is only checked for the notice.
+
+        """
+        if start_time < now + self.notice:
+            return ResponseMessages.BOOKING_NOTICE_TOO_SHORT
+        if is_meeting:
+            return None
+        if self.full_days and self.offsets.to_local(start_time).date() in self.full_days:
+            return ResponseMessages.BOOKING_DAY_FULL
+        if self.buffer and self.near_meeting(start_time, end_time):
+            return ResponseMessages.BOOKING_BUFFER_CONFLICT
+        return None
+
+    def allows(self, start_time, end_time, now, is_meeting=False):
+        return self.violation(start_time, end_time, now, is_meeting) is None
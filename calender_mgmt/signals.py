@@ -0,0 +1,32 @@
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent once the transaction which changed some slots of a user has committed, with the `host_id` of the user, the
+# `event` (one of `SlotEvents`) and the `slot_ids` of the changed slots. Every write path of the slots and bookings
+# sends it, including the bulk ones which bypass the model methods.
+slots_changed = Signal()
+
+
+def send_slots_changed(sender, host_id, event, slot_ids):
+    """Sends `slots_changed` after the current transaction commits, or right away outside of a transaction.
+
+    A receiver failing, e.g. on an unavailable cache, is logged rather than raised: the change is committed already,
+    and the callers must not take it for a failure of their transaction.
+
+    """
+    slot_ids = list(slot_ids)
+    transaction.on_commit(
+        lambda: slots_changed.send(sender=sender, host_id=host_id, event=event, slot_ids=slot_ids), robust=True
+    )
+
+
+# Sent once the transaction which held a slot for a user on the waitlist has committed, with the `slot_id`, the
+# `waiter_id` of the user and the time the slot is `held_until`.
+slot_offered = Signal()
+
+
+def send_slot_offered(sender, slot_id, waiter_id, held_until):
+    transaction.on_commit(
+        lambda: slot_offered.send(sender=sender, slot_id=slot_id, waiter_id=waiter_id, held_until=held_until),
+        robust=True
+    )
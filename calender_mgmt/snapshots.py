@@ -0,0 +1,193 @@
+"""Static snapshots of the available slots of the users, served by the web server to the anonymous booking pages.
+
+Enabled with the AVAILABILITY_SNAPSHOTS setting. The available slots of a user, as listed by `book/<id>/slots/` to an
+anonymous client without query parameters, are written to `<id>.json` in DIRECTORY, along with a gzip compressed
+`<id>.json.gz`, and a brotli compressed `<id>.json.br` when the `brotli` package is installed, both at the levels of
+RESPONSE_COMPRESSION. The web server serves these files to the requests without query parameters or credentials, and
+passes the others and the users without a snapshot on to Django, see the README.
+
+Every change to the slots or bookings of a user sends `slots_changed` once its transaction has committed, which
+queues the user for the snapshot writer of the worker process rather than writing in the request. The writer is a
+background thread, which waits DELAY_MS for the changes to the same users to pile up and then writes the snapshots
+of the queued users again from the primary database, once per user. A snapshot is thus stale for DELAY_MS plus the
+time taken by the writes queued before it. A deleted user has their snapshot removed. The slots which started, the
+holds which expired and the days which passed in the meantime are not changes, so the `write_availability_snapshots`
+command should also run every minute or so to write the snapshots of all the users again, which also catches up with
+the changes queued by a worker which stopped before writing them.
+
+Every file is written to a temporary file first and renamed, so that the web server always serves complete files.
+The slots are read and the files renamed under a lock of the directory, shared by the worker processes and the
+command, so that a snapshot read before another is never renamed over it.
+
+"""
+import contextlib
+import fcntl
+import logging
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+
+from app.compression import brotli, compress
+
+from .availability import read_free_slots
+from .functions import available_slots_data
+from .signals import slots_changed
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_SUFFIX = '.json'
+
+LOCK_NAME = '.lock'
+
+
+def snapshot_path(host_id, directory=None):
+    return os.path.join(directory or settings.AVAILABILITY_SNAPSHOTS['DIRECTORY'], str(host_id) + SNAPSHOT_SUFFIX)
+
+
+def snapshot_host_ids(directory=None):
+    """Returns the ids of the users with a snapshot in the directory."""
+    try:
+        names = os.listdir(directory or settings.AVAILABILITY_SNAPSHOTS['DIRECTORY'])
+    except FileNotFoundError:
+        return []
+    stems = [name[:-len(SNAPSHOT_SUFFIX)] for name in names if name.endswith(SNAPSHOT_SUFFIX)]
+    return [int(stem) for stem in stems if stem.isdigit()]
+
+
+def _write_file(path, content):
+    directory, name = os.path.split(path)
+    with tempfile.NamedTemporaryFile(dir=directory, prefix='.' + name, suffix='.tmp', delete=False) as temporary:
+        temporary.write(content)
+    # The web server reads the files as another user.
+    os.chmod(temporary.name, 0o644)
+    os.replace(temporary.name, path)
+
+
+@contextlib.contextmanager
+def _locked(directory):
+    """Holds the lock of the directory of the snapshots, across the processes."""
+    with open(os.path.join(directory, LOCK_NAME), 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def render_snapshot(available_slots):
+    """Returns the JSON of the available slots, and its compressed variants by file suffix."""
+    content = JSONRenderer().render(available_slots_data(available_slots))
+    variants = {'.gz': compress(content, 'gzip')}
+    if brotli is not None:
+        variants['.br'] = compress(content, 'br')
+    return content, variants
+
+
+def write_snapshot(host_id, directory=None):
+    """Writes the snapshot of the available slots of the user, read from the primary database, or removes it if the
+    user does not exist. Returns whether the user exists.
+
+    The compressed variants are written before the JSON, so that the web server finds them along with the JSON of a
+    user without a snapshot before.
+
+    """
+    directory = directory or settings.AVAILABILITY_SNAPSHOTS['DIRECTORY']
+    os.makedirs(directory, exist_ok=True)
+    with _locked(directory):
+        available_slots = read_free_slots(host_id, using=DEFAULT_DB_ALIAS)
+        if available_slots is None:
+            remove_snapshot(host_id, directory)
+            return False
+        path = snapshot_path(host_id, directory)
+        content, variants = render_snapshot(available_slots)
+        for suffix, compressed in variants.items():
+            _write_file(path + suffix, compressed)
+        _write_file(path, content)
+    return True
+
+
+def remove_snapshot(host_id, directory=None):
+    path = snapshot_path(host_id, directory)
+    # The JSON goes first, so that the web server stops serving the variants with it.
+    for suffix in ('', '.gz', '.br'):
+        try:
+            os.remove(path + suffix)
+        except FileNotFoundError:
+            pass
+
+
+class SnapshotQueue:
+    """The users whose snapshots the writer thread of the worker process is to write again. The thread runs while
+    there are users queued, and stops once it has written them all.
+
+    """
+    def __init__(self):
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def add(self, host_id):
+        """Queues the snapshot of the user, starting the writer thread if it is not running."""
+        with self._lock:
+            self._pending.add(host_id)
+            if self._thread is None:
+                self._start()
+
+    def _start(self):
+        self._thread = threading.Thread(target=self._run, name='availability-snapshots', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            while True:
+                time.sleep(settings.AVAILABILITY_SNAPSHOTS['DELAY_MS'] / 1000)
+                self.write_pending()
+                with self._lock:
+                    if not self._pending:
+                        self._thread = None
+                        return
+        finally:
+            connections[DEFAULT_DB_ALIAS].close()
+
+    def wait(self, timeout=None):
+        """Waits for the writer thread to write the queued snapshots."""
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def write_pending(self):
+        """Writes the snapshots of the queued users, returning their number."""
+        with self._lock:
+            host_ids, self._pending = self._pending, set()
+        for host_id in sorted(host_ids):
+            try:
+                write_snapshot(host_id)
+            except Exception:
+                # A stale snapshot is written again by the next periodic refresh.
+                logger.exception("Could not write the availability snapshot of user %s", host_id)
+        return len(host_ids)
+
+
+snapshot_queue = SnapshotQueue()
+
+
+@receiver(slots_changed)
+def refresh_host_snapshot(sender, host_id, **kwargs):
+    if settings.AVAILABILITY_SNAPSHOTS['ENABLED']:
+        snapshot_queue.add(host_id)
+
+
+@receiver(post_delete, sender=User)
+def remove_deleted_host_snapshot(sender, instance, **kwargs):
+    # The slots of a deleted user are deleted in bulk along with it, without sending `slots_changed`.
+    if settings.AVAILABILITY_SNAPSHOTS['ENABLED']:
+        host_id = instance.id
+        transaction.on_commit(lambda: remove_snapshot(host_id))
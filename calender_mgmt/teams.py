@@ -0,0 +1,77 @@
+"""Availability of the teams and assignment of their bookings to the members, for teams of hundreds of members.
+
+The free times of a team are the union of the free slots of its members, every time listed once. The members of a
+team mostly offer the same times, so the union has far fewer times than the members have slots, and the cost is in
+going through the slots rather than in ordering the times. With the availability index enabled, the times of every
+member are read from memory as integer microseconds, deduplicated in a set and only then sorted and converted to
+datetimes, which takes a tenth of the time of a `heapq.merge` of the sorted times of the members. The members missing
+from the index are loaded together, in as many queries as for one user. The teams with more members than the index
+keeps users are read from the database instead, so that they do not evict each other from the index. Otherwise, one
+query walks the (`belongs_to`, `start_time`) index of the slots with seats left member by member, and the database
+deduplicates and sorts the times, so that only the distinct times are sent and converted. The slots of the members
+with booking rules are read apart from the others in that case, with the rules of all the members read at once, and
+only their times which the rules allow are added.
+
+A booking of a team time goes to the member free at that time with the fewest booked future slots, as kept by the
+`HostSlotCounter` of every member along with the bookings, so that no bookings are counted. The members with equal
+counters are taken in the order of their ids, so the bookings rotate through them as their counters grow.
+
+"""
+import itertools
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .availability import availability_index, from_microseconds
+from .models import BookingRules, CalenderSlot, Team
+
+
+def team_member_ids(team_id):
+    """Returns the ids of the members of the team in one query, or None if the team does not exist."""
+    rows = list(Team.objects.filter(id=team_id).order_by().values_list('members', flat=True))
+    if not rows:
+        return None
+    return [member_id for member_id in rows if member_id is not None]
+
+
+def team_free_times(member_ids, start=None, end=None):
+    """Returns the (start time, end time) of the free slots of the members starting from `start` until `end`, sorted
+    and without duplicates.
+
+    """
+    if not settings.AVAILABILITY_INDEX['ENABLED'] or len(member_ids) > availability_index.max_hosts:
+        members_rules = BookingRules.of_users(member_ids, start, end)
+        ruled_ids = {member_id for member_id, rules in members_rules.items() if rules is not None}
+        slots = CalenderSlot.objects.available()
+        if start is not None:
+            slots = slots.filter(start_time__gte=start)
+        if end is not None:
+            slots = slots.filter(start_time__lt=end)
+        times = slots.filter(belongs_to_id__in=[member_id for member_id in member_ids if member_id not in ruled_ids])
+        times = times.order_by('start_time', 'end_time').values_list('start_time', 'end_time').distinct()
+        if not ruled_ids:
+            return list(times)
+        times = set(times)
+        now = timezone.now()
+        for member_id, start_time, end_time, capacity, seats_available in slots.filter(
+            belongs_to_id__in=list(ruled_ids)
+        ).order_by().values_list('belongs_to_id', 'start_time', 'end_time', 'capacity', 'seats_available'):
+            if members_rules[member_id].allows(start_time, end_time, now, seats_available < capacity):
+                times.add((start_time, end_time))
+        return sorted(times)
+    times = set(itertools.chain.from_iterable(availability_index.free_times_of_hosts(member_ids, start, end)))
+    return [(from_microseconds(start_time), from_microseconds(end_time)) for start_time, end_time in sorted(times)]
+
+
+def assignable_slots(member_ids, start_time):
+    """Returns the slots of the members bookable at the start time with their users, the least loaded user first.
+
+    A member without counters has no booked future slots.
+
+    """
+    return list(
+        CalenderSlot.objects.available().filter(belongs_to_id__in=member_ids, start_time=start_time)
+        .select_related('belongs_to')
+        .order_by(F('belongs_to__slot_counter__future_booked').asc(nulls_first=True), 'belongs_to_id')
+    )
@@ -1,18 +1,58 @@
+import asyncio
 import datetime
+import difflib
+import gzip
+import io
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+import zoneinfo
+from unittest import mock
 
+from asgiref.sync import async_to_sync, sync_to_async
+
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, connections, transaction
+from django.db import router
 from django.urls import reverse
-from django.test import TestCase
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework.authtoken.models import Token
 from rest_framework.status import (
-    HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND
+    HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND
 )
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase, APITransactionTestCase
+
+from app.compression import negotiate_encoding
+from app.profiling import RequestProfilingMiddleware, profile_paths
+from app.ratelimit import RateLimitMiddleware, ResponseMessages as RateLimitMessages, take_token
+from app.replicas import ReplicaPinningMiddleware, is_pinned, pin_to_primary, read_from_replica
+from app.timezones import offset_table, parse_timestamp
+from user_mgmt.models import UserProfile
 
-from .constants import ResponseMessages
-from .functions import generate_google_calendar_link
-from .models import CalenderSlot, SlotBooking
+from .availability import AvailabilityIndex, availability_index, bump_version
+from .constants import ResponseMessages, SlotEvents
+from .events import RESYNC, LocalBroker, event_stream, get_broker
+from .functions import encode_booking_cursor, generate_calendar_links, generate_google_calendar_link
+from .group_commit import book_slot, booking_queue
+from .models import BookingRules, CalenderSlot, HostDailyBookings, HostSlotCounter, SlotBooking, Team, WaitlistEntry
+from .overlaps import add_overlap_constraint
+from .partitions import is_partitioned, month_start, next_month, partition_name
+from .provisioning import DAYS, ScheduleTemplate, provision_hosts
+from .query_plans import capture_statements, explain, format_plans, plan_problems, read_snapshot, write_snapshot
+from .signals import slot_offered, slots_changed
+from .snapshots import snapshot_queue
 
 
 class CreateCalendarSlotTestCase(APITestCase):
@@ -75,6 +115,18 @@ class CreateCalendarSlotTestCase(APITestCase):
         self.assertEqual(response.data, ResponseMessages.CONFLICTING_SLOT.format(existing_start_time, existing_end_time))
         self.assertEqual(CalenderSlot.objects.count(), 1)
 
+    def test_create_slot_before_existing_slot(self):
+        existing_start_time = datetime.datetime.now() + datetime.timedelta(days=2)
+        CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=existing_start_time, end_time=existing_start_time + datetime.timedelta(hours=1)
+        )
+        url = reverse('calender_mgmt:slot_data')
+        start_time = existing_start_time - datetime.timedelta(hours=1)
+        data = {'start_time': start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(CalenderSlot.objects.count(), 2)
+
     def test_create_correct_slot(self):
         url = reverse('calender_mgmt:slot_data')
         start_time = datetime.datetime.now() + datetime.timedelta(days=1)
@@ -120,11 +172,14 @@ class GetCreatedCalendarSlotsTestCase(APITestCase):
         self.assertEqual(response.data[0], slot_data)
 
     def test_get_slots_booked(self):
-        SlotBooking.objects.create(slot=self.slot)
+        booking = SlotBooking.objects.create(slot=self.slot)
         response = self.client.get(self.url, format='json')
         self.assertEqual(response.status_code, HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
-        slot_data = {'id': self.slot.id, 'start_time': str(self.slot.start_time), 'end_time': str(self.slot.end_time), 'is_booked': True}
+        slot_data = {
+            'id': self.slot.id, 'start_time': str(self.slot.start_time), 'end_time': str(self.slot.end_time), 'is_booked': True,
+            'booking_id': booking.id, **booking.calendar_links()
+        }
         self.assertEqual(response.data[0], slot_data)
 
 
@@ -194,7 +249,8 @@ class GetCalendarSlotDetailsTestCase(APITestCase):
             'booking_id': booking.id,
             'booked_by': "Anonymous User",
             'booked_at': str(booking.booked_at),
-            'description': "Important"
+            'description': "Important",
+            **booking.calendar_links()
         }
         self.assertEqual(response.data, slot_data)
 
@@ -213,11 +269,91 @@ class GetCalendarSlotDetailsTestCase(APITestCase):
             'booking_id': booking.id,
             'booked_by': self.other_user.username,
             'booked_at': str(booking.booked_at),
-            'description': "Important"
+            'description': "Important",
+            **booking.calendar_links()
         }
         self.assertEqual(response.data, slot_data)
 
 
+class MyBookingsTestCase(APITestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        token = Token.objects.create(user=self.user).key
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ token)
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.host,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(6)
+        ]
+        self.bookings = [
+            SlotBooking.objects.create(slot=slot, booked_by=self.user, description="Booking {}".format(number))
+            for number, slot in enumerate(slots[:5])
+        ]
+        SlotBooking.objects.create(slot=slots[5], booked_by=self.host, description="Own booking")
+        self.url = reverse('calender_mgmt:my_bookings')
+
+    def list_all(self, limit):
+        booking_ids, cursor, pages = [], None, 0
+        while True:
+            response = self.client.get(self.url, {'limit': limit, **({'cursor': cursor} if cursor else {})})
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            booking_ids.extend(booking['id'] for booking in response.data['bookings'])
+            pages += 1
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return booking_ids, pages
+
+    def test_list_bookings(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertIsNone(response.data['next_cursor'])
+        latest = SlotBooking.objects.get(id=self.bookings[-1].id)
+        self.assertEqual(response.data['bookings'][0], {
+            "id": latest.id,
+            "booked_at": str(latest.booked_at),
+            "description": "Booking 4",
+            "slot_id": latest.slot_id,
+            "start_time": str(latest.slot.start_time),
+            "end_time": str(latest.slot.end_time),
+            "host_id": self.host.id,
+            "host": self.host.username,
+            "add_to_google_calendar": latest.google_calendar_link,
+            "add_to_outlook_calendar": latest.outlook_calendar_link
+        })
+        expected_ids = list(SlotBooking.objects.filter(booked_by=self.user).order_by('-booked_at', '-id').values_list('id', flat=True))
+        self.assertEqual([booking['id'] for booking in response.data['bookings']], expected_ids)
+
+    def test_keyset_pages(self):
+        expected_ids = list(SlotBooking.objects.filter(booked_by=self.user).order_by('-booked_at', '-id').values_list('id', flat=True))
+        self.assertEqual(self.list_all(2), (expected_ids, 3))
+        self.assertEqual(self.list_all(5), (expected_ids, 1))
+
+        # Bookings made at the same time are told apart by their id.
+        SlotBooking.objects.filter(booked_by=self.user).update(booked_at=datetime.datetime(2021, 5, 1, 9))
+        self.assertEqual(self.list_all(2), (sorted(expected_ids, reverse=True), 3))
+
+    def test_page_queries(self):
+        cursor = self.client.get(self.url, {'limit': 2}).data['next_cursor']
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'limit': 2, 'cursor': cursor})
+        self.assertEqual(len(response.data['bookings']), 2)
+
+    def test_invalid_page(self):
+        for params in ({'limit': 0}, {'limit': 101}, {'limit': 'all'}, {'cursor': 'not-a-cursor'}):
+            response = self.client.get(self.url, params)
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, ResponseMessages.INVALID_PAGE.format(100))
+
+    def test_list_bookings_unauthenticated(self):
+        self.client.credentials()
+        self.assertEqual(self.client.get(self.url).status_code, HTTP_401_UNAUTHORIZED)
+
+
 class DeleteCalendarSlotTestCase(APITestCase):
     def setUp(self):
         self.email = 'test1@mail.com'
@@ -325,6 +461,23 @@ class GetAvailableCalendarSlotToBookTestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
         self.assertEqual(response.data, ResponseMessages.USER_NOT_FOUND)
 
+    def test_get_booking_slots_in_window(self):
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+        window_start = self.future_slot.start_time.replace(microsecond=0)
+        response = self.client.get(url, {
+            'start': (window_start - datetime.timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'end': (window_start + datetime.timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        })
+        self.assertEqual([slot['id'] for slot in response.data], [self.future_slot.id])
+        response = self.client.get(url, {'start': (window_start + datetime.timedelta(minutes=1)).strftime("%Y-%m-%dT%H:%M:%SZ")})
+        self.assertEqual(response.data, [])
+
+    def test_get_booking_slots_invalid_window(self):
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+        response = self.client.get(url, {'end': 'tomorrow'})
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+
 
 class BookCalendarSlotTestCase(APITestCase):
     def setUp(self):
@@ -365,7 +518,7 @@ class BookCalendarSlotTestCase(APITestCase):
         )
         expected_response_data = {
             "id": booking.id,
-            "add_to_google_calendar": generate_google_calendar_link(booking)
+            **booking.calendar_links()
         }
         self.assertEqual(response.data, expected_response_data)
         self.assertEqual(SlotBooking.objects.count(), 1)
@@ -380,11 +533,39 @@ class BookCalendarSlotTestCase(APITestCase):
         )
         expected_response_data = {
             "id": booking.id,
-            "add_to_google_calendar": generate_google_calendar_link(booking)
+            **booking.calendar_links()
         }
         self.assertEqual(response.data, expected_response_data)
         self.assertEqual(SlotBooking.objects.count(), 1)
 
+    def test_booking_calendar_links(self):
+        url = reverse('calender_mgmt:book_slot', kwargs={'id': self.future_slot.id})
+        response = self.client.post(url, {'description': "Plan, review; ship"}, format='json')
+        booking = SlotBooking.objects.get(slot=self.future_slot)
+        slot = self.future_slot
+        self.assertEqual(
+            response.data['add_to_google_calendar'],
+            generate_google_calendar_link(self.user.username, booking.id, "Plan, review; ship", slot.start_time, slot.end_time)
+        )
+        self.assertEqual(
+            {key: getattr(booking, key) for key in ('google_calendar_link', 'outlook_calendar_link', 'ics_event')},
+            generate_calendar_links(
+                self.user.username, booking.id, "Plan, review; ship", slot.start_time, slot.end_time, booking.booked_at
+            )
+        )
+        self.assertIn("subject=Meeting+with+test1%40mail.com", response.data['add_to_outlook_calendar'])
+        ics_lines = response.data['ics_event'].split("\r\n")
+        self.assertIn("UID:booking-{}@django-calendly".format(booking.id), ics_lines)
+        self.assertIn("DTSTART:{}".format(slot.start_time.strftime("%Y%m%dT%H%M%SZ")), ics_lines)
+        self.assertIn("DESCRIPTION:Plan\\, review\\; ship\\n\\nBooking ID: {}".format(booking.id), ics_lines)
+
+    def test_ics_lines_folded(self):
+        now = datetime.datetime(2021, 5, 1, 9)
+        ics_event = generate_calendar_links("host", 1, "é" * 100, now, now, now)['ics_event']
+        lines = ics_event.split("\r\n")
+        self.assertTrue(all(len(line.encode()) <= 75 for line in lines))
+        self.assertIn("DESCRIPTION:" + "é" * 100, "".join(line[1:] if line.startswith(" ") else line for line in lines))
+
     def test_book_incorrect_slot(self):
         url = reverse('calender_mgmt:book_slot', kwargs={'id': 5473})
         data = {'description': "Something important"}
@@ -544,3 +725,1883 @@ class CreateSlotsForIntervalTestCase(APITestCase):
         self.assertEqual(response.status_code, HTTP_200_OK)
         self.assertEqual(len(response.data), 5)
         self.assertEqual(CalenderSlot.objects.count(), 5)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_0'])
+class ReplicaRoutingTestCase(APITestCase):
+    # The replica is a separate empty database, so the reads served by it miss the rows written to the primary.
+    databases = {'default', 'replica_0'}
+
+    def setUp(self):
+        cache.clear()
+        self.email = 'test@mail.com'
+        self.password = 'password'
+        self.user = User.objects.create_user(
+            username=self.email, email=self.email, password=self.password
+        )
+        token = Token.objects.create(user=self.user).key
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ token)
+        self.request = RequestFactory().get('/')
+        self.request.user = self.user
+
+    def read_database(self, request):
+        @read_from_replica
+        def view_method(view, request):
+            return router.db_for_read(CalenderSlot)
+        return view_method(None, request)
+
+    def test_replica_view_reads_from_replica(self):
+        self.assertEqual(self.read_database(self.request), 'replica_0')
+        self.assertEqual(router.db_for_read(CalenderSlot), 'default')
+
+    def test_writes_go_to_primary(self):
+        self.assertEqual(router.db_for_write(CalenderSlot), 'default')
+
+    def test_view_served_by_replica(self):
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        url = reverse('calender_mgmt:slot_data')
+        with CaptureQueriesContext(connections['replica_0']) as replica_queries:
+            response = self.client.get(url)
+        self.assertEqual(response.data, [])
+        self.assertTrue(replica_queries.captured_queries)
+
+        pin_to_primary(self.request)
+        with CaptureQueriesContext(connections['replica_0']) as replica_queries:
+            response = self.client.get(url)
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(replica_queries.captured_queries, [])
+
+    def test_pinned_client_reads_from_primary(self):
+        pin_to_primary(self.request)
+        self.assertEqual(self.read_database(self.request), 'default')
+
+    def test_write_request_pins_client(self):
+        url = reverse('calender_mgmt:slot_data')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        data = {'start_time': start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        self.assertFalse(is_pinned(self.request))
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertTrue(is_pinned(self.request))
+        self.assertEqual(self.read_database(self.request), 'default')
+
+    def test_reads_after_write_in_request_from_primary(self):
+        def get_response(request):
+            databases = [self.read_database(request)]
+            CalenderSlot.objects.filter(belongs_to=self.user).update(is_booked=False)
+            return databases + [self.read_database(request)]
+
+        self.assertEqual(ReplicaPinningMiddleware(get_response)(self.request), ['replica_0', 'default'])
+
+    def test_batch_reads_own_writes(self):
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        host = User.objects.create_user(username='host@mail.com', email='host@mail.com', password='password')
+        slot = CalenderSlot.objects.create(
+            belongs_to=host, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        with CaptureQueriesContext(connections['replica_0']) as replica_queries:
+            response = self.client.post(reverse('batch'), {'requests': [
+                {'method': 'POST', 'path': reverse('calender_mgmt:book_slot', kwargs={'id': slot.id}),
+                 'body': {'description': "Booked"}},
+                {'method': 'GET', 'path': reverse('calender_mgmt:available_slots', kwargs={'user_id': host.id})},
+            ]}, format='json')
+        self.assertEqual([sub_response['status'] for sub_response in response.data], [HTTP_200_OK, HTTP_200_OK])
+        self.assertEqual(response.data[1]['body'], [])
+        self.assertEqual(replica_queries.captured_queries, [])
+        self.assertTrue(is_pinned(self.request))
+
+
+class ViewQueryCountTestCase(APITestCase):
+    """Pins the number of queries every view runs, so that extra round trips show up as test failures.
+
+    The token authentication of the registered user accounts for one query in every authenticated request. The
+    transactions of the views run inside the transaction of the test, which adds a `SAVEPOINT` and a
+    `RELEASE SAVEPOINT` query for each of them.
+
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.token = Token.objects.create(user=self.user).key
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        self.other_token = Token.objects.create(user=self.other_user).key
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.user,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(3)
+        ]
+        SlotBooking.objects.create(slot=self.slots[0], booked_by=self.other_user, description="Booked")
+
+    def test_create_slot_queries(self):
+        url = reverse('calender_mgmt:slot_data')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=2)
+        data = {'start_time': start_time.strftime("%Y-%m-%dT%H:%M:%SZ")}
+        with self.assertNumQueries(5):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_list_created_slots_queries(self):
+        url = reverse('calender_mgmt:slot_data')
+        with self.assertNumQueries(3):
+            response = self.client.get(url, format='json')
+        self.assertEqual(len(response.data), 3)
+
+    def test_slot_details_queries(self):
+        url = reverse('calender_mgmt:slot_details', kwargs={'id': self.slots[0].id})
+        with self.assertNumQueries(3):
+            response = self.client.get(url, format='json')
+        self.assertTrue(response.data['is_booked'])
+        url = reverse('calender_mgmt:slot_details', kwargs={'id': self.slots[1].id})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, format='json')
+        self.assertFalse(response.data['is_booked'])
+
+    def test_missing_slot_details_queries(self):
+        url = reverse('calender_mgmt:slot_details', kwargs={'id': 9876})
+        with self.assertNumQueries(2):
+            response = self.client.get(url, format='json')
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_delete_slot_queries(self):
+        url = reverse('calender_mgmt:slot_details', kwargs={'id': self.slots[0].id})
+        with self.assertNumQueries(6):
+            response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_available_slots_queries(self):
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+        self.client.credentials()
+        with self.assertNumQueries(2):
+            response = self.client.get(url, format='json')
+        self.assertEqual(len(response.data), 2)
+
+    def test_book_slot_queries(self):
+        url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[1].id})
+        self.client.credentials()
+        with self.assertNumQueries(8):
+            response = self.client.post(url, {'description': "Important"}, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_cancel_booking_queries(self):
+        url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[0].id})
+        with self.assertNumQueries(8):
+            response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_cancel_missing_booking_queries(self):
+        url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[1].id})
+        with self.assertNumQueries(4):
+            response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_create_interval_slots_queries(self):
+        url = reverse('calender_mgmt:slot_interval')
+        interval_start = datetime.datetime.now() + datetime.timedelta(days=3)
+        data = {
+            "interval_start": interval_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "interval_stop": (interval_start + datetime.timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        }
+        with self.assertNumQueries(6):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(len(response.data), 3)
+
+
+class SlotOverlapConstraintTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        self.start_time = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(days=1)
+        self.slot = self.create_slot(self.user, 0)
+
+    def create_slot(self, user, minutes):
+        start_time = self.start_time + datetime.timedelta(minutes=minutes)
+        return CalenderSlot.objects.create(belongs_to=user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1))
+
+    def test_overlapping_slot_rejected(self):
+        for minutes in (-30, 0, 30):
+            with self.subTest(minutes=minutes):
+                with self.assertRaises(IntegrityError), transaction.atomic():
+                    self.create_slot(self.user, minutes)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CalenderSlot.objects.bulk_create([CalenderSlot(
+                belongs_to=self.user, start_time=self.start_time + datetime.timedelta(minutes=59),
+                end_time=self.start_time + datetime.timedelta(minutes=119)
+            )])
+        self.assertEqual(CalenderSlot.objects.count(), 1)
+
+    def test_constraint_added_again(self):
+        # The migrations add the constraint again after the changes which rebuild the slot table on SQLite.
+        add_overlap_constraint(connection)
+        add_overlap_constraint(connection)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create_slot(self.user, 30)
+
+    def test_adjacent_and_other_user_slots_allowed(self):
+        self.create_slot(self.user, -60)
+        self.create_slot(self.user, 60)
+        self.create_slot(self.other_user, 30)
+        self.assertEqual(CalenderSlot.objects.count(), 4)
+
+    def test_overlapping_update_rejected(self):
+        later_slot = self.create_slot(self.user, 120)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CalenderSlot.objects.filter(id=later_slot.id).update(start_time=self.start_time + datetime.timedelta(minutes=30))
+        later_slot.refresh_from_db()
+        self.assertEqual(later_slot.start_time, self.start_time + datetime.timedelta(minutes=120))
+
+        # Moving a slot next to another, and updating a slot without moving it, do not overlap.
+        CalenderSlot.objects.filter(id=later_slot.id).update(
+            start_time=self.start_time + datetime.timedelta(minutes=60),
+            end_time=self.start_time + datetime.timedelta(minutes=120)
+        )
+        later_slot.refresh_from_db()
+        self.assertEqual(
+            (later_slot.start_time, later_slot.end_time),
+            (self.start_time + datetime.timedelta(minutes=60), self.start_time + datetime.timedelta(minutes=120))
+        )
+        held_until = datetime.datetime.now().replace(microsecond=0)
+        self.slot.held_until = held_until
+        self.slot.save()
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.held_until, held_until)
+
+
+class SlotBookingStateTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        token = Token.objects.create(user=self.user).key
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ token)
+        start_time = datetime.datetime.now() + datetime.timedelta(days=-1)
+        CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.user,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(2)
+        ]
+
+    def assertCounters(self, free, booked):
+        counter = HostSlotCounter.objects.get(host=self.user)
+        self.assertEqual((counter.future_free, counter.future_booked), (free, booked))
+
+    def test_created_slots_counted(self):
+        self.assertCounters(free=2, booked=0)
+        url = reverse('calender_mgmt:slot_interval')
+        interval_start = datetime.datetime.now() + datetime.timedelta(days=3)
+        data = {
+            "interval_start": interval_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "interval_stop": (interval_start + datetime.timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        }
+        self.client.post(url, data, format='json')
+        self.assertCounters(free=4, booked=0)
+
+    def test_booking_and_cancellation(self):
+        url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[0].id})
+        response = self.client.post(url, {'description': "Important"}, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertTrue(CalenderSlot.objects.get(id=self.slots[0].id).is_booked)
+        self.assertCounters(free=1, booked=1)
+        response = self.client.delete(url, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertFalse(CalenderSlot.objects.get(id=self.slots[0].id).is_booked)
+        self.assertCounters(free=2, booked=0)
+
+    def test_deleted_slots_uncounted(self):
+        SlotBooking.objects.create(slot=self.slots[0], description="Important")
+        for slot in self.slots:
+            url = reverse('calender_mgmt:slot_details', kwargs={'id': slot.id})
+            self.client.delete(url, format='json')
+        self.assertCounters(free=0, booked=0)
+
+    def test_check_consistent_state(self):
+        SlotBooking.objects.create(slot=self.slots[0], description="Important")
+        call_command('check_slot_counters', stdout=io.StringIO())
+
+    def test_repair_inconsistent_state(self):
+        SlotBooking.objects.create(slot=self.slots[0], description="Important")
+        CalenderSlot.objects.filter(id=self.slots[0].id).update(is_booked=False)
+        HostSlotCounter.objects.filter(host=self.user).update(future_free=7)
+        with self.assertRaises(CommandError):
+            call_command('check_slot_counters', stdout=io.StringIO())
+        call_command('check_slot_counters', repair=True, stdout=io.StringIO())
+        self.assertTrue(CalenderSlot.objects.get(id=self.slots[0].id).is_booked)
+        self.assertCounters(free=1, booked=1)
+        call_command('check_slot_counters', stdout=io.StringIO())
+
+
+class GroupSlotTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.token = Token.objects.create(user=self.user).key
+        self.invitees = [
+            User.objects.create_user(username='invitee{}@mail.com'.format(number), password='password')
+            for number in range(2)
+        ]
+        self.invitee_tokens = [Token.objects.create(user=invitee).key for invitee in self.invitees]
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        self.start_time = (datetime.datetime.now() + datetime.timedelta(days=1)).replace(microsecond=0)
+        response = self.client.post(reverse('calender_mgmt:slot_data'), {
+            'start_time': self.start_time.strftime("%Y-%m-%dT%H:%M:%SZ"), 'capacity': 3
+        }, format='json')
+        self.slot = CalenderSlot.objects.get(id=response.data['id'])
+        self.book_url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slot.id})
+        self.available_url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+
+    def book(self, token=None):
+        if token is None:
+            self.client.credentials()
+        else:
+            self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ token)
+        return self.client.post(self.book_url, {'description': "Office hours"}, format='json')
+
+    def assertSeats(self, seats_available, is_booked):
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.seats_available, self.slot.is_booked), (seats_available, is_booked))
+
+    def assertCounters(self, free, booked):
+        counter = HostSlotCounter.objects.get(host=self.user)
+        self.assertEqual((counter.future_free, counter.future_booked), (free, booked))
+
+    def test_create_group_slot(self):
+        self.assertEqual((self.slot.capacity, self.slot.seats_available), (3, 3))
+        response = self.client.post(reverse('calender_mgmt:slot_data'), {
+            'start_time': (self.start_time + datetime.timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"), 'capacity': 0
+        }, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+
+    def test_create_group_slots_for_interval(self):
+        interval_start = self.start_time + datetime.timedelta(days=1)
+        response = self.client.post(reverse('calender_mgmt:slot_interval'), {
+            "interval_start": interval_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "interval_stop": (interval_start + datetime.timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "capacity": 10
+        }, format='json')
+        self.assertEqual(
+            list(CalenderSlot.objects.filter(id__in=response.data).values_list('capacity', 'seats_available')),
+            [(10, 10), (10, 10)]
+        )
+
+    def test_seats_booked_until_full(self):
+        for token, seats_available in ((self.invitee_tokens[0], 2), (self.invitee_tokens[1], 1), (None, 0)):
+            response = self.book(token)
+            self.assertEqual(response.status_code, HTTP_200_OK)
+            self.assertSeats(seats_available, seats_available == 0)
+            self.assertCounters(free=1 if seats_available else 0, booked=0 if seats_available else 1)
+        response = self.book(self.token)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.CALENDER_SLOT_ALREADY_BOOKED)
+        self.assertEqual(self.slot.bookings.count(), 3)
+
+    def test_one_seat_per_user(self):
+        self.book(self.invitee_tokens[0])
+        response = self.book(self.invitee_tokens[0])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.CALENDER_SLOT_SEAT_BOOKED)
+        self.assertSeats(2, False)
+        self.assertEqual(self.book().status_code, HTTP_200_OK)
+        self.assertEqual(self.book().status_code, HTTP_200_OK)
+        self.assertSeats(0, True)
+
+    def test_available_with_seats(self):
+        self.book(self.invitee_tokens[0])
+        expected_data = [{
+            'id': self.slot.id, 'start_time': str(self.slot.start_time), 'end_time': str(self.slot.end_time),
+            'capacity': 3, 'seats_available': 2
+        }]
+        self.assertEqual(self.client.get(self.available_url).data, expected_data)
+        with override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 10}):
+            cache.clear()
+            availability_index.clear()
+            self.assertEqual(self.client.get(self.available_url).data, expected_data)
+        self.book(self.invitee_tokens[1])
+        self.book()
+        self.assertEqual(self.client.get(self.available_url).data, [])
+
+    def test_slot_details_list_bookings(self):
+        self.book(self.invitee_tokens[0])
+        self.book()
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        response = self.client.get(reverse('calender_mgmt:slot_details', kwargs={'id': self.slot.id}))
+        self.assertEqual((response.data['capacity'], response.data['seats_available']), (3, 1))
+        self.assertFalse(response.data['is_booked'])
+        self.assertEqual(
+            [booking['booked_by'] for booking in response.data['bookings']], ['invitee0@mail.com', "Anonymous User"]
+        )
+        response = self.client.get(reverse('calender_mgmt:slot_data'))
+        self.assertEqual((response.data[0]['capacity'], response.data[0]['seats_available']), (3, 1))
+        self.assertNotIn('booking_id', response.data[0])
+
+    def test_cancel_seat_of_full_slot(self):
+        for token in (self.invitee_tokens[0], self.invitee_tokens[1], None):
+            self.book(token)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.invitee_tokens[0])
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.client.delete(self.book_url)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(len(callbacks), 1)
+        self.assertSeats(1, False)
+        self.assertCounters(free=1, booked=0)
+        self.assertEqual(self.book(self.invitee_tokens[0]).status_code, HTTP_200_OK)
+        self.assertSeats(0, True)
+
+    def test_host_cancels_all_seats(self):
+        self.book(self.invitee_tokens[0])
+        self.book(self.invitee_tokens[1])
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        response = self.client.delete(self.book_url)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertSeats(3, False)
+        self.assertEqual(self.slot.bookings.count(), 0)
+        self.assertCounters(free=1, booked=0)
+
+    def test_take_seat(self):
+        for seats_available in (2, 1, 0):
+            self.assertEqual(CalenderSlot.take_seat(self.slot.id), seats_available)
+        self.assertIsNone(CalenderSlot.take_seat(self.slot.id))
+        self.assertSeats(0, True)
+
+    def test_hold_covers_last_seat(self):
+        self.book(self.invitee_tokens[0])
+        CalenderSlot.objects.filter(id=self.slot.id).update(
+            held_for=self.invitees[1], held_until=datetime.datetime.now() + datetime.timedelta(minutes=10)
+        )
+        self.assertEqual(self.book().status_code, HTTP_200_OK)
+        response = self.book()
+        self.assertEqual(response.data, ResponseMessages.CALENDER_SLOT_HELD)
+        self.assertEqual(self.book(self.invitee_tokens[1]).status_code, HTTP_200_OK)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.held_for, self.slot.held_until), (None, None))
+
+    def test_repair_seats(self):
+        self.book(self.invitee_tokens[0])
+        CalenderSlot.objects.filter(id=self.slot.id).update(seats_available=0, is_booked=True)
+        with self.assertRaises(CommandError):
+            call_command('check_slot_counters', stdout=io.StringIO())
+        call_command('check_slot_counters', repair=True, stdout=io.StringIO())
+        self.assertSeats(2, False)
+        self.assertCounters(free=1, booked=0)
+        call_command('check_slot_counters', stdout=io.StringIO())
+
+
+@override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 10})
+class AvailabilityIndexTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.clear()
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        self.token = Token.objects.create(user=self.user).key
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=start_time - datetime.timedelta(days=2),
+            end_time=start_time - datetime.timedelta(days=2, hours=-1)
+        )
+        self.slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.user,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in (2, 0, 1)
+        ]
+        self.slots.sort(key=lambda slot: slot.start_time)
+        self.url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+
+    def expected_data(self, slots):
+        return [
+            {'id': slot.id, 'start_time': str(slot.start_time), 'end_time': str(slot.end_time)} for slot in slots
+        ]
+
+    def test_slots_served_from_memory(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data, self.expected_data(self.slots))
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data, self.expected_data(self.slots))
+
+    def test_window(self):
+        response = self.client.get(self.url, {
+            'start': self.slots[1].start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'end': self.slots[2].start_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+        })
+        self.assertEqual(response.data, self.expected_data(self.slots[1:2]))
+
+    def test_unknown_user(self):
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': 5767})
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, ResponseMessages.USER_NOT_FOUND)
+        response = self.client.get(reverse('calender_mgmt:available_slots', kwargs={'user_id': self.other_user.id}))
+        self.assertEqual(response.data, [])
+
+    def test_booking_and_cancellation_invalidate(self):
+        self.client.get(self.url)
+        book_url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[0].id})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(book_url, {'description': "Booked"}, format='json')
+        self.assertEqual(self.client.get(self.url).data, self.expected_data(self.slots[1:]))
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(book_url)
+        self.assertEqual(self.client.get(self.url).data, self.expected_data(self.slots))
+
+    def test_created_and_deleted_slots_invalidate(self):
+        self.client.get(self.url)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        interval_start = (self.slots[0].start_time + datetime.timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('calender_mgmt:slot_interval'), {
+                "interval_start": interval_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                "interval_stop": (interval_start + datetime.timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%SZ")
+            }, format='json')
+        self.assertEqual([slot['id'] for slot in self.client.get(self.url).data][3:], response.data)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('calender_mgmt:slot_details', kwargs={'id': self.slots[0].id}))
+        self.assertNotIn(self.slots[0].id, [slot['id'] for slot in self.client.get(self.url).data])
+
+    def test_least_recently_used_host_evicted(self):
+        index = AvailabilityIndex(max_hosts=1)
+        index.free_slots(self.user.id)
+        index.free_slots(self.other_user.id)
+        self.assertEqual(len(index), 1)
+        with self.assertNumQueries(0):
+            index.free_slots(self.other_user.id)
+        with self.assertNumQueries(2):
+            self.assertEqual(len(index.free_slots(self.user.id)), 3)
+
+
+class TimezoneTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        UserProfile.objects.create(user=self.user, timezone='Asia/Kolkata')
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.create(user=self.user).key)
+        self.start_time = datetime.datetime.now().replace(minute=0, second=0, microsecond=0) + datetime.timedelta(days=2)
+
+    def test_offset_table_matches_zoneinfo(self):
+        zone = zoneinfo.ZoneInfo('America/New_York')
+        table = offset_table('America/New_York')
+        utc_time = datetime.datetime(2021, 3, 13)
+        while utc_time < datetime.datetime(2021, 3, 16):
+            expected = utc_time.replace(tzinfo=datetime.timezone.utc).astimezone(zone)
+            self.assertEqual(table.to_local(utc_time), expected)
+            self.assertEqual(table.to_local(utc_time).utcoffset(), expected.utcoffset())
+            utc_time += datetime.timedelta(minutes=30)
+        self.assertEqual(table.tzinfo_at(datetime.datetime(2021, 11, 7, 5, 59, 59)).utcoffset(None), datetime.timedelta(hours=-4))
+        self.assertEqual(table.tzinfo_at(datetime.datetime(2021, 11, 7, 6)).utcoffset(None), datetime.timedelta(hours=-5))
+
+    def test_parse_timestamp(self):
+        self.assertEqual(parse_timestamp("2021-05-01T10:00:00Z", 'Asia/Kolkata'), datetime.datetime(2021, 5, 1, 10))
+        self.assertEqual(parse_timestamp("2021-05-01T10:00:00+02:00"), datetime.datetime(2021, 5, 1, 8))
+        self.assertEqual(parse_timestamp("2021-05-01T10:00:00", 'Asia/Kolkata'), datetime.datetime(2021, 5, 1, 4, 30))
+        with self.assertRaises(ValueError):
+            parse_timestamp("2021-05-01T10:00:00", 'Nowhere/Special')
+        with self.assertRaises(ValueError):
+            parse_timestamp(5)
+
+    def test_create_slot_in_user_timezone(self):
+        local_start = self.start_time + datetime.timedelta(hours=5, minutes=30)
+        data = {'start_time': local_start.strftime("%Y-%m-%dT%H:%M:%S")}
+        response = self.client.post(reverse('calender_mgmt:slot_data'), data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(CalenderSlot.objects.get().start_time, self.start_time)
+
+    def test_create_interval_slots_in_user_timezone(self):
+        local_start = self.start_time + datetime.timedelta(hours=5, minutes=30)
+        data = {
+            "interval_start": local_start.strftime("%Y-%m-%dT%H:%M:%S"),
+            "interval_stop": (local_start + datetime.timedelta(hours=2)).strftime("%Y-%m-%dT%H:%M:%S")
+        }
+        response = self.client.post(reverse('calender_mgmt:slot_interval'), data, format='json')
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(
+            list(CalenderSlot.objects.order_by('start_time').values_list('start_time', flat=True)),
+            [self.start_time, self.start_time + datetime.timedelta(hours=1)]
+        )
+
+    def test_listings_in_timezone(self):
+        slot = CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=self.start_time, end_time=self.start_time + datetime.timedelta(hours=1)
+        )
+        local_times = {
+            'local_start_time': str((self.start_time + datetime.timedelta(hours=5, minutes=30)).replace(
+                tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+            )),
+            'local_end_time': str((self.start_time + datetime.timedelta(hours=6, minutes=30)).replace(
+                tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+            ))
+        }
+        response = self.client.get(reverse('calender_mgmt:slot_data'))
+        self.assertEqual(response.data[0]['local_start_time'], local_times['local_start_time'])
+        response = self.client.get(reverse('calender_mgmt:slot_details', kwargs={'id': slot.id}))
+        self.assertEqual(response.data['local_end_time'], local_times['local_end_time'])
+
+        self.client.credentials()
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+        response = self.client.get(url)
+        self.assertNotIn('local_start_time', response.data[0])
+        response = self.client.get(url, {'tz': 'Asia/Kolkata'})
+        self.assertEqual(response.data, [dict(
+            id=slot.id, start_time=str(slot.start_time), end_time=str(slot.end_time), **local_times
+        )])
+
+    def test_listing_invalid_timezone(self):
+        url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+        response = self.client.get(url, {'tz': 'Nowhere/Special'})
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_TIMEZONE)
+
+
+@override_settings(SLOT_EVENTS={
+    'ENABLED': True, 'BROKER': 'calender_mgmt.events.LocalBroker', 'KEEPALIVE_SECONDS': 15, 'QUEUE_SIZE': 2
+})
+class SlotEventsTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.slot = CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        self.url = reverse('calender_mgmt:slot_events', kwargs={'user_id': self.user.id})
+
+    def book_slot(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            SlotBooking.objects.create(slot=self.slot, description="Booked")
+
+    async def test_stream_slot_events(self):
+        response = await self.async_client.get(self.url)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        self.assertEqual(await anext(stream), b": connected\n\n")
+        await sync_to_async(self.book_slot)()
+        event = await asyncio.wait_for(anext(stream), 5)
+        self.assertEqual(event, 'event: booked\ndata: {{"event": "booked", "slot_ids": [{}]}}\n\n'.format(self.slot.id).encode())
+
+    async def test_unsubscribed_on_close(self):
+        broker = get_broker()
+        stream = event_stream(self.user.id)
+        await anext(stream)
+        self.assertEqual(broker.subscriber_count(self.user.id), 1)
+        broker.publish(self.user.id, {'event': SlotEvents.DELETED, 'slot_ids': [self.slot.id]})
+        self.assertTrue((await anext(stream)).startswith("event: deleted\n"))
+        await stream.aclose()
+        self.assertEqual(broker.subscriber_count(self.user.id), 0)
+
+    async def test_slow_subscriber_resynced(self):
+        broker = LocalBroker()
+        subscription = broker.subscribe(self.user.id, 2)
+        for slot_id in range(3):
+            broker.publish(self.user.id, {'event': SlotEvents.CREATED, 'slot_ids': [slot_id]})
+        await asyncio.sleep(0)
+        self.assertEqual(subscription.queue.qsize(), 1)
+        self.assertEqual(subscription.queue.get_nowait(), RESYNC)
+
+    def test_missing_user(self):
+        url = reverse('calender_mgmt:slot_events', kwargs={'user_id': 9876})
+        response = async_to_sync(self.async_client.get)(url)
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), ResponseMessages.USER_NOT_FOUND)
+
+    def test_not_served_by_wsgi(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(response.json(), ResponseMessages.SLOT_EVENTS_UNAVAILABLE)
+
+    def test_not_batched(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.create(user=self.user).key)
+        response = self.client.post(reverse('batch'), {'requests': [{'method': 'GET', 'path': self.url}]}, format='json')
+        self.assertEqual(response.data, [{'status': HTTP_404_NOT_FOUND, 'body': ResponseMessages.BATCH_PATH_NOT_FOUND}])
+
+
+class BatchRequestTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.create(user=self.user).key)
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.slot = CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        self.url = reverse('batch')
+
+    def test_batch_authenticated_once(self):
+        data = {'requests': [
+            {'method': 'GET', 'path': reverse('calender_mgmt:slot_data')},
+            {'method': 'GET', 'path': reverse('calender_mgmt:slot_details', kwargs={'id': self.slot.id})},
+            {'method': 'GET', 'path': reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})},
+        ]}
+        with self.assertNumQueries(5):
+            response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual([sub_response['status'] for sub_response in response.data], [HTTP_200_OK] * 3)
+        self.assertEqual(response.data[0]['body'][0]['id'], self.slot.id)
+        self.assertEqual(response.data[1]['body']['is_booked'], False)
+        self.assertEqual(response.data[2]['body'][0]['id'], self.slot.id)
+
+    def test_batch_writes_in_order(self):
+        book_path = reverse('calender_mgmt:book_slot', kwargs={'id': self.slot.id})
+        data = {'requests': [
+            {'method': 'POST', 'path': book_path, 'body': {'description': "Booked"}},
+            {'method': 'POST', 'path': book_path, 'body': {'description': "Booked again"}},
+            {'method': 'GET', 'path': reverse('calender_mgmt:slot_details', kwargs={'id': self.slot.id}) + '?tz=Asia/Kolkata'},
+        ]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual([sub_response['status'] for sub_response in response.data], [HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_200_OK])
+        self.assertEqual(response.data[1]['body'], ResponseMessages.CALENDER_SLOT_ALREADY_BOOKED)
+        self.assertEqual(response.data[2]['body']['booked_by'], 'test1@mail.com')
+        self.assertIn('local_start_time', response.data[2]['body'])
+
+    def test_batch_anonymous(self):
+        self.client.credentials()
+        data = {'requests': [
+            {'method': 'GET', 'path': reverse('calender_mgmt:slot_data')},
+            {'method': 'GET', 'path': reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})},
+        ]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual([sub_response['status'] for sub_response in response.data], [HTTP_401_UNAUTHORIZED, HTTP_200_OK])
+
+    def test_batch_other_paths(self):
+        data = {'requests': [
+            {'method': 'POST', 'path': reverse('user_mgmt:register'), 'body': {'email': 'a@mail.com', 'password': 'a'}},
+            {'method': 'POST', 'path': self.url, 'body': {'requests': []}},
+            {'method': 'GET', 'path': '/nowhere/'},
+        ]}
+        response = self.client.post(self.url, data, format='json')
+        self.assertEqual(response.data, [{'status': HTTP_404_NOT_FOUND, 'body': ResponseMessages.BATCH_PATH_NOT_FOUND}] * 3)
+        self.assertEqual(User.objects.count(), 2)
+
+    def test_batch_invalid(self):
+        response = self.client.post(self.url, {'requests': [{'path': '/calender/slot/'}]}, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+        response = self.client.post(self.url, [{'method': 'GET', 'path': '/calender/slot/'}], format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+        with override_settings(BATCH_MAX_REQUESTS=1):
+            response = self.client.post(self.url, {'requests': [{'method': 'GET', 'path': '/calender/slot/'}] * 2}, format='json')
+        self.assertEqual(response.data, ResponseMessages.BATCH_TOO_LARGE.format(1))
+
+
+class ParallelBatchRequestTestCase(APITransactionTestCase):
+    def test_parallel_reads(self):
+        user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.create(user=user).key)
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        slots = [
+            CalenderSlot.objects.create(
+                belongs_to=user,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(4)
+        ]
+        data = {'parallel': True, 'requests': [
+            {'method': 'GET', 'path': reverse('calender_mgmt:slot_details', kwargs={'id': slot.id})} for slot in slots
+        ] + [
+            {'method': 'DELETE', 'path': reverse('calender_mgmt:slot_details', kwargs={'id': slots[0].id})},
+            {'method': 'GET', 'path': reverse('calender_mgmt:slot_data')},
+        ]}
+        response = self.client.post(reverse('batch'), data, format='json')
+        self.assertEqual([sub_response['body']['id'] for sub_response in response.data[:4]], [slot.id for slot in slots])
+        self.assertEqual(response.data[4]['status'], HTTP_200_OK)
+        self.assertEqual(len(response.data[5]['body']), 3)
+
+
+class GroupCommitTestCase(APITransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.user, start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(3)
+        ]
+
+    def book(self, slot, statuses):
+        try:
+            response = APIClient().post(
+                reverse('calender_mgmt:book_slot', kwargs={'id': slot.id}), {'description': "Booked"}, format='json'
+            )
+            statuses.append(response.status_code)
+        finally:
+            connection.close()
+
+    @override_settings(BOOKING_GROUP_COMMIT={'ENABLED': True, 'WINDOW_MS': 2000, 'MAX_BATCH': 4})
+    def test_concurrent_bookings_committed_together(self):
+        statuses = []
+        threads = [
+            threading.Thread(target=self.book, args=(slot, statuses))
+            for slot in self.slots + [self.slots[2]]
+        ]
+        with mock.patch.object(booking_queue, 'commit', wraps=booking_queue.commit) as commit:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(commit.call_count, 1)
+        self.assertEqual(sorted(statuses), [HTTP_200_OK] * 3 + [HTTP_400_BAD_REQUEST])
+        self.assertEqual(SlotBooking.objects.count(), 3)
+        self.assertFalse(CalenderSlot.objects.filter(seats_available__gt=0).exists())
+        self.assertEqual(HostSlotCounter.objects.get(host=self.user).future_booked, 3)
+
+    def book_group_slot_twice(self):
+        slot = self.slots[0]
+        CalenderSlot.objects.filter(id=slot.id).update(capacity=5, seats_available=5)
+        statuses = []
+        threads = [threading.Thread(target=self.book, args=(slot, statuses)) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(statuses, [HTTP_200_OK] * 2)
+        self.assertEqual(SlotBooking.objects.filter(slot=slot).count(), 2)
+        self.assertEqual(CalenderSlot.objects.get(id=slot.id).seats_available, 3)
+
+    @override_settings(BOOKING_GROUP_COMMIT={'ENABLED': True, 'WINDOW_MS': 2000, 'MAX_BATCH': 2})
+    def test_failing_receiver_not_booked_again(self):
+        def failing_receiver(**kwargs):
+            raise ConnectionError("The cache is unavailable.")
+
+        slots_changed.connect(failing_receiver, dispatch_uid='failing_receiver')
+        self.addCleanup(slots_changed.disconnect, dispatch_uid='failing_receiver')
+        with self.assertLogs('django.db.backends.base', 'ERROR'):
+            self.book_group_slot_twice()
+
+    @override_settings(BOOKING_GROUP_COMMIT={'ENABLED': True, 'WINDOW_MS': 2000, 'MAX_BATCH': 2})
+    def test_failure_after_commit_not_booked_again(self):
+        def failing_callback():
+            raise ConnectionError("The callback failed.")
+
+        def create_booking(slot, user, description):
+            transaction.on_commit(failing_callback)
+            return SlotBooking.objects.create(slot=slot, booked_by=user, description=description)
+
+        with mock.patch('calender_mgmt.group_commit._create_booking', create_booking):
+            self.book_group_slot_twice()
+
+    @override_settings(BOOKING_GROUP_COMMIT={'ENABLED': True, 'WINDOW_MS': 2000, 'MAX_BATCH': 4})
+    def test_bookings_in_transaction_not_grouped(self):
+        with mock.patch.object(booking_queue, 'book') as book, transaction.atomic():
+            booking = book_slot(self.slots[0], None, "Booked")
+        book.assert_not_called()
+        self.assertTrue(SlotBooking.objects.filter(id=booking.id).exists())
+
+
+class WaitlistTestCase(APITestCase):
+    def setUp(self):
+        self.host = User.objects.create_user(username='host@mail.com', email='host@mail.com', password='password')
+        self.booker = User.objects.create_user(username='booker@mail.com', email='booker@mail.com', password='password')
+        self.waiters = [
+            User.objects.create_user(username='waiter{}@mail.com'.format(number), email='waiter{}@mail.com'.format(number), password='password')
+            for number in range(2)
+        ]
+        self.tokens = {user.id: Token.objects.create(user=user).key for user in [self.booker] + self.waiters}
+        start_time = datetime.datetime.now().replace(microsecond=0) + datetime.timedelta(days=1)
+        self.slot = CalenderSlot.objects.create(
+            belongs_to=self.host, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        SlotBooking.objects.create(slot=self.slot, booked_by=self.booker, description="Booked")
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.tokens[user.id])
+
+    def join(self, user, window_start, window_end):
+        self.authenticate(user)
+        return self.client.post(reverse('calender_mgmt:waitlist'), {
+            'host_id': self.host.id,
+            'window_start': window_start.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'window_end': window_end.strftime("%Y-%m-%dT%H:%M:%SZ")
+        }, format='json')
+
+    def cancel(self):
+        self.authenticate(self.booker)
+        offers = []
+        receiver = lambda sender, **kwargs: offers.append(kwargs)
+        slot_offered.connect(receiver)
+        try:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.delete(reverse('calender_mgmt:book_slot', kwargs={'id': self.slot.id}))
+        finally:
+            slot_offered.disconnect(receiver)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        return offers
+
+    def test_cancelled_slot_offered_to_oldest_matching_waiter(self):
+        day = datetime.timedelta(days=1)
+        self.join(self.waiters[0], self.slot.start_time + datetime.timedelta(minutes=1), self.slot.end_time + day)
+        self.join(self.waiters[1], self.slot.start_time - day, self.slot.end_time)
+        self.join(self.waiters[0], self.slot.start_time - day, self.slot.end_time + day)
+        offers = self.cancel()
+        self.assertEqual([offer['waiter_id'] for offer in offers], [self.waiters[1].id])
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.held_for, self.waiters[1])
+        self.assertEqual(WaitlistEntry.objects.filter(waiter=self.waiters[1]).count(), 0)
+        self.assertEqual(WaitlistEntry.objects.filter(waiter=self.waiters[0]).count(), 2)
+
+        self.authenticate(self.waiters[1])
+        response = self.client.get(reverse('calender_mgmt:waitlist'))
+        self.assertEqual(response.data['entries'], [])
+        self.assertEqual([offer['id'] for offer in response.data['offers']], [self.slot.id])
+
+    def test_held_slot_booked_by_waiter_only(self):
+        self.join(self.waiters[0], self.slot.start_time, self.slot.end_time)
+        self.cancel()
+        self.client.credentials()
+        response = self.client.get(reverse('calender_mgmt:available_slots', kwargs={'user_id': self.host.id}))
+        self.assertEqual(response.data, [])
+        book_url = reverse('calender_mgmt:book_slot', kwargs={'id': self.slot.id})
+        response = self.client.post(book_url, {'description': "Mine"}, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.CALENDER_SLOT_HELD)
+
+        self.authenticate(self.waiters[0])
+        response = self.client.post(book_url, {'description': "Mine"}, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.slot.refresh_from_db()
+        self.assertEqual((self.slot.is_booked, self.slot.held_for, self.slot.held_until), (True, None, None))
+
+    def test_cancelled_slot_without_waiters_stays_free(self):
+        self.join(self.waiters[0], self.slot.end_time, self.slot.end_time + datetime.timedelta(hours=1))
+        self.assertEqual(self.cancel(), [])
+        self.slot.refresh_from_db()
+        self.assertIsNone(self.slot.held_for)
+
+    def test_expired_hold_offered_to_next_waiter(self):
+        self.join(self.waiters[0], self.slot.start_time, self.slot.end_time)
+        self.join(self.waiters[1], self.slot.start_time, self.slot.end_time)
+        self.cancel()
+        CalenderSlot.objects.filter(id=self.slot.id).update(held_until=datetime.datetime.now())
+        call_command('offer_expired_holds', stdout=io.StringIO())
+        self.slot.refresh_from_db()
+        self.assertEqual(self.slot.held_for, self.waiters[1])
+        self.assertGreater(self.slot.held_until, datetime.datetime.now())
+
+    def test_join_and_leave_waitlist(self):
+        response = self.join(self.waiters[0], self.slot.end_time, self.slot.start_time)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_WAITLIST_WINDOW)
+        response = self.join(self.waiters[0], self.slot.start_time, self.slot.end_time)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.authenticate(self.waiters[1])
+        url = reverse('calender_mgmt:waitlist_entry', kwargs={'id': response.data['id']})
+        self.assertEqual(self.client.delete(url).status_code, HTTP_404_NOT_FOUND)
+        self.authenticate(self.waiters[0])
+        self.assertEqual(self.client.delete(url).status_code, HTTP_200_OK)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_join_waitlist_invalid_host(self):
+        self.authenticate(self.waiters[0])
+        for host_id in ("abc", None, [self.host.id], True, float(self.host.id) + 0.7, "-1"):
+            response = self.client.post(reverse('calender_mgmt:waitlist'), {
+                'host_id': host_id,
+                'window_start': self.slot.start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+                'window_end': self.slot.end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+            }, format='json')
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+        self.assertFalse(WaitlistEntry.objects.exists())
+        response = self.client.post(reverse('calender_mgmt:waitlist'), {
+            'host_id': str(self.host.id),
+            'window_start': self.slot.start_time.strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'window_end': self.slot.end_time.strftime("%Y-%m-%dT%H:%M:%SZ")
+        }, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(WaitlistEntry.objects.get().host, self.host)
+
+
+class TeamTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.clear()
+        self.owner = User.objects.create_user(username='owner@mail.com', email='owner@mail.com', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.create(user=self.owner).key)
+        self.members = [
+            User.objects.create_user(username='member{}@mail.com'.format(number), password='password')
+            for number in range(3)
+        ]
+        self.start_time = (datetime.datetime.now() + datetime.timedelta(days=1)).replace(minute=0, second=0, microsecond=0)
+        # The first two members are free at the first hour, and every member at one more hour of their own.
+        for number, member in enumerate(self.members):
+            for hour in ([0] if number < 2 else []) + [number + 1]:
+                start_time = self.start_time + datetime.timedelta(hours=hour)
+                CalenderSlot.objects.create(
+                    belongs_to=member, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+                )
+        response = self.client.post(reverse('calender_mgmt:teams'), {
+            'name': "Support", 'members': [member.id for member in self.members]
+        }, format='json')
+        self.team = Team.objects.get(id=response.data['id'])
+        self.slots_url = reverse('calender_mgmt:team_slots', kwargs={'id': self.team.id})
+        self.book_url = reverse('calender_mgmt:book_team_slot', kwargs={'id': self.team.id})
+        self.client.credentials()
+
+    def expected_times(self, hours):
+        return [{
+            'start_time': str(self.start_time + datetime.timedelta(hours=hour)),
+            'end_time': str(self.start_time + datetime.timedelta(hours=hour + 1))
+        } for hour in hours]
+
+    def book(self, hour):
+        return self.client.post(self.book_url, {
+            'start_time': (self.start_time + datetime.timedelta(hours=hour)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'description': "Support call"
+        }, format='json')
+
+    def test_create_and_list_teams(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.get(user=self.owner).key)
+        response = self.client.get(reverse('calender_mgmt:teams'))
+        self.assertEqual(response.data[0]['members'], sorted(member.id for member in self.members))
+        response = self.client.post(reverse('calender_mgmt:teams'), {'name': "Sales", 'members': [5767]}, format='json')
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data, ResponseMessages.USER_NOT_FOUND)
+        response = self.client.post(reverse('calender_mgmt:teams'), {'name': "Sales", 'members': "1"}, format='json')
+        self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+        response = self.client.post(reverse('calender_mgmt:teams'), {'members': []}, format='json')
+        self.assertEqual(response.data, ResponseMessages.MISSING_KEY.format('name'))
+
+    def test_team_slots_merged(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(self.slots_url)
+        self.assertEqual(response.data, self.expected_times([0, 1, 2, 3]))
+        response = self.client.get(self.slots_url, {
+            'start': (self.start_time + datetime.timedelta(hours=1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            'end': (self.start_time + datetime.timedelta(hours=3)).strftime("%Y-%m-%dT%H:%M:%SZ")
+        })
+        self.assertEqual(response.data, self.expected_times([1, 2]))
+        with override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 10}):
+            self.assertEqual(self.client.get(self.slots_url).data, self.expected_times([0, 1, 2, 3]))
+
+    def test_unknown_team(self):
+        url = reverse('calender_mgmt:team_slots', kwargs={'id': 5767})
+        self.assertEqual(self.client.get(url).data, ResponseMessages.TEAM_NOT_FOUND)
+        url = reverse('calender_mgmt:book_team_slot', kwargs={'id': 5767})
+        response = self.client.post(url, {'start_time': "2030-01-01T10:00:00Z", 'description': "Call"}, format='json')
+        self.assertEqual(response.status_code, HTTP_404_NOT_FOUND)
+
+    def test_book_team_slot_invalid_start_time(self):
+        response = self.client.post(self.book_url, {'start_time': 5, 'description': "Call"}, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+
+    def test_least_loaded_member_assigned(self):
+        HostSlotCounter.objects.filter(host=self.members[0]).update(future_booked=5)
+        response = self.book(0)
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['host_id'], self.members[1].id)
+        self.assertEqual(self.client.get(self.slots_url).data, self.expected_times([0, 1, 2, 3]))
+        response = self.book(0)
+        self.assertEqual(response.data['host_id'], self.members[0].id)
+        self.assertEqual(self.client.get(self.slots_url).data, self.expected_times([1, 2, 3]))
+        response = self.book(0)
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.TEAM_TIME_UNAVAILABLE)
+
+    def test_bookings_rotate_through_members(self):
+        for hour in range(3):
+            start_time = self.start_time + datetime.timedelta(days=1, hours=hour)
+            for member in self.members:
+                CalenderSlot.objects.create(
+                    belongs_to=member, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+                )
+        HostSlotCounter.objects.update(future_booked=0)
+        assigned = [self.book(24 + hour).data['host_id'] for hour in range(3)]
+        self.assertEqual(assigned, [member.id for member in self.members])
+
+    def test_next_member_when_slot_taken(self):
+        slot = CalenderSlot.objects.get(belongs_to=self.members[0], start_time=self.start_time)
+        with mock.patch('calender_mgmt.views.assignable_slots', return_value=[
+            CalenderSlot.objects.select_related('belongs_to').get(id=slot.id),
+            CalenderSlot.objects.select_related('belongs_to').get(belongs_to=self.members[1], start_time=self.start_time)
+        ]):
+            SlotBooking.objects.create(slot=slot, description="Taken")
+            response = self.book(0)
+        self.assertEqual(response.data['host_id'], self.members[1].id)
+
+    def test_large_team_queries(self):
+        hosts = User.objects.bulk_create(
+            User(username='host{}@mail.com'.format(number)) for number in range(150)
+        )
+        CalenderSlot.objects.bulk_create(
+            CalenderSlot(
+                belongs_to=host, start_time=self.start_time + datetime.timedelta(hours=hour),
+                end_time=self.start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for host in hosts for hour in range(4, 8)
+        )
+        self.team.members.add(*hosts)
+        with self.assertNumQueries(3):
+            response = self.client.get(self.slots_url)
+        self.assertEqual(response.data, self.expected_times(range(8)))
+        with override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 200}):
+            # The members missing from the index are loaded together, with their slots and their rules.
+            with self.assertNumQueries(3):
+                response = self.client.get(self.slots_url)
+            self.assertEqual(response.data, self.expected_times(range(8)))
+            with self.assertNumQueries(1):
+                response = self.client.get(self.slots_url)
+        self.assertEqual(response.data, self.expected_times(range(8)))
+
+        availability_index.clear()
+        with override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 100}):
+            with self.assertNumQueries(3):
+                response = self.client.get(self.slots_url)
+        self.assertEqual(response.data, self.expected_times(range(8)))
+        self.assertEqual(len(availability_index), 0)
+
+
+class BookingRulesTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        self.token = Token.objects.create(user=self.user).key
+        self.start_time = (datetime.datetime.now() + datetime.timedelta(days=2)).replace(
+            hour=10, minute=0, second=0, microsecond=0
+        )
+        self.slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.user,
+                start_time=self.start_time + datetime.timedelta(hours=hour),
+                end_time=self.start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(3)
+        ]
+        self.url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+
+    def set_rules(self, **rules):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        response = self.client.put(reverse('calender_mgmt:booking_rules'), rules, format='json')
+        self.client.credentials()
+        return response
+
+    def book(self, slot):
+        return self.client.post(reverse('calender_mgmt:book_slot', kwargs={'id': slot.id}), {'description': "Booked"}, format='json')
+
+    def available_ids(self):
+        return [slot['id'] for slot in self.client.get(self.url).data]
+
+    def test_set_rules(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        response = self.client.get(reverse('calender_mgmt:booking_rules'))
+        self.assertEqual(response.data, {'buffer_minutes': 0, 'max_bookings_per_day': None, 'minimum_notice_minutes': 0})
+        response = self.set_rules(buffer_minutes=15, max_bookings_per_day=6)
+        self.assertEqual(response.data, {'buffer_minutes': 15, 'max_bookings_per_day': 6, 'minimum_notice_minutes': 0})
+        response = self.set_rules(minimum_notice_minutes=240, max_bookings_per_day=None)
+        self.assertEqual(response.data, {'buffer_minutes': 15, 'max_bookings_per_day': None, 'minimum_notice_minutes': 240})
+        for rules in ({'buffer_minutes': -1}, {'max_bookings_per_day': 0}, {'minimum_notice_minutes': "4"}):
+            response = self.set_rules(**rules)
+            self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+            self.assertEqual(response.data, ResponseMessages.INVALID_DATA)
+
+    def test_minimum_notice(self):
+        self.set_rules(minimum_notice_minutes=3 * 24 * 60)
+        self.assertEqual(self.available_ids(), [])
+        response = self.book(self.slots[0])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.BOOKING_NOTICE_TOO_SHORT)
+        self.assertFalse(SlotBooking.objects.exists())
+        self.assertEqual(CalenderSlot.objects.get(id=self.slots[0].id).seats_available, 1)
+
+    def test_daily_cap(self):
+        self.set_rules(max_bookings_per_day=1)
+        self.assertEqual(self.book(self.slots[0]).status_code, HTTP_200_OK)
+        self.assertEqual(HostDailyBookings.objects.get(host=self.user).bookings, 1)
+        self.assertEqual(self.available_ids(), [])
+        response = self.book(self.slots[1])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.BOOKING_DAY_FULL)
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        self.client.delete(reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[0].id}))
+        self.assertEqual(HostDailyBookings.objects.get(host=self.user).bookings, 0)
+        self.assertEqual(self.available_ids(), [slot.id for slot in self.slots])
+
+    def test_group_slot_counts_once(self):
+        group_slot = CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=self.start_time + datetime.timedelta(hours=4),
+            end_time=self.start_time + datetime.timedelta(hours=5), capacity=3
+        )
+        self.set_rules(max_bookings_per_day=1)
+        self.assertEqual(self.book(group_slot).status_code, HTTP_200_OK)
+        self.assertEqual(self.book(group_slot).status_code, HTTP_200_OK)
+        self.assertEqual(HostDailyBookings.objects.get(host=self.user).bookings, 1)
+        self.assertEqual(self.available_ids(), [group_slot.id])
+        self.assertEqual(self.book(self.slots[0]).data, ResponseMessages.BOOKING_DAY_FULL)
+
+    def test_buffer(self):
+        self.set_rules(buffer_minutes=15)
+        self.assertEqual(self.book(self.slots[1]).status_code, HTTP_200_OK)
+        self.assertEqual(self.available_ids(), [])
+        response = self.book(self.slots[2])
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.BOOKING_BUFFER_CONFLICT)
+        self.set_rules(buffer_minutes=0)
+        self.assertEqual(self.available_ids(), [self.slots[0].id, self.slots[2].id])
+
+    def test_days_of_the_timezone(self):
+        self.set_rules(max_bookings_per_day=1)
+        self.book(self.slots[0])
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        # The booked slot ends the day in Tonga (UTC+13), and the other slots start the next one.
+        self.client.put(reverse('user_mgmt:profile'), {'timezone': 'Pacific/Tongatapu'}, format='json')
+        self.client.credentials()
+        self.assertEqual(
+            list(HostDailyBookings.objects.filter(host=self.user).values_list('day', 'bookings')),
+            [(self.start_time.date(), 1)]
+        )
+        self.assertEqual(self.available_ids(), [self.slots[1].id, self.slots[2].id])
+
+    def test_rules_in_availability_index(self):
+        with override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 10}):
+            cache.clear()
+            availability_index.clear()
+            self.assertEqual(len(self.available_ids()), 3)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.set_rules(buffer_minutes=15)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.book(self.slots[0])
+            self.assertEqual(self.available_ids(), [self.slots[2].id])
+            with self.assertNumQueries(0):
+                self.available_ids()
+
+    def test_team_booking_skips_member_at_cap(self):
+        team = Team.objects.create(name="Team", owner=self.user)
+        team.members.set([self.user, self.other_user])
+        CalenderSlot.objects.create(
+            belongs_to=self.other_user, start_time=self.slots[1].start_time, end_time=self.slots[1].end_time
+        )
+        self.set_rules(max_bookings_per_day=1)
+        self.book(self.slots[0])
+        times = self.client.get(reverse('calender_mgmt:team_slots', kwargs={'id': team.id})).data
+        self.assertEqual([time['start_time'] for time in times], [str(self.slots[1].start_time)])
+        response = self.client.post(reverse('calender_mgmt:book_team_slot', kwargs={'id': team.id}), {
+            'start_time': self.slots[1].start_time.strftime("%Y-%m-%dT%H:%M:%SZ"), 'description': "Booked"
+        }, format='json')
+        self.assertEqual(response.data['host_id'], self.other_user.id)
+
+    def test_available_slots_queries(self):
+        self.set_rules(buffer_minutes=15, max_bookings_per_day=2, minimum_notice_minutes=60)
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+        self.assertEqual(len(response.data), 3)
+
+
+class ProvisionSlotsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        UserProfile.objects.create(user=self.other_user, timezone='America/New_York')
+        self.first_day = datetime.date.today() + datetime.timedelta(days=1)
+        self.template = self.write_template({
+            'days': ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun'], 'start': "09:00", 'end': "12:00"
+        })
+
+    def write_template(self, template):
+        template_file = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        self.addCleanup(os.remove, template_file.name)
+        with template_file:
+            json.dump(template, template_file)
+        return template_file.name
+
+    def provision(self, *args, **options):
+        stdout = io.StringIO()
+        call_command(
+            'provision_slots', *args, '--start-date', self.first_day.isoformat(), '--days', '2', '--workers', '1',
+            stdout=stdout, **options
+        )
+        return stdout.getvalue()
+
+    def test_provision_users(self):
+        output = self.provision(self.template, 'test1@mail.com', 'test2@mail.com', chunk_size=1)
+        self.assertIn("Created 12 slots for 2 users", output)
+        local_starts = [
+            datetime.datetime.combine(self.first_day + datetime.timedelta(days=day), datetime.time(hour))
+            for day in range(2) for hour in (9, 10, 11)
+        ]
+        self.assertEqual(
+            list(CalenderSlot.objects.filter(belongs_to=self.other_user).order_by('start_time').values_list(
+                'start_time', flat=True
+            )),
+            [offset_table('America/New_York').to_utc(local_start) for local_start in local_starts]
+        )
+        self.assertEqual(HostSlotCounter.objects.get(host=self.user).future_free, 6)
+        self.assertEqual(HostSlotCounter.objects.get(host=self.other_user).future_free, 6)
+
+    def test_existing_slots_skipped(self):
+        start_time = datetime.datetime.combine(self.first_day, datetime.time(9, 30))
+        CalenderSlot.objects.create(
+            belongs_to=self.user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+        )
+        output = self.provision(self.template, 'test1@mail.com')
+        self.assertIn("Created 4 slots", output)
+        self.assertIn("Skipped 2 slots", output)
+        self.assertEqual(HostSlotCounter.objects.get(host=self.user).future_free, 5)
+        self.assertIn("Created 0 slots", self.provision(self.template, 'test1@mail.com'))
+
+    def test_skipped_local_times(self):
+        # 02:00 does not exist in Berlin on the last Sunday of March, and is moved to 03:00.
+        template = ScheduleTemplate(range(7), datetime.time(1), datetime.time(4))
+        first_day = datetime.date(datetime.date.today().year + 1, 3, 31)
+        while first_day.weekday() != 6:
+            first_day -= datetime.timedelta(days=1)
+        self.assertEqual(provision_hosts([(self.user.id, 'Europe/Berlin')], template, first_day, 1), (2, 0))
+        self.assertEqual(
+            sorted(CalenderSlot.objects.values_list('start_time', flat=True)),
+            [datetime.datetime.combine(first_day, datetime.time(hour)) for hour in (0, 1)]
+        )
+
+    def test_invalid_input(self):
+        with self.assertRaisesMessage(CommandError, "1 unknown usernames: nobody@mail.com"):
+            self.provision(self.template, 'test1@mail.com', 'nobody@mail.com')
+        with self.assertRaisesMessage(CommandError, "Invalid template"):
+            self.provision(self.write_template({'days': ['mon'], 'start': "17:00", 'end': "09:00"}), 'test1@mail.com')
+        self.assertFalse(CalenderSlot.objects.exists())
+
+
+class ProvisionSlotsPoolTestCase(TransactionTestCase):
+    """Runs the pool of `provision_slots` against a file copy of the test database, which the forked workers open
+    with their own connections, unlike the in-memory one.
+
+    """
+    def setUp(self):
+        if multiprocessing.get_start_method() != 'fork':
+            self.skipTest("The workers only inherit the database of the test when forked.")
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'db.sqlite3')
+        connection.ensure_connection()
+        with sqlite3.connect(path) as target:
+            connection.connection.backup(target)
+        # Closing an in-memory database would drop it, so its connection is kept aside until the test ends.
+        name, memory_connection = connection.settings_dict['NAME'], connection.connection
+        connection.connection = None
+        connection.settings_dict['NAME'] = path
+
+        def restore():
+            connection.close()
+            connection.settings_dict['NAME'] = name
+            connection.connection = memory_connection
+
+        self.addCleanup(restore)
+
+    def test_provision_users_in_pool(self):
+        template = tempfile.NamedTemporaryFile('w', suffix='.json', delete=False)
+        self.addCleanup(os.remove, template.name)
+        with template:
+            json.dump({'days': list(DAYS), 'start': "09:00", 'end': "12:00"}, template)
+        # The current days of the users are a day apart, whatever the time.
+        timezones = ['Pacific/Kiritimati', 'Pacific/Pago_Pago', 'UTC', 'Asia/Kolkata']
+        for number, timezone_key in enumerate(timezones):
+            user = User.objects.create_user(username='test{}@mail.com'.format(number), password='password')
+            UserProfile.objects.create(user=user, timezone=timezone_key)
+        stdout = io.StringIO()
+        call_command(
+            'provision_slots', template.name, *['test{}@mail.com'.format(number) for number in range(4)],
+            '--days', '2', '--workers', '2', '--chunk-size', '1', stdout=stdout
+        )
+        self.assertIn("for 4 users", stdout.getvalue())
+        self.assertIn("with 2 workers", stdout.getvalue())
+        now = datetime.datetime.now()
+        for timezone_key in timezones:
+            offsets = offset_table(timezone_key)
+            today = offsets.to_local(now).date()
+            local_starts = [
+                offsets.to_local(start_time).replace(tzinfo=None) for start_time in CalenderSlot.objects.filter(
+                    belongs_to__profile__timezone=timezone_key
+                ).order_by('start_time').values_list('start_time', flat=True)
+            ]
+            tomorrow = today + datetime.timedelta(days=1)
+            self.assertEqual(
+                local_starts[-3:], [datetime.datetime.combine(tomorrow, datetime.time(hour)) for hour in (9, 10, 11)]
+            )
+            self.assertTrue(all(local_start.date() == today for local_start in local_starts[:-3]))
+            self.assertEqual(
+                HostSlotCounter.objects.get(host__profile__timezone=timezone_key).future_free, len(local_starts)
+            )
+
+
+class AvailabilitySnapshotTestCase(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.token = Token.objects.create(user=self.user).key
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        self.slots = [
+            CalenderSlot.objects.create(
+                belongs_to=self.user, start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(2)
+        ]
+        self.url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+        self.path = os.path.join(self.directory.name, '{}.json'.format(self.user.id))
+        # The queued snapshots are written by the test, in its transaction, instead of the writer thread.
+        patcher = mock.patch.object(snapshot_queue, '_start')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(snapshot_queue.write_pending)
+
+    def snapshots(self, enabled=True):
+        return override_settings(
+            AVAILABILITY_SNAPSHOTS={'ENABLED': enabled, 'DIRECTORY': self.directory.name, 'DELAY_MS': 0}
+        )
+
+    def read_snapshot(self):
+        with open(self.path, 'rb') as snapshot, open(self.path + '.gz', 'rb') as compressed:
+            content = snapshot.read()
+            self.assertEqual(gzip.decompress(compressed.read()), content)
+        return content
+
+    def test_booking_writes_snapshot(self):
+        with self.snapshots(enabled=False), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[0].id}), {'description': "Booked"},
+                format='json'
+            )
+        self.assertFalse(os.path.exists(self.path))
+
+        with self.snapshots(), self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[1].id}), {'description': "Booked"},
+                format='json'
+            )
+        # The request only queues the snapshot of the user.
+        self.assertFalse(os.path.exists(self.path))
+        with self.snapshots():
+            self.assertEqual(snapshot_queue.write_pending(), 1)
+        self.assertEqual(self.read_snapshot(), b'[]')
+
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer " + self.token)
+        with self.snapshots(), self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[1].id}))
+            self.client.delete(reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[1].id}))
+        self.client.credentials()
+        with self.snapshots():
+            self.assertEqual(snapshot_queue.write_pending(), 1)
+        self.assertEqual(self.read_snapshot(), self.client.get(self.url).content)
+        self.assertEqual(json.loads(self.read_snapshot())[0]['id'], self.slots[1].id)
+
+    def test_command_refreshes_and_removes_snapshots(self):
+        deleted_path = os.path.join(self.directory.name, '5767.json')
+        for path in (deleted_path, deleted_path + '.gz'):
+            with open(path, 'wb') as snapshot:
+                snapshot.write(b'[]')
+        stdout = io.StringIO()
+        with self.snapshots():
+            call_command('write_availability_snapshots', stdout=stdout)
+        self.assertIn("Wrote 1 snapshots and removed 1", stdout.getvalue())
+        self.assertEqual(self.read_snapshot(), self.client.get(self.url).content)
+        self.assertFalse(os.path.exists(deleted_path) or os.path.exists(deleted_path + '.gz'))
+
+        with self.snapshots(), self.captureOnCommitCallbacks(execute=True):
+            self.user.delete()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_readme_location_matches_slots_url(self):
+        with open(os.path.join(settings.BASE_DIR, 'README.md')) as readme:
+            pattern = re.search(r'location ~ (\S+) \{', readme.read()).group(1)
+        match = re.match(pattern.replace('(?<', '(?P<'), self.url)
+        self.assertIsNotNone(match)
+        self.assertEqual(match.group('snapshot_host'), str(self.user.id))
+        self.assertIsNone(re.match(pattern.replace('(?<', '(?P<'), self.url + 'events/'))
+
+
+class AvailabilitySnapshotWriterTestCase(APITransactionTestCase):
+    def test_writer_thread_writes_queued_snapshots(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        start_time = datetime.datetime.now() + datetime.timedelta(days=1)
+        path = os.path.join(directory.name, '{}.json'.format(user.id))
+        with override_settings(
+            AVAILABILITY_SNAPSHOTS={'ENABLED': True, 'DIRECTORY': directory.name, 'DELAY_MS': 0}
+        ):
+            slot = CalenderSlot.objects.create(
+                belongs_to=user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+            )
+            snapshot_queue.wait(timeout=10)
+        with open(path, 'rb') as snapshot:
+            self.assertEqual(json.loads(snapshot.read())[0]['id'], slot.id)
+
+
+class ResponseCompressionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        availability_index.clear()
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.other_user = User.objects.create_user(username='test2@mail.com', email='test2@mail.com', password='password')
+        start_time = (datetime.datetime.now() + datetime.timedelta(days=1)).replace(microsecond=0)
+        self.slots = CalenderSlot.objects.bulk_create(
+            CalenderSlot(
+                belongs_to=self.user, start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for hour in range(40)
+        )
+        self.url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+
+    def test_negotiate_encoding(self):
+        self.assertEqual(negotiate_encoding('gzip, deflate', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('br;q=0.5, gzip;q=0.8', ('br', 'gzip')), 'gzip')
+        self.assertEqual(negotiate_encoding('gzip, br', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate_encoding('*', ('br', 'gzip')), 'br')
+        self.assertEqual(negotiate_encoding('*, gzip;q=0', ('gzip',)), None)
+        self.assertEqual(negotiate_encoding('identity', ('br', 'gzip')), None)
+        self.assertEqual(negotiate_encoding('', ('br', 'gzip')), None)
+
+    def test_large_responses_compressed(self):
+        content = self.client.get(self.url).content
+        response = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertEqual(gzip.decompress(response.content), content)
+        self.assertLess(int(response['Content-Length']), len(content) / 4)
+
+        response = self.client.get(
+            reverse('calender_mgmt:available_slots', kwargs={'user_id': self.other_user.id}),
+            HTTP_ACCEPT_ENCODING='gzip'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        with override_settings(RESPONSE_COMPRESSION=dict(settings.RESPONSE_COMPRESSION, MIN_SIZE=len(content) + 1)):
+            self.assertFalse(self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip').has_header('Content-Encoding'))
+
+    @override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 10})
+    def test_index_listing_compressed_once(self):
+        with mock.patch('app.compression.gzip.compress', wraps=gzip.compress) as compress:
+            first = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            with self.assertNumQueries(0):
+                second = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(compress.call_count, 1)
+            self.assertEqual(second.content, first.content)
+            self.assertEqual(json.loads(gzip.decompress(second.content)), second.data)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(
+                    reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[0].id}), {'description': "Booked"},
+                    format='json'
+                )
+            third = self.client.get(self.url, HTTP_ACCEPT_ENCODING='gzip')
+            self.assertEqual(compress.call_count, 2)
+        self.assertEqual([slot['id'] for slot in third.data], [slot.id for slot in self.slots[1:]])
+
+    @override_settings(AVAILABILITY_INDEX={'ENABLED': True, 'MAX_HOSTS': 10})
+    def test_index_listing_expiry(self):
+        rendered = availability_index.rendered_slots(self.user.id, 'all', list)
+        self.assertEqual(rendered.expires, self.slots[0].start_time)
+        held_until = self.slots[1].start_time - datetime.timedelta(minutes=30)
+        CalenderSlot.objects.filter(id=self.slots[0].id).update(held_until=held_until)
+        bump_version(self.user.id)
+        rendered = availability_index.rendered_slots(self.user.id, 'all', list)
+        self.assertEqual(rendered.data[0][0], self.slots[1].id)
+        self.assertEqual(rendered.expires, held_until)
+        self.assertIs(availability_index.rendered_slots(self.user.id, 'all', list), rendered)
+
+
+RATE_LIMITS = {
+    'ENABLED': True,
+    'MAX_IN_FLIGHT': 2,
+    'PROXY_COUNT': 1,
+    'CLASSES': {
+        'booking': {'VIEWS': ['calender_mgmt:book_slot'], 'RATE': 1, 'BURST': 2, 'SHARE': 1.0},
+        'availability': {'VIEWS': ['calender_mgmt:available_slots'], 'RATE': 1, 'BURST': 3, 'SHARE': 0.5},
+    },
+}
+
+
+@override_settings(RATE_LIMITS=RATE_LIMITS)
+class RateLimitTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.token = Token.objects.create(user=self.user).key
+        self.url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+
+    def test_token_bucket(self):
+        self.assertEqual([take_token('test', rate=10, burst=3) for _ in range(3)], [0, 0, 0])
+        retry_after = take_token('test', rate=10, burst=3)
+        self.assertGreater(retry_after, 0)
+        self.assertLessEqual(retry_after, 0.1)
+        self.assertGreater(take_token('test', rate=10, burst=3), 0)
+        self.assertEqual(take_token('other', rate=10, burst=3), 0)
+
+    def test_rate_limited_per_ip(self):
+        for _ in range(3):
+            self.assertEqual(self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, HTTP_200_OK)
+        response = self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '1')
+        self.assertEqual(response.json(), RateLimitMessages.RATE_LIMITED.format(1))
+        self.assertEqual(self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.0.2').status_code, HTTP_200_OK)
+
+        # Neither a made-up token nor a valid one escapes the limit of the address.
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer made-up-token")
+        self.assertEqual(self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 429)
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        self.assertEqual(self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.0.1').status_code, 429)
+
+    def test_rate_limited_per_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        statuses = [
+            self.client.get(self.url, HTTP_X_FORWARDED_FOR='10.0.1.{}'.format(number)).status_code
+            for number in range(4)
+        ]
+        self.assertEqual(statuses, [HTTP_200_OK] * 3 + [429])
+
+    def test_batch_sub_requests_limited(self):
+        data = {'requests': [{'method': 'GET', 'path': self.url}] * 4}
+        response = self.client.post(reverse('batch'), data, format='json', HTTP_X_FORWARDED_FOR='10.0.0.1')
+        self.assertEqual([sub_response['status'] for sub_response in response.data], [HTTP_200_OK] * 3 + [429])
+        self.assertEqual(response.data[3]['body'], RateLimitMessages.RATE_LIMITED.format(1))
+
+    def test_unlimited_views(self):
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.token)
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse('calender_mgmt:slot_data')).status_code, HTTP_200_OK)
+
+    def test_lower_priority_shed_first(self):
+        factory = RequestFactory()
+        book_request = factory.post(reverse('calender_mgmt:book_slot', kwargs={'id': 1}))
+        statuses = []
+
+        def get_response(request):
+            if request is book_request:
+                statuses.append(middleware(factory.get(self.url)).status_code)
+                statuses.append(middleware(factory.post(reverse('calender_mgmt:book_slot', kwargs={'id': 2}))).status_code)
+            return HttpResponse()
+
+        middleware = RateLimitMiddleware(get_response)
+        self.assertEqual(middleware(book_request).status_code, HTTP_200_OK)
+        self.assertEqual(statuses, [503, HTTP_200_OK])
+        self.assertEqual(middleware.in_flight, 0)
+
+
+class RequestProfilingTestCase(APITestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.user = User.objects.create_user(username='test1@mail.com', email='test1@mail.com', password='password')
+        self.url = reverse('calender_mgmt:available_slots', kwargs={'user_id': self.user.id})
+
+    def tearDown(self):
+        for path in profile_paths(self.directory):
+            os.remove(path)
+        os.rmdir(self.directory)
+
+    def profiling(self, **overrides):
+        return override_settings(REQUEST_PROFILING=dict({
+            'ENABLED': True, 'SAMPLE_RATE': 1, 'SLOW_MS': 0, 'VIEWS': [], 'DIRECTORY': self.directory, 'MAX_FILES': 2
+        }, **overrides))
+
+    def test_sampled_requests_ring_buffer(self):
+        with self.profiling():
+            for _ in range(3):
+                self.assertEqual(self.client.get(self.url).status_code, HTTP_200_OK)
+            self.client.get(reverse('calender_mgmt:slot_data'))
+        paths = profile_paths(self.directory)
+        self.assertEqual(len(paths), 2)
+        self.assertEqual(len(profile_paths(self.directory, 'calender_mgmt.available_slots')), 1)
+        self.assertEqual(len(profile_paths(self.directory, 'calender_mgmt.slot_data')), 1)
+
+        output = io.StringIO()
+        call_command('summarize_profiles', directory=self.directory, view='calender_mgmt:available_slots', stdout=output)
+        self.assertIn("calender_mgmt.available_slots: 1 profiled requests", output.getvalue())
+        self.assertIn("cumulative", output.getvalue())
+
+    def test_slow_requests_kept(self):
+        factory = RequestFactory()
+
+        def get_response(request):
+            if request.GET.get('slow'):
+                time.sleep(0.02)
+            return HttpResponse()
+
+        middleware = RequestProfilingMiddleware(get_response)
+        with self.profiling(SAMPLE_RATE=0, SLOW_MS=10):
+            middleware(factory.get(self.url))
+            self.assertEqual(profile_paths(self.directory), [])
+            middleware(factory.get(self.url, {'slow': 1}))
+            self.assertEqual(len(profile_paths(self.directory, 'calender_mgmt.available_slots')), 1)
+        with self.profiling(VIEWS=['calender_mgmt:book_slot']):
+            middleware(factory.get(self.url))
+        self.assertEqual(len(profile_paths(self.directory)), 1)
+
+    def test_no_profiles(self):
+        with self.assertRaises(CommandError):
+            call_command('summarize_profiles', directory=self.directory, stdout=io.StringIO())
+
+    def test_profiler_busy(self):
+        # Another thread profiling its request, which makes the profiler raise since Python 3.12.
+        with self.profiling(), mock.patch('cProfile.Profile.enable', side_effect=ValueError):
+            self.assertEqual(self.client.get(self.url).status_code, HTTP_200_OK)
+        self.assertEqual(profile_paths(self.directory), [])
+
+
+class QueryPlanTestCase(APITestCase):
+    """Checks the query plans of every view on a seeded dataset against full table scans, sorts, and the snapshots.
+
+    """
+    # Sorts which are accepted, by view and by a part of the plan line, because they sort a few rows only.
+    ALLOWED_PROBLEMS = {
+        # The waitlist entries of a host whose window contains the slot are sorted by age, only the matching ones.
+        'cancel_booking': ['USE TEMP B-TREE FOR ORDER BY'],
+        # A user only has a few slots held for them at a time.
+        'list_waitlist': ['USE TEMP B-TREE FOR ORDER BY'],
+        # The members free at a time are sorted by their counters, one slot per member.
+        'book_team_slot': ['USE TEMP B-TREE FOR ORDER BY'],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.bulk_create(
+            User(username='user{}@mail.com'.format(number), email='user{}@mail.com'.format(number))
+            for number in range(20)
+        )
+        cls.users = list(User.objects.order_by('id'))
+        cls.tokens = {user.id: Token.objects.create(user=user).key for user in cls.users}
+        start_time = datetime.datetime(datetime.datetime.now().year + 1, 1, 1, 9)
+        CalenderSlot.objects.bulk_create(
+            CalenderSlot(
+                belongs_to=user,
+                start_time=start_time + datetime.timedelta(hours=hour),
+                end_time=start_time + datetime.timedelta(hours=hour + 1)
+            )
+            for user in cls.users for hour in range(-20, 30)
+        )
+        cls.slots = list(CalenderSlot.objects.filter(belongs_to=cls.users[0]).order_by('start_time'))
+        for user in cls.users[1:5]:
+            slot = CalenderSlot.objects.filter(belongs_to=cls.users[0], is_booked=False).order_by('-start_time')[0]
+            SlotBooking.objects.create(slot=slot, booked_by=user, description="Booked")
+        cls.booked_slot = slot
+        for host in cls.users[10:20]:
+            SlotBooking.objects.create(
+                slot=CalenderSlot.objects.filter(belongs_to=host).order_by('-start_time')[0], booked_by=cls.users[4]
+            )
+        third_booking = SlotBooking.objects.filter(booked_by=cls.users[4]).order_by('-booked_at', '-id')[2]
+        cls.booking_cursor = encode_booking_cursor(third_booking.booked_at, third_booking.id)
+        for user in cls.users[5:10]:
+            WaitlistEntry.objects.create(
+                host=cls.users[0], waiter=user, window_start=slot.start_time - datetime.timedelta(days=1),
+                window_end=slot.end_time + datetime.timedelta(days=1)
+            )
+        cls.team = Team.objects.create(name="Team", owner=cls.users[0])
+        cls.team.members.set(cls.users[10:20])
+        BookingRules.objects.create(
+            host=cls.users[0], buffer_minutes=15, max_bookings_per_day=10, minimum_notice_minutes=60
+        )
+        BookingRules.objects.create(host=cls.users[10], buffer_minutes=15, max_bookings_per_day=10)
+        cls.start_time = start_time
+
+    def view_requests(self):
+        host, booker, waiter = self.users[0], self.users[4], self.users[5]
+        timestamp = lambda value: value.strftime("%Y-%m-%dT%H:%M:%SZ")
+        return [
+            ('create_slot', host, 'post', reverse('calender_mgmt:slot_data'),
+             {'start_time': timestamp(self.start_time + datetime.timedelta(days=30))}),
+            ('list_slots', host, 'get', reverse('calender_mgmt:slot_data'), None),
+            ('slot_details', host, 'get', reverse('calender_mgmt:slot_details', kwargs={'id': self.booked_slot.id}), None),
+            ('delete_slot', host, 'delete', reverse('calender_mgmt:slot_details', kwargs={'id': self.booked_slot.id}), None),
+            ('available_slots', None, 'get', reverse('calender_mgmt:available_slots', kwargs={'user_id': host.id}),
+             {'start': timestamp(self.start_time), 'end': timestamp(self.start_time + datetime.timedelta(hours=8))}),
+            ('book_slot', None, 'post', reverse('calender_mgmt:book_slot', kwargs={'id': self.slots[-10].id}),
+             {'description': "Booked"}),
+            ('cancel_booking', booker, 'delete', reverse('calender_mgmt:book_slot', kwargs={'id': self.booked_slot.id}), None),
+            ('create_interval_slots', host, 'post', reverse('calender_mgmt:slot_interval'), {
+                'interval_start': timestamp(self.start_time + datetime.timedelta(days=40)),
+                'interval_stop': timestamp(self.start_time + datetime.timedelta(days=40, hours=3))
+            }),
+            ('list_waitlist', waiter, 'get', reverse('calender_mgmt:waitlist'), None),
+            ('join_waitlist', waiter, 'post', reverse('calender_mgmt:waitlist'), {
+                'host_id': host.id, 'window_start': timestamp(self.start_time),
+                'window_end': timestamp(self.start_time + datetime.timedelta(days=1))
+            }),
+            ('list_bookings', booker, 'get', reverse('calender_mgmt:my_bookings'), {'limit': 1, 'cursor': self.booking_cursor}),
+            ('create_team', host, 'post', reverse('calender_mgmt:teams'), {
+                'name': "Sales", 'members': [user.id for user in self.users[1:5]]
+            }),
+            ('team_slots', None, 'get', reverse('calender_mgmt:team_slots', kwargs={'id': self.team.id}),
+             {'start': timestamp(self.start_time), 'end': timestamp(self.start_time + datetime.timedelta(hours=8))}),
+            ('book_team_slot', None, 'post', reverse('calender_mgmt:book_team_slot', kwargs={'id': self.team.id}),
+             {'start_time': timestamp(self.start_time + datetime.timedelta(hours=5)), 'description': "Booked"}),
+            ('leave_waitlist', waiter, 'delete', reverse(
+                'calender_mgmt:waitlist_entry', kwargs={'id': WaitlistEntry.objects.get(waiter=waiter).id}
+            ), None),
+        ]
+
+    def test_query_plans(self):
+        update = os.environ.get('UPDATE_QUERY_PLANS') == '1'
+        for name, user, method, url, data in self.view_requests():
+            with self.subTest(view=name):
+                if user is None:
+                    self.client.credentials()
+                else:
+                    self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ self.tokens[user.id])
+                with transaction.atomic():
+                    with capture_statements(connection) as statements:
+                        if method == 'get':
+                            response = self.client.get(url, data)
+                        else:
+                            response = getattr(self.client, method)(url, data, format='json')
+                    self.assertLess(response.status_code, 300, response.data)
+                    explained = [
+                        (sql, plan) for sql, plan in (
+                            (sql, explain(connection, sql, params)) for sql, params in statements
+                        ) if plan is not None
+                    ]
+                    transaction.set_rollback(True)
+
+                problems = [
+                    problem for _, plan in explained for problem in plan_problems(connection.vendor, plan)
+                    if not any(allowed in problem for allowed in self.ALLOWED_PROBLEMS.get(name, []))
+                ]
+                self.assertEqual(problems, [], "Full table scans or sorts in the plans:\n" + format_plans(explained))
+
+                text = format_plans(explained)
+                if update:
+                    write_snapshot(connection.vendor, name, text)
+                    continue
+                snapshot = read_snapshot(connection.vendor, name)
+                if snapshot is not None and snapshot != text:
+                    self.fail("The query plans changed, rerun with UPDATE_QUERY_PLANS=1 if expected:\n" + "".join(
+                        difflib.unified_diff(snapshot.splitlines(True), text.splitlines(True), 'snapshot', 'current')
+                    ))
+
+
+class SlotPartitioningTestCase(TestCase):
+    def test_month_arithmetic(self):
+        self.assertEqual(month_start(datetime.datetime(2020, 4, 19, 17, 35)), datetime.datetime(2020, 4, 1))
+        self.assertEqual(next_month(datetime.datetime(2020, 12, 1)), datetime.datetime(2021, 1, 1))
+        self.assertEqual(partition_name(datetime.datetime(2020, 4, 1)), 'calender_mgmt_calenderslot_y2020m04')
+
+    def test_slots_starting_between(self):
+        user = User.objects.create_user(username='test@mail.com', email='test@mail.com', password='password')
+        day = datetime.datetime(2030, 1, 1)
+        for hours in (-1, 0, 23, 24):
+            start_time = day + datetime.timedelta(hours=hours)
+            CalenderSlot.objects.create(
+                belongs_to=user, start_time=start_time, end_time=start_time + datetime.timedelta(hours=1)
+            )
+        slots = CalenderSlot.objects.starting_between(day, day + datetime.timedelta(days=1))
+        self.assertEqual(sorted(slot.start_time.hour for slot in slots), [0, 23])
+
+    def test_roll_unpartitioned_table(self):
+        if is_partitioned(connection):
+            self.skipTest("The slot table is partitioned.")
+        stdout = io.StringIO()
+        call_command('roll_slot_partitions', stdout=stdout)
+        self.assertIn("not partitioned", stdout.getvalue())
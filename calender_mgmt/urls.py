@@ -1,11 +1,22 @@
 from django.urls import include, path
 
-from .views import BookSlotView, CreateSlotsForIntervalView, GetAvailableSlots, SlotDataView, SlotDetailsView
+from .views import (
+    BookingRulesView, BookSlotView, BookTeamSlotView, CreateSlotsForIntervalView, GetAvailableSlots, MyBookingsView,
+    SlotDataView, SlotDetailsView, SlotEventsView, TeamSlotsView, TeamView, WaitlistEntryView, WaitlistView
+)
 
 urlpatterns = [
     path('book/slot/<int:id>/', BookSlotView.as_view(), name='book_slot'),
     path('book/<int:user_id>/slots/', GetAvailableSlots.as_view(), name='available_slots'),
+    path('book/<int:user_id>/slots/events/', SlotEventsView.as_view(), name='slot_events'),
+    path('bookings/', MyBookingsView.as_view(), name='my_bookings'),
+    path('booking_rules/', BookingRulesView.as_view(), name='booking_rules'),
     path('slot/<int:id>/', SlotDetailsView.as_view(), name='slot_details'),
     path('slot/', SlotDataView.as_view(), name='slot_data'),
-    path('slots/interval/', CreateSlotsForIntervalView.as_view(), name='slot_interval')
+    path('slots/interval/', CreateSlotsForIntervalView.as_view(), name='slot_interval'),
+    path('teams/', TeamView.as_view(), name='teams'),
+    path('teams/<int:id>/slots/', TeamSlotsView.as_view(), name='team_slots'),
+    path('teams/<int:id>/book/', BookTeamSlotView.as_view(), name='book_team_slot'),
+    path('waitlist/', WaitlistView.as_view(), name='waitlist'),
+    path('waitlist/<int:id>/', WaitlistEntryView.as_view(), name='waitlist_entry')
 ]
@@ -1,18 +1,47 @@
+import concurrent.futures
+import contextvars
 import datetime
+import io
+import json
+import logging
 import time
+import urllib.parse
 
+from asgiref.sync import iscoroutinefunction
+
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from rest_framework.status import HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND
+from rest_framework.status import (
+    HTTP_200_OK, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED, HTTP_404_NOT_FOUND, HTTP_429_TOO_MANY_REQUESTS,
+    HTTP_500_INTERNAL_SERVER_ERROR
+)
 from rest_framework.views import APIView
 
+from django.conf import settings
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import IntegrityError, connections, transaction
 from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpRequest, JsonResponse, QueryDict, StreamingHttpResponse
+from django.urls import Resolver404, resolve
 from django.utils import timezone
+from django.views import View
+
+from app.ratelimit import ResponseMessages as RateLimitMessages, rate_limited_seconds, throttle, view_class
+from app.replicas import read_from_replica
+from app.timezones import UTC, parse_timestamp, requested_offset_table, user_timezone
+
+from .availability import availability_index, free_slots
+from .constants import ResponseMessages, SlotEvents
+from .events import event_stream
+from .functions import available_slots_data, decode_booking_cursor, encode_booking_cursor, parse_capacity
+from .group_commit import book_slot
+from .models import SLOT_LENGTH, BookingRules, CalenderSlot, HostSlotCounter, SlotBooking, Team, WaitlistEntry
+from .rules import BookingRuleViolation
+from .signals import send_slots_changed
+from .teams import assignable_slots, team_free_times, team_member_ids
 
-from .constants import ResponseMessages
-from .functions import generate_google_calendar_link
-from .models import CalenderSlot, SlotBooking
+logger = logging.getLogger(__name__)
 
 
 class SlotDataView(APIView):
@@ -20,84 +49,117 @@ class SlotDataView(APIView):
         """Creates a bookable slot for the logged in user.
 
         Creates a slot of one hour from the provided start time available for booking for the logged in user.
-        The slot is created if it does not conflict with any existing slot and if the end time of the slot is
+        The slot is created if it does not overlap any existing slot and if the end time of the slot is
         greater than the current time, because the slot should be available to book after it is created.
+        The overlaps are rejected by the database on insert, and the conflicting slot is only read then.
+        A start time without an offset is read in the timezone of the user. The optional `capacity` makes a group
+        slot, which that many invitees can book.
 
         """
         try:
-            start_time = datetime.datetime.strptime(request.data['start_time'], "%Y-%m-%dT%H:%M:%SZ")
+            start_time = parse_timestamp(request.data['start_time'], user_timezone(request.user))
+            capacity = parse_capacity(request.data.get('capacity', 1))
         except KeyError:
             return Response(data=ResponseMessages.MISSING_KEY.format("start_time"), status=HTTP_400_BAD_REQUEST)
         except ValueError:
             return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
-        end_time = start_time + datetime.timedelta(hours=1)
+        end_time = start_time + SLOT_LENGTH
         if end_time < datetime.datetime.now():
             return Response(data=ResponseMessages.CREATE_FUTURE_SLOTS, status=HTTP_400_BAD_REQUEST)
-        blocking_slot = CalenderSlot.objects.filter(belongs_to=request.user, end_time__gt=start_time)
-        if blocking_slot:
-            response_message = ResponseMessages.CONFLICTING_SLOT.format(blocking_slot[0].start_time, blocking_slot[0].end_time)
+        try:
+            with transaction.atomic():
+                calender_slot = CalenderSlot.objects.create(
+                    belongs_to=request.user, start_time=start_time, end_time=end_time, capacity=capacity
+                )
+        except IntegrityError:
+            blocking_slot = CalenderSlot.objects.filter(belongs_to=request.user).overlapping(
+                start_time, end_time
+            ).order_by('start_time').first()
+            if blocking_slot is None:
+                raise
+            response_message = ResponseMessages.CONFLICTING_SLOT.format(blocking_slot.start_time, blocking_slot.end_time)
             return Response(data=response_message, status=HTTP_400_BAD_REQUEST)
-        calender_slot = CalenderSlot.objects.create(belongs_to=request.user, start_time=start_time, end_time=end_time)
         return Response(data={'id': calender_slot.id}, status=HTTP_200_OK)
 
+    @read_from_replica
     def get(self, request, *args, **kwargs):
         """Returns all the slot details created by the logged in user.
 
         Returns the id, start and end time of the slot, and if the slot is booked for each of the slots.
+        The group slots also get their capacity and seats left, and are booked once they are full.
+        The booked single-seat slots also get the id and the stored calendar links of their booking, read in one more
+        query for all of them.
+        Outside of UTC, the start and end times in the timezone of the user or of the `tz` parameter are added.
 
         """
-        all_created_slots = CalenderSlot.objects.filter(belongs_to=request.user)
+        try:
+            offsets = requested_offset_table(request)
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        all_created_slots = list(CalenderSlot.objects.filter(belongs_to=request.user))
+        booked_slot_ids = [slot.id for slot in all_created_slots if slot.is_booked and not slot.is_group()]
+        bookings = {}
+        if booked_slot_ids:
+            bookings = {booking.slot_id: booking for booking in SlotBooking.objects.filter(slot_id__in=booked_slot_ids).order_by()}
         response_data = []
         for slot_detail in all_created_slots:
             slot_data = {
                 "id": slot_detail.id,
                 "start_time": str(slot_detail.start_time),
-                "end_time": str(slot_detail.end_time)
+                "end_time": str(slot_detail.end_time),
+                "is_booked": slot_detail.is_booked,
+                **slot_detail.seat_data()
             }
-            try:
-                slot_detail.booking_details
-            except:
-                slot_data['is_booked'] = False
-            else:
-                slot_data['is_booked'] = True
+            booking_details = bookings.get(slot_detail.id)
+            if booking_details is not None:
+                slot_data["booking_id"] = booking_details.id
+                slot_data.update(booking_details.calendar_links())
+            if offsets is not None:
+                slot_data.update(offsets.local_times(slot_detail.start_time, slot_detail.end_time))
             response_data.append(slot_data)
         return Response(data=response_data, status=HTTP_200_OK)
 
 
 class SlotDetailsView(APIView):
+    @read_from_replica
     def get(self, request, *args, **kwargs):
         """Gives a detailed information of the specified slot, including details of the booking if it is booked.
 
-        The booking status is determined by accessing the `booking_details` from the current slot object, which is
-        set only when the slot is booked. If it was booked anonymously, the booked by field is set to the string
-        `Anonymous User`, else the username of the registered user is set in the response data.
+        The bookings are only read when the seat counter of the slot shows some. If a booking was made anonymously, its
+        booked by field is set to the string `Anonymous User`, else the username of the registered user is set in the
+        response data. A single-seat slot gives the details of its booking next to its own, while a group slot gives
+        its capacity, its seats left and the list of its bookings, the earliest first.
 
         """
-        if CalenderSlot.objects.filter(id=kwargs['id'], belongs_to=request.user).exists() is False:
+        try:
+            offsets = requested_offset_table(request)
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        try:
+            slot_details = CalenderSlot.objects.get(id=kwargs['id'], belongs_to=request.user)
+        except CalenderSlot.DoesNotExist:
             return Response(data=ResponseMessages.CALENDER_SLOT_NOT_FOUND, status=HTTP_404_NOT_FOUND)
-        slot_details = CalenderSlot.objects.select_related('booking_details__booked_by').get(
-            id=kwargs['id'], belongs_to=request.user
-        )
         response_data = {
             "id": slot_details.id,
             "start_time": str(slot_details.start_time),
             "end_time": str(slot_details.end_time)
         }
-        try:
-            booking_details = slot_details.booking_details
-        except:
-            response_data['is_booked'] = False
-        else:
-            booked_by = "Anonymous User"
-            if booking_details.booked_by:
-                booked_by = booking_details.booked_by.username
-            response_data.update({
-                "is_booked": True,
+        if offsets is not None:
+            response_data.update(offsets.local_times(slot_details.start_time, slot_details.end_time))
+        bookings = []
+        if slot_details.seats_available < slot_details.capacity:
+            bookings = [{
                 "booking_id": booking_details.id,
-                "booked_by": booked_by,
+                "booked_by": booking_details.booked_by.username if booking_details.booked_by else "Anonymous User",
                 "booked_at": str(booking_details.booked_at),
-                "description": booking_details.description
-            })
+                "description": booking_details.description,
+                **booking_details.calendar_links()
+            } for booking_details in slot_details.bookings.select_related('booked_by').order_by('id')]
+        response_data['is_booked'] = slot_details.is_booked
+        if slot_details.is_group():
+            response_data.update(slot_details.seat_data(), bookings=bookings)
+        elif bookings:
+            response_data.update(bookings[0])
         return Response(data=response_data, status=HTTP_200_OK)
 
     def delete(self, request, *args, **kwargs):
@@ -112,30 +174,82 @@ class SlotDetailsView(APIView):
             return Response(status=HTTP_200_OK)
 
 
+class RenderedSlotsResponse(Response):
+    """Response with the JSON of a listing of the available slots rendered already, and its compressed variants.
+
+    """
+    def __init__(self, rendered):
+        super().__init__(data=rendered.data, status=HTTP_200_OK)
+        self.rendered_slots = rendered
+        self.compressed_content = rendered.compressed_content
+
+    @property
+    def rendered_content(self):
+        self['Content-Type'] = JSONRenderer.media_type
+        return self.rendered_slots.content
+
+
 class GetAvailableSlots(APIView):
     permission_classes = []
 
+    @read_from_replica
     def get(self, request, *args, **kwargs):
-        """Lists all the available slots of the requested user.
+        """Lists all the available slots of the requested user, ordered by their start time.
         
         This API is accessible by both registered and anonymous users. So no authentication check is done.
+        The optional `start` and `end` query parameters restrict the list to the slots starting in that window.
+        With the availability index enabled, the slots are served from the memory of the worker, and their JSON is
+        kept along with them, compressed once per encoding, until they change or the first of them starts.
+        Outside of UTC, the start and end times in the timezone of the user or of the `tz` parameter are added.
+        The slots held for users on the waitlist are left out, as well as the full slots, and the group slots give
+        their capacity and seats left. So are the slots which the booking rules of the user do not allow booking,
+        read along with the user.
 
         """
         try:
-            user = User.objects.get(id=kwargs['user_id'])
-        except User.DoesNotExist:
+            offsets = requested_offset_table(request)
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        try:
+            window_start, window_end = (
+                parse_timestamp(request.query_params[key], UTC if offsets is None else offsets.key)
+                if key in request.query_params else None
+                for key in ('start', 'end')
+            )
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        if settings.AVAILABILITY_INDEX['ENABLED'] and request.accepted_media_type == JSONRenderer.media_type:
+            rendered = availability_index.rendered_slots(
+                kwargs['user_id'], (None if offsets is None else offsets.key, window_start, window_end),
+                lambda slots: available_slots_data(slots, offsets), window_start, window_end
+            )
+            if rendered is None:
+                return Response(data=ResponseMessages.USER_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+            return RenderedSlotsResponse(rendered)
+        available_slots = free_slots(kwargs['user_id'], window_start, window_end)
+        if available_slots is None:
             return Response(data=ResponseMessages.USER_NOT_FOUND, status=HTTP_404_NOT_FOUND)
-        available_slots = CalenderSlot.objects.filter(
-            start_time__gt=timezone.now(), booking_details=None, belongs_to=user
-        )
-        response_data = []
-        for slot_details in available_slots:
-            response_data.append({
-                "id": slot_details.id,
-                "start_time": str(slot_details.start_time),
-                "end_time": str(slot_details.end_time)
-            })
-        return Response(data=response_data, status=HTTP_200_OK)
+        return Response(data=available_slots_data(available_slots, offsets), status=HTTP_200_OK)
+
+
+class SlotEventsView(View):
+    async def get(self, request, *args, **kwargs):
+        """Streams the changes to the slots of the requested user as Server-Sent Events, instead of polling them.
+
+        Every event is named after the change (created, updated, deleted, booked, cancelled or held) and carries the
+        ids of the changed slots. A `resync` event replaces the events a client was too slow to read. This API is
+        accessible by both registered and anonymous users, and only served by the ASGI application.
+
+        """
+        if not settings.SLOT_EVENTS['ENABLED'] or not isinstance(request, ASGIRequest):
+            return JsonResponse(ResponseMessages.SLOT_EVENTS_UNAVAILABLE, status=HTTP_404_NOT_FOUND, safe=False)
+        if not await User.objects.filter(id=kwargs['user_id']).aexists():
+            return JsonResponse(ResponseMessages.USER_NOT_FOUND, status=HTTP_404_NOT_FOUND, safe=False)
+        response = StreamingHttpResponse(event_stream(kwargs['user_id']), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keeps nginx and similar proxies from buffering the events.
+        response['X-Accel-Buffering'] = 'no'
+        return response
 
 
 class BookSlotView(APIView):
@@ -145,67 +259,504 @@ class BookSlotView(APIView):
         """Books the requested slot. This API is accessible for both anonymous and registered users.
 
         Checks if the requested slot exists and is not booked yet. Booking is only allwed for slots in the future.
-        Returns the booking id and a link to add the event to Google Calendar.
+        A booking takes a seat of the slot, and a registered user can book one seat of a group slot only.
+        A slot held for a user on the waitlist can only be booked by that user until the hold expires, and the
+        booking rules of the user of the slot are checked along with the booking. With group commit, the booking is
+        committed along with the other bookings requested at the same time in the worker.
+        Returns the booking id, links to add the event to Google Calendar and Outlook, and an iCalendar file of it.
+        The slot is read with its user, whose name the links mention.
 
         """
         try:
-            slot = CalenderSlot.objects.get(id=kwargs['id'])
+            slot = CalenderSlot.objects.select_related('belongs_to').get(id=kwargs['id'])
         except CalenderSlot.DoesNotExist:
             return Response(data=ResponseMessages.CALENDER_SLOT_NOT_FOUND, status=HTTP_404_NOT_FOUND)
-        if SlotBooking.objects.filter(slot=slot).exists():
+        if slot.is_booked:
             return Response(data=ResponseMessages.CALENDER_SLOT_ALREADY_BOOKED, status=HTTP_400_BAD_REQUEST)
+        if slot.is_held_for_other_than(request.user):
+            return Response(data=ResponseMessages.CALENDER_SLOT_HELD, status=HTTP_400_BAD_REQUEST)
         if slot.end_time < timezone.now():
             return Response(data=ResponseMessages.CALENDER_SLOT_EXPIRED, status=HTTP_400_BAD_REQUEST)
         try:
             booking_description = request.data['description']
         except KeyError:
             return Response(data=ResponseMessages.MISSING_KEY.format("description"), status=HTTP_400_BAD_REQUEST)
-        with transaction.atomic():
-            slot_booking_details = SlotBooking.objects.create(slot=slot, booked_by=request.user, description=booking_description)
-            response_data = {
-                "id": slot_booking_details.id,
-                "add_to_google_calendar": generate_google_calendar_link(slot_booking_details)
-            }
-            return Response(data=response_data, status=HTTP_200_OK)
+        try:
+            slot_booking_details = book_slot(slot, request.user, booking_description)
+        except IntegrityError:
+            # Other requests booked the last seat since the slot was read, or the user already has a seat.
+            if request.user is not None and SlotBooking.objects.filter(slot=slot, booked_by=request.user).exists():
+                return Response(data=ResponseMessages.CALENDER_SLOT_SEAT_BOOKED, status=HTTP_400_BAD_REQUEST)
+            return Response(data=ResponseMessages.CALENDER_SLOT_ALREADY_BOOKED, status=HTTP_400_BAD_REQUEST)
+        except BookingRuleViolation as violation:
+            return Response(data=violation.message, status=HTTP_400_BAD_REQUEST)
+        response_data = {
+            "id": slot_booking_details.id,
+            **slot_booking_details.calendar_links()
+        }
+        return Response(data=response_data, status=HTTP_200_OK)
 
     def delete(self, request, *args, **kwargs):
         """Deletes the requested booking.
 
         Only the bookings made by registered users can be deleted. This is to prevent cases where anyone can delete bookings of others.
+        The booking is deleted with a single filtered `DELETE`, and its absence is detected from the deleted row count.
+        The user of the slot deletes all of its bookings, giving their seats back at once.
 
         """
         if request.user is None:
             return Response(data=ResponseMessages.REGISTERATION_REQUIRED, status=HTTP_401_UNAUTHORIZED)
-        booking = SlotBooking.objects.filter((Q(booked_by=request.user) | Q(slot__belongs_to=request.user)), slot__id=kwargs['id'])
-        if len(booking) == 0:
-            return Response(data=ResponseMessages.BOOKING_NOT_FOUND, status=HTTP_404_NOT_FOUND)
-        booking[0].delete()
+        with transaction.atomic():
+            deleted_count, _ = SlotBooking.objects.filter(
+                (Q(booked_by=request.user) | Q(slot__belongs_to=request.user)), slot__id=kwargs['id']
+            ).delete()
+            if deleted_count == 0:
+                return Response(data=ResponseMessages.BOOKING_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+            SlotBooking.release_slot(kwargs['id'], deleted_count)
         return Response(status=HTTP_200_OK)
 
 
+class MyBookingsView(APIView):
+    page_size = 20
+    max_page_size = 100
+
+    @read_from_replica
+    def get(self, request, *args, **kwargs):
+        """Lists the bookings made by the logged in user, the latest first, one page at a time.
+
+        Every booking comes with its slot, the username of the host and the stored calendar links, read in a single
+        joined query. The pages are cut by the booking time and id rather than by an offset, so every page costs one
+        range read of the (`booked_by`, `booked_at`, `id`) index. The optional `limit` parameter sets the size of the
+        page, and the `cursor` parameter, given as the `next_cursor` of the previous page, fetches the next one.
+        Outside of UTC, the start and end times in the timezone of the user or of the `tz` parameter are added.
+
+        """
+        try:
+            offsets = requested_offset_table(request)
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        try:
+            limit = int(request.query_params.get('limit', self.page_size))
+            cursor = request.query_params.get('cursor')
+            after = decode_booking_cursor(cursor) if cursor else None
+        except ValueError:
+            limit = None
+        if limit is None or not 0 < limit <= self.max_page_size:
+            return Response(data=ResponseMessages.INVALID_PAGE.format(self.max_page_size), status=HTTP_400_BAD_REQUEST)
+        bookings = SlotBooking.objects.filter(booked_by=request.user)
+        if after is not None:
+            after_booked_at, after_id = after
+            bookings = bookings.filter(booked_at__lte=after_booked_at).exclude(booked_at=after_booked_at, id__gte=after_id)
+        bookings = list(bookings.order_by('-booked_at', '-id').values_list(
+            'id', 'booked_at', 'description', 'slot_id', 'slot__start_time', 'slot__end_time',
+            'slot__belongs_to_id', 'slot__belongs_to__username', 'google_calendar_link', 'outlook_calendar_link'
+        )[:limit + 1])
+        response_data = []
+        for (booking_id, booked_at, description, slot_id, start_time, end_time, host_id, host_username,
+             google_calendar_link, outlook_calendar_link) in bookings[:limit]:
+            booking_data = {
+                "id": booking_id,
+                "booked_at": str(booked_at),
+                "description": description,
+                "slot_id": slot_id,
+                "start_time": str(start_time),
+                "end_time": str(end_time),
+                "host_id": host_id,
+                "host": host_username,
+                "add_to_google_calendar": google_calendar_link,
+                "add_to_outlook_calendar": outlook_calendar_link
+            }
+            if offsets is not None:
+                booking_data.update(offsets.local_times(start_time, end_time))
+            response_data.append(booking_data)
+        next_cursor = None
+        if len(bookings) > limit:
+            next_cursor = encode_booking_cursor(bookings[limit - 1][1], bookings[limit - 1][0])
+        return Response(data={"bookings": response_data, "next_cursor": next_cursor}, status=HTTP_200_OK)
+
+
 class CreateSlotsForIntervalView(APIView):
+    attempts = 3
+
     def post(self, request, *args, **kwargs):
         """Generates slots in bulk for the provided start and end interval time.
 
-        Prevents creation of slots which conflict with the already created slots.
+        Prevents creation of slots which conflict with the already created slots. Interval times without an offset
+        are read in the timezone of the user, and the slots are generated hour by hour from the interval start.
+        The optional `capacity` gives all of them that many seats.
+
+        The existing slots of the interval are read in one query, and the hours they overlap are skipped. The database
+        rejects the whole insert if a concurrent request created an overlapping slot in between, and the interval is
+        then read and inserted once more.
 
         """
-        interval_start = datetime.datetime.strptime(request.data['interval_start'], "%Y-%m-%dT%H:%M:%SZ")
-        interval_stop = datetime.datetime.strptime(request.data['interval_stop'], "%Y-%m-%dT%H:%M:%SZ")
+        user_zone = user_timezone(request.user)
+        interval_start = parse_timestamp(request.data['interval_start'], user_zone)
+        interval_stop = parse_timestamp(request.data['interval_stop'], user_zone)
+        try:
+            capacity = parse_capacity(request.data.get('capacity', 1))
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
 
-        slot_start_time = interval_start
-        slot_end_time = slot_start_time + datetime.timedelta(hours=1)
-        interval_date = datetime.date(slot_start_time.year, slot_start_time.month, slot_start_time.day)
-        queryset = CalenderSlot.objects.filter(belongs_to=request.user).filter(start_time__date=interval_date)
-        created_slot_ids = []
-        while slot_end_time <= interval_stop:
-            if not queryset.filter(
-                (Q(start_time__lt=slot_end_time) & Q(start_time__gte=slot_start_time)) | 
-                (Q(end_time__gt=slot_start_time) & Q(end_time__lte=slot_end_time)),
-                start_time__date=interval_date
+        for attempt in range(self.attempts):
+            existing_slots = list(
+                CalenderSlot.objects.filter(belongs_to=request.user).overlapping(interval_start, interval_stop)
+                .order_by().values_list('start_time', 'end_time')
+            )
+            new_slots = []
+            slot_start_time = interval_start
+            slot_end_time = slot_start_time + SLOT_LENGTH
+            while slot_end_time <= interval_stop:
+                if not any(start_time < slot_end_time and end_time > slot_start_time for start_time, end_time in existing_slots):
+                    new_slots.append(CalenderSlot(
+                        belongs_to=request.user, start_time=slot_start_time, end_time=slot_end_time,
+                        capacity=capacity, seats_available=capacity
+                    ))
+                slot_start_time = slot_end_time
+                slot_end_time = slot_end_time + SLOT_LENGTH
+            try:
+                with transaction.atomic():
+                    CalenderSlot.objects.bulk_create(new_slots)
+                    future_count = sum(1 for slot in new_slots if slot.is_future())
+                    if future_count:
+                        HostSlotCounter.adjust(request.user.id, free=future_count)
+                    if new_slots:
+                        send_slots_changed(CalenderSlot, request.user.id, SlotEvents.CREATED, [slot.id for slot in new_slots])
+            except IntegrityError:
+                if attempt == self.attempts - 1:
+                    raise
+            else:
+                return Response(data=[slot.id for slot in new_slots], status=HTTP_200_OK)
+
+
+class BookingRulesView(APIView):
+    fields = ('buffer_minutes', 'max_bookings_per_day', 'minimum_notice_minutes')
+
+    def get(self, request, *args, **kwargs):
+        """Returns the booking rules of the logged in user, which are all off for the users who never set them.
+
+        """
+        rules = BookingRules.objects.filter(host=request.user).first() or BookingRules(host=request.user)
+        return Response(data={field: getattr(rules, field) for field in self.fields}, status=HTTP_200_OK)
+
+    def put(self, request, *args, **kwargs):
+        """Sets the booking rules of the logged in user, keeping the current value of the rules not provided.
+
+        The `buffer_minutes` and `minimum_notice_minutes` are numbers of minutes, and the `max_bookings_per_day` is a
+        positive number of meetings per day of the timezone of the user, or null for no limit. The meetings of the
+        days of the user are counted again from the slots.
+
+        """
+        rules = BookingRules.objects.filter(host=request.user).first() or BookingRules(host=request.user)
+        for field in self.fields:
+            if field not in request.data:
+                continue
+            value = request.data[field]
+            if field == 'max_bookings_per_day' and value is None:
+                setattr(rules, field, None)
+                continue
+            if not isinstance(value, int) or isinstance(value, bool) or not (
+                0 < value <= 1000 if field == 'max_bookings_per_day' else 0 <= value <= 60 * 24 * 365
             ):
-                slot = CalenderSlot.objects.create(belongs_to=request.user, start_time=slot_start_time, end_time=slot_end_time)
-                created_slot_ids.append(slot.id)
-            slot_start_time = slot_end_time
-            slot_end_time = slot_end_time + datetime.timedelta(hours=1)
-        return Response(data=created_slot_ids, status=HTTP_200_OK)
+                return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+            setattr(rules, field, value)
+        rules.save()
+        return Response(data={field: getattr(rules, field) for field in self.fields}, status=HTTP_200_OK)
+
+
+class TeamView(APIView):
+    def post(self, request, *args, **kwargs):
+        """Creates a team of the provided members, owned by the logged in user.
+
+        The `members` are the ids of registered users, whose free slots the invitees of the team can book.
+
+        """
+        try:
+            name = request.data['name']
+            member_ids = request.data['members']
+        except KeyError as error:
+            return Response(data=ResponseMessages.MISSING_KEY.format(error.args[0]), status=HTTP_400_BAD_REQUEST)
+        if not isinstance(name, str) or not 0 < len(name) <= 100 or not isinstance(member_ids, list) or not all(
+            isinstance(member_id, int) and not isinstance(member_id, bool) for member_id in member_ids
+        ):
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        member_ids = set(member_ids)
+        if User.objects.filter(id__in=member_ids).count() != len(member_ids):
+            return Response(data=ResponseMessages.USER_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+        with transaction.atomic():
+            team = Team.objects.create(name=name, owner=request.user)
+            team.members.set(member_ids)
+        return Response(data={'id': team.id}, status=HTTP_200_OK)
+
+    def get(self, request, *args, **kwargs):
+        """Lists the teams owned by the logged in user with the ids of their members.
+
+        """
+        teams = Team.objects.filter(owner=request.user).prefetch_related('members')
+        return Response(data=[{
+            "id": team.id,
+            "name": team.name,
+            "members": sorted(member.id for member in team.members.all()),
+            "created_at": str(team.created_at)
+        } for team in teams], status=HTTP_200_OK)
+
+
+class TeamSlotsView(APIView):
+    permission_classes = []
+
+    @read_from_replica
+    def get(self, request, *args, **kwargs):
+        """Lists the times at which a member of the requested team is free, ordered by their start time.
+
+        This API is accessible by both registered and anonymous users. The times are the union of the available slots
+        of the members, each time listed once, and do not tell which member is free. The optional `start`
+        and `end` query parameters restrict the list to the times starting in that window. Outside of UTC, the start
+        and end times in the timezone of the user or of the `tz` parameter are added.
+
+        """
+        try:
+            offsets = requested_offset_table(request)
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        try:
+            window_start, window_end = (
+                parse_timestamp(request.query_params[key], UTC if offsets is None else offsets.key)
+                if key in request.query_params else None
+                for key in ('start', 'end')
+            )
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        member_ids = team_member_ids(kwargs['id'])
+        if member_ids is None:
+            return Response(data=ResponseMessages.TEAM_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+        response_data = []
+        for start_time, end_time in team_free_times(member_ids, window_start, window_end):
+            time_data = {"start_time": str(start_time), "end_time": str(end_time)}
+            if offsets is not None:
+                time_data.update(offsets.local_times(start_time, end_time))
+            response_data.append(time_data)
+        return Response(data=response_data, status=HTTP_200_OK)
+
+
+class BookTeamSlotView(APIView):
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        """Books the requested time of a team with one of its members. This API is accessible for both anonymous and
+        registered users.
+
+        The booking goes to the member free at the `start_time` with the fewest booked future slots. If another
+        request books the slot of that member first, or the booking rules of that member do not allow it, the next
+        member is tried. Returns the booking id, the booked
+        slot and its user, and the calendar links like a booking of a slot.
+
+        """
+        member_ids = team_member_ids(kwargs['id'])
+        if member_ids is None:
+            return Response(data=ResponseMessages.TEAM_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+        try:
+            start_time = parse_timestamp(request.data['start_time'], user_timezone(request.user))
+            booking_description = request.data['description']
+        except KeyError as error:
+            return Response(data=ResponseMessages.MISSING_KEY.format(error.args[0]), status=HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        for slot in assignable_slots(member_ids, start_time):
+            try:
+                with transaction.atomic():
+                    slot_booking_details = SlotBooking.objects.create(
+                        slot=slot, booked_by=request.user, description=booking_description
+                    )
+            except (IntegrityError, BookingRuleViolation):
+                continue
+            response_data = {
+                "id": slot_booking_details.id,
+                "slot_id": slot.id,
+                "host_id": slot.belongs_to_id,
+                "host": slot.belongs_to.username,
+                **slot_booking_details.calendar_links()
+            }
+            return Response(data=response_data, status=HTTP_200_OK)
+        return Response(data=ResponseMessages.TEAM_TIME_UNAVAILABLE, status=HTTP_400_BAD_REQUEST)
+
+
+class WaitlistView(APIView):
+    def get(self, request, *args, **kwargs):
+        """Lists the waitlist entries of the logged in user, and the slots currently held for them.
+
+        """
+        entries = WaitlistEntry.objects.filter(waiter=request.user)
+        offers = CalenderSlot.objects.filter(
+            held_for=request.user, held_until__gt=timezone.now(), is_booked=False
+        ).order_by('start_time')
+        return Response(data={
+            "entries": [{
+                "id": entry.id,
+                "host_id": entry.host_id,
+                "window_start": str(entry.window_start),
+                "window_end": str(entry.window_end),
+                "created_at": str(entry.created_at)
+            } for entry in entries],
+            "offers": [{
+                "id": slot.id,
+                "host_id": slot.belongs_to_id,
+                "start_time": str(slot.start_time),
+                "end_time": str(slot.end_time),
+                "held_until": str(slot.held_until)
+            } for slot in offers]
+        }, status=HTTP_200_OK)
+
+    def post(self, request, *args, **kwargs):
+        """Puts the logged in user on the waitlist of a host for the slots within a time window.
+
+        When a booking of a slot of the host within the window is cancelled, the slot is held for the oldest
+        matching entry. Window times without an offset are read in the timezone of the user.
+
+        """
+        try:
+            host_id = request.data['host_id']
+            # Only integers and their digits, like the member ids of the teams, rather than any value int() takes.
+            if isinstance(host_id, str) and host_id.isdigit():
+                host_id = int(host_id)
+            if not isinstance(host_id, int) or isinstance(host_id, bool):
+                raise ValueError(host_id)
+            window_start = parse_timestamp(request.data['window_start'], user_timezone(request.user))
+            window_end = parse_timestamp(request.data['window_end'], user_timezone(request.user))
+        except KeyError as missing_key:
+            return Response(data=ResponseMessages.MISSING_KEY.format(missing_key.args[0]), status=HTTP_400_BAD_REQUEST)
+        except (AttributeError, TypeError, ValueError):
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        if window_end <= window_start or window_end < datetime.datetime.now():
+            return Response(data=ResponseMessages.INVALID_WAITLIST_WINDOW, status=HTTP_400_BAD_REQUEST)
+        if not User.objects.filter(id=host_id).exists():
+            return Response(data=ResponseMessages.USER_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+        entry = WaitlistEntry.objects.create(
+            host_id=host_id, waiter=request.user, window_start=window_start, window_end=window_end
+        )
+        return Response(data={'id': entry.id}, status=HTTP_200_OK)
+
+
+class WaitlistEntryView(APIView):
+    def delete(self, request, *args, **kwargs):
+        """Removes the requested entry of the logged in user from the waitlist.
+
+        """
+        deleted_count, _ = WaitlistEntry.objects.filter(id=kwargs['id'], waiter=request.user).delete()
+        if deleted_count == 0:
+            return Response(data=ResponseMessages.WAITLIST_ENTRY_NOT_FOUND, status=HTTP_404_NOT_FOUND)
+        return Response(status=HTTP_200_OK)
+
+
+class BatchView(APIView):
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        """Runs several calender API requests in one round trip, returning their statuses and bodies in order.
+
+        Every sub-request is a dict with the `method`, the `path` (with an optional query string) and an optional
+        JSON `body`. The batch request is authenticated once, and the sub-requests run in this process as the same
+        user, each with the permission checks and the rate limits of its view. With `parallel` set, consecutive GET
+        sub-requests run at the same time on separate threads (and database connections), while the other
+        sub-requests run one after the other in order on the connection of the batch request.
+
+        The sub-requests run through their views only, not through the middleware, which sees the batch request as a
+        whole: it is admitted, profiled and compressed once. The rate limits of the views are checked here for every
+        sub-request instead, and the replica reads following a written sub-request go to the primary database, like
+        the reads of a pinned client.
+
+        """
+        if not isinstance(request.data, dict):
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        try:
+            sub_requests = request.data['requests']
+        except KeyError:
+            return Response(data=ResponseMessages.MISSING_KEY.format("requests"), status=HTTP_400_BAD_REQUEST)
+        if not isinstance(sub_requests, list) or not all(
+            isinstance(sub_request, dict) and isinstance(sub_request.get('method'), str)
+            and isinstance(sub_request.get('path'), str) for sub_request in sub_requests
+        ):
+            return Response(data=ResponseMessages.INVALID_DATA, status=HTTP_400_BAD_REQUEST)
+        if len(sub_requests) > settings.BATCH_MAX_REQUESTS:
+            return Response(
+                data=ResponseMessages.BATCH_TOO_LARGE.format(settings.BATCH_MAX_REQUESTS), status=HTTP_400_BAD_REQUEST
+            )
+
+        responses = [None] * len(sub_requests)
+        reads = []
+        for index, sub_request in enumerate(sub_requests):
+            if request.data.get('parallel') and sub_request['method'].upper() == 'GET':
+                reads.append(index)
+                continue
+            self.run_in_parallel(request, sub_requests, reads, responses)
+            reads = []
+            responses[index] = self.run(request, sub_request)
+        self.run_in_parallel(request, sub_requests, reads, responses)
+        return Response(data=responses, status=HTTP_200_OK)
+
+    def run_in_parallel(self, request, sub_requests, indexes, responses):
+        if len(indexes) < 2:
+            for index in indexes:
+                responses[index] = self.run(request, sub_requests[index])
+            return
+
+        def run_in_thread(sub_request):
+            try:
+                return self.run(request, sub_request)
+            finally:
+                connections.close_all()
+
+        with concurrent.futures.ThreadPoolExecutor(min(len(indexes), settings.BATCH_MAX_THREADS)) as executor:
+            futures = {
+                index: executor.submit(contextvars.copy_context().run, run_in_thread, sub_requests[index])
+                for index in indexes
+            }
+        for index, future in futures.items():
+            responses[index] = future.result()
+
+    def run(self, request, sub_request):
+        """Runs one sub-request through the view of its path, returning its status and body.
+
+        """
+        url = urllib.parse.urlsplit(sub_request['path'])
+        try:
+            match = resolve(url.path)
+        except Resolver404:
+            match = None
+        # The streamed views are async, and cannot be answered within a batch.
+        if match is None or match.namespace != 'calender_mgmt' or iscoroutinefunction(match.func):
+            return {'status': HTTP_404_NOT_FOUND, 'body': ResponseMessages.BATCH_PATH_NOT_FOUND}
+        # Every sub-request is charged to the rate limits of its own view, like a request of its own.
+        name, limits = view_class(match.view_name) if settings.RATE_LIMITS['ENABLED'] else (None, None)
+        if name is not None:
+            retry_after = throttle(request, name, limits)
+            if retry_after:
+                return {
+                    'status': HTTP_429_TOO_MANY_REQUESTS,
+                    'body': RateLimitMessages.RATE_LIMITED.format(rate_limited_seconds(retry_after))
+                }
+
+        body = b'' if sub_request.get('body') is None else json.dumps(sub_request['body']).encode()
+        http_request = HttpRequest()
+        http_request.method = sub_request['method'].upper()
+        http_request.path = http_request.path_info = url.path
+        http_request.META = {key: value for key, value in request.META.items() if key != 'HTTP_AUTHORIZATION'}
+        http_request.META.update({
+            'REQUEST_METHOD': http_request.method,
+            'PATH_INFO': url.path,
+            'QUERY_STRING': url.query,
+            'CONTENT_TYPE': 'application/json',
+            'CONTENT_LENGTH': str(len(body)),
+        })
+        http_request.GET = QueryDict(url.query)
+        http_request._stream = io.BytesIO(body)
+        http_request._read_started = False
+        http_request.resolver_match = match
+        if request.user is not None:
+            http_request._force_auth_user = request.user
+            http_request._force_auth_token = request.auth
+        try:
+            response = match.func(http_request, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception("Batch sub-request %s %s failed", http_request.method, sub_request['path'])
+            return {'status': HTTP_500_INTERNAL_SERVER_ERROR, 'body': ResponseMessages.BATCH_REQUEST_FAILED}
+        return {'status': response.status_code, 'body': getattr(response, 'data', None)}
@@ -0,0 +1,46 @@
+"""
+Gunicorn configuration for the production deployment.
+
+Every value can be overridden through the environment, so that the same file works on Heroku, where `PORT` and
+`WEB_CONCURRENCY` are set by the platform, and on plain servers.
+
+For more information on the settings, see
+https://docs.gunicorn.org/en/stable/settings.html
+"""
+
+import multiprocessing
+import os
+
+bind = "0.0.0.0:{}".format(os.environ.get('PORT', 8000))
+
+# Threaded workers keep serving requests while others wait on the database, and every thread keeps its own
+# persistent database connection (see CONN_MAX_AGE in the settings).
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Recycle the workers after a number of requests to bound the memory growth of long running processes. The jitter
+# keeps the workers from restarting all at once.
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+graceful_timeout = 30
+keepalive = 5
+
+# Load the application once in the master process, so that new and recycled workers are forked ready to serve.
+# Django does not open any database connection while loading, so none is shared between the workers.
+preload_app = True
+
+# Keep the worker heartbeat files in memory instead of on a possibly slow disk.
+worker_tmp_dir = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def worker_exit(server, worker):
+    """Closes the persistent database connections of a worker when it is recycled or shut down."""
+    from django.db import connections
+    connections.close_all()
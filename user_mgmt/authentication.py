@@ -1,7 +1,25 @@
+from rest_framework import exceptions
 from rest_framework.authentication import TokenAuthentication
 
+from django.utils.translation import gettext_lazy as _
+
 """Overridden the default TokenAuthentication class to change the keyword from Token to Bearer.
 
 """
 class CustomTokenAuthentication(TokenAuthentication):
     keyword = "Bearer"
+
+    def authenticate_credentials(self, key):
+        """Fetches the profile of the user along with the token and the user, in the same query.
+
+        """
+        model = self.get_model()
+        try:
+            token = model.objects.select_related('user__profile').get(key=key)
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        return (token.user, token)
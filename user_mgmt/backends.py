@@ -0,0 +1,27 @@
+"""Authentication backend reading the token of the user along with the user.
+
+The login view authenticates through the backends and answers with the token of the user, which this backend reads
+in the same query as the user, so that a login takes a single query.
+
+"""
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class TokenModelBackend(ModelBackend):
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.select_related('auth_token').get(**{UserModel.USERNAME_FIELD: username})
+        except UserModel.DoesNotExist:
+            # Hashes the password anyway, so that the response time does not tell which usernames exist.
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
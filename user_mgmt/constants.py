@@ -2,3 +2,4 @@ class ResponseMessages:
     INVALID_REGISTERATION_KEYS = "Invalid registeration data received!"
     ALREADY_REGISTERED = "This email is already registered, please login!"
     INVALID_LOGIN_DATA = "Invalid login data, please try again!"
+    INVALID_TIMEZONE = "Invalid timezone, please provide an IANA timezone like 'Europe/Berlin'!"
@@ -0,0 +1,14 @@
+"""Password hasher with a configurable cost.
+
+It keeps the `pbkdf2_sha256` algorithm name of the Django hasher it replaces, so the existing passwords still verify
+and are rehashed with the configured number of iterations the next time their users log in.
+
+"""
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+
+
+class TunedPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS or PBKDF2PasswordHasher.iterations
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserProfile',
+            fields=[
+                ('user', models.OneToOneField(help_text='\n    References to the user the profile belongs to.\n    ', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='profile', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('timezone', models.CharField(default='UTC', help_text='\n    Contains the IANA timezone of the user, e.g. "Europe/Berlin". The timestamps the user sends without an offset are\n    read in this zone, and the listings add the slot times in it.\n    ', max_length=64)),
+            ],
+        ),
+    ]
@@ -0,0 +1,15 @@
+from django.contrib.auth.models import User
+from django.db import models
+
+
+class UserProfile(models.Model):
+    """Stores the preferences of a user. Users without a profile use the defaults.
+
+    """
+    user = models.OneToOneField(to=User, primary_key=True, related_name='profile', on_delete=models.CASCADE, help_text="""
+    References to the user the profile belongs to.
+    """)
+    timezone = models.CharField(max_length=64, default='UTC', help_text="""
+    Contains the IANA timezone of the user, e.g. "Europe/Berlin". The timestamps the user sends without an offset are
+    read in this zone, and the listings add the slot times in it.
+    """)
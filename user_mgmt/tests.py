@@ -1,12 +1,14 @@
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
 from django.urls import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
 
 from rest_framework.authtoken.models import Token
 from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED
 from rest_framework.test import APITestCase
 
 from .constants import ResponseMessages
+from .models import UserProfile
 
 
 class UserRegisterationTestCase(APITestCase):
@@ -43,6 +45,46 @@ class UserRegisterationTestCase(APITestCase):
         self.assertEqual(User.objects.count(), 1)
 
 
+    def test_register_with_timezone(self):
+        url = reverse('user_mgmt:register')
+        data = {'email': self.email, 'password': self.password, 'timezone': 'Asia/Kolkata'}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_201_CREATED)
+        self.assertEqual(UserProfile.objects.get(user__username=self.email).timezone, 'Asia/Kolkata')
+
+    def test_register_with_invalid_timezone(self):
+        url = reverse('user_mgmt:register')
+        data = {'email': self.email, 'password': self.password, 'timezone': 'Mars/Olympus_Mons'}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_TIMEZONE)
+        self.assertEqual(User.objects.count(), 0)
+
+
+class UserProfileTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='test@mail.com', email='test@mail.com', password='password')
+        self.client.credentials(HTTP_AUTHORIZATION="Bearer "+ Token.objects.create(user=self.user).key)
+        self.url = reverse('user_mgmt:profile')
+
+    def test_default_timezone(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.data, {'id': self.user.id, 'username': 'test@mail.com', 'timezone': 'UTC'})
+
+    def test_set_timezone(self):
+        response = self.client.put(self.url, {'timezone': 'America/New_York'}, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['timezone'], 'America/New_York')
+
+    def test_set_invalid_timezone(self):
+        response = self.client.put(self.url, {'timezone': '../etc/passwd'}, format='json')
+        self.assertEqual(response.status_code, HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, ResponseMessages.INVALID_TIMEZONE)
+        self.assertFalse(UserProfile.objects.exists())
+
+
 class UserLoginTestCase(APITestCase):
     def setUp(self):
         self.username = 'test@mail.com'
@@ -72,3 +114,51 @@ class UserLoginTestCase(APITestCase):
         response = self.client.post(url, data, format='json')
         self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
         self.assertEqual(response.data, ResponseMessages.INVALID_LOGIN_DATA)
+
+    def test_login_single_query(self):
+        url = reverse('user_mgmt:login')
+        data = {'username': self.username, 'password': self.password}
+        # The authentication backend reads the token along with the user.
+        with self.assertNumQueries(1):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+
+    def test_login_creates_missing_token(self):
+        Token.objects.filter(user=self.user).delete()
+        url = reverse('user_mgmt:login')
+        data = {'username': self.username, 'password': self.password}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        self.assertEqual(response.data['token'], Token.objects.get(user=self.user).key)
+
+    def test_login_inactive_user(self):
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        url = reverse('user_mgmt:login')
+        data = {'username': self.username, 'password': self.password}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data, ResponseMessages.INVALID_LOGIN_DATA)
+
+    def test_login_unknown_user(self):
+        url = reverse('user_mgmt:login')
+        data = {'username': 'unknown@mail.com', 'password': self.password}
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.data, ResponseMessages.INVALID_LOGIN_DATA)
+
+
+class PasswordHasherTestCase(APITestCase):
+    @override_settings(PASSWORD_PBKDF2_ITERATIONS=1000)
+    def test_tuned_iterations(self):
+        self.assertTrue(make_password('password').startswith('pbkdf2_sha256$1000$'))
+
+    def test_password_rehashed_on_login(self):
+        user = User.objects.create_user(username='test@mail.com', email='test@mail.com', password='password')
+        Token.objects.create(user=user)
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1000):
+            url = reverse('user_mgmt:login')
+            data = {'username': 'test@mail.com', 'password': 'password'}
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, HTTP_200_OK)
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
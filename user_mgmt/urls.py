@@ -1,8 +1,9 @@
 from django.urls import include, path
 
-from .views import UserLoginView, UserRegisterView
+from .views import UserLoginView, UserProfileView, UserRegisterView
 
 urlpatterns = [
     path('login/', UserLoginView.as_view(), name='login'),
-    path('register/', UserRegisterView.as_view(), name='register')
+    path('register/', UserRegisterView.as_view(), name='register'),
+    path('profile/', UserProfileView.as_view(), name='profile')
 ]
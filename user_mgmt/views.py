@@ -6,16 +6,21 @@ from rest_framework.status import HTTP_200_OK, HTTP_201_CREATED, HTTP_400_BAD_RE
 from rest_framework.views import APIView
 
 from django.contrib.auth.models import User
-from django.db import transaction
+from django.db import IntegrityError, transaction
+
+from app.timezones import UTC, offset_table, user_timezone
 
 from .constants import ResponseMessages
+from .models import UserProfile
 
 
 class UserLoginView(ObtainAuthToken):
     def post(self, request, *args, **kwargs):
         """Checks for the login details of the user and sends the token if successfully authenticated.
 
-        Overrides the default Token Authentication View for customized responses.
+        Overrides the default Token Authentication View for customized responses. The user is authenticated with the
+        authentication backends, which read the token along with the user, see `user_mgmt.backends`. A token is only
+        created for a user without one.
 
         """
         serializer = self.serializer_class(data=request.data, context={'request': request})
@@ -23,10 +28,12 @@ class UserLoginView(ObtainAuthToken):
             serializer.is_valid(raise_exception=True)
         except ValidationError:
             return Response(data=ResponseMessages.INVALID_LOGIN_DATA, status=HTTP_401_UNAUTHORIZED)
-        else:
-            user = serializer.validated_data['user']
-            token = Token.objects.get(user=user)
-            return Response(data={"token": token.key}, status=HTTP_200_OK)
+        user = serializer.validated_data['user']
+        try:
+            token = user.auth_token
+        except Token.DoesNotExist:
+            token = Token.objects.create(user=user)
+        return Response(data={"token": token.key}, status=HTTP_200_OK)
 
 
 class UserRegisterView(APIView):
@@ -35,15 +42,51 @@ class UserRegisterView(APIView):
     def post(self, request, *args, **kwargs):
         """Creates a new user and generates their token with the provided email and password.
 
+        The user is inserted straight away and an already registered email is detected from the unique constraint
+        on the username, instead of checking for it with a separate query first. The optional timezone is stored in
+        the profile of the user, which is only created when a timezone other than UTC is provided.
+
         """
         try:
             email = request.data['email']
             password = request.data['password']
         except KeyError:
             return Response(data=ResponseMessages.INVALID_REGISTERATION_KEYS, status=HTTP_400_BAD_REQUEST)
-        if User.objects.filter(username=email).exists():
+        timezone = request.data.get('timezone', UTC)
+        try:
+            offset_table(timezone)
+        except ValueError:
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username=email, email=email, password=password)
+                Token.objects.create(user=user)
+                if timezone != UTC:
+                    UserProfile.objects.create(user=user, timezone=timezone)
+        except IntegrityError:
             return Response(data=ResponseMessages.ALREADY_REGISTERED, status=HTTP_400_BAD_REQUEST)
-        with transaction.atomic():
-            user = User.objects.create_user(username=email, email=email, password=password)
-            Token.objects.create(user=user)
-            return Response(data={'id': user.id, 'username': user.username}, status=HTTP_201_CREATED)
+        return Response(data={'id': user.id, 'username': user.username}, status=HTTP_201_CREATED)
+
+
+class UserProfileView(APIView):
+    def get(self, request, *args, **kwargs):
+        """Returns the profile of the logged in user.
+
+        """
+        return Response(data={
+            'id': request.user.id, 'username': request.user.username, 'timezone': user_timezone(request.user)
+        }, status=HTTP_200_OK)
+
+    def put(self, request, *args, **kwargs):
+        """Sets the timezone of the logged in user.
+
+        """
+        try:
+            timezone = request.data['timezone']
+            offset_table(timezone)
+        except (KeyError, ValueError):
+            return Response(data=ResponseMessages.INVALID_TIMEZONE, status=HTTP_400_BAD_REQUEST)
+        UserProfile.objects.update_or_create(user=request.user, defaults={'timezone': timezone})
+        return Response(data={
+            'id': request.user.id, 'username': request.user.username, 'timezone': timezone
+        }, status=HTTP_200_OK)